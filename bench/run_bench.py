@@ -0,0 +1,136 @@
+# bench/run_bench.py
+# 목적: 합성 데이터로 ci/ 도구들의 실행 시간을 재현 가능하게 측정 → JSON (커밋 간 diff/비교)
+#  - data_cache_build (cold) / preflight_strict / precheck_contract / enrich_metrics / post_enrich / aggregate
+#    / rolling_quantiles (regime 밴드: 720바, q=0.35/0.74)
+#  - 같은 --size / --seed 면 입력 데이터가 바이트 단위로 동일
+#  - --baseline 이전 결과 JSON 과 비교해 --max-regression 배 이상 느려진 항목이 있으면 exit 1
+# Usage:
+#   python bench/run_bench.py --size 1y --repeat 3 --out bench_1y.json
+#   python bench/run_bench.py --size 1y --baseline bench_1y_main.json --max-regression 1.25
+
+import argparse, os, sys, json, time, shutil, platform, subprocess, statistics, contextlib, io
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+sys.path[:0] = [HERE, os.path.join(ROOT, "ci"), ROOT]
+
+import synth
+
+def _git_sha():
+    try: return subprocess.check_output(["git", "-C", ROOT, "rev-parse", "--short", "HEAD"], text=True).strip()
+    except Exception: return None
+
+def timeit(fn, repeat, setup=None):
+    times = []
+    for _ in range(repeat):
+        if setup: setup()
+        with contextlib.redirect_stdout(io.StringIO()):  # 도구들의 print 억제
+            t0 = time.perf_counter(); fn(); times.append(time.perf_counter() - t0)
+    return {"best_s": round(min(times), 5), "median_s": round(statistics.median(times), 5), "repeat": repeat}
+
+def _fresh_run(src, dst):
+    shutil.rmtree(dst, ignore_errors=True); shutil.copytree(src, dst)
+
+def run(size, repeat, workdir, seed=0, n_bundles=8):
+    import numpy as np, pandas as pd
+    data_p, run_src = synth.write_dataset(workdir, size, seed)
+    data_root, csv_glob = os.path.dirname(data_p), os.path.basename(data_p)
+    cache_dir = os.path.join(workdir, ".data_cache")
+    os.environ["MR4T_DATA_CACHE"] = cache_dir
+
+    import data_cache, precheck_contract, metrics_enforcer, wfo_entry, aggregate, preflight_strict, rolling_quantile
+    res = {}
+
+    def _cold():
+        shutil.rmtree(cache_dir, ignore_errors=True); data_cache._META.clear()
+    res["data_cache_build"] = timeit(lambda: data_cache.ensure(data_p), repeat, setup=_cold)
+
+    pf_out = os.path.join(workdir, "pf")
+    def _preflight():
+        saved = sys.argv[:]
+        sys.argv = ["preflight_strict.py", "--data-root", data_root, "--csv-glob", csv_glob, "--outdir", pf_out]
+        try: preflight_strict.main()
+        finally: sys.argv = saved
+    res["preflight_strict"] = timeit(_preflight, repeat)
+
+    close = np.asarray(data_cache.load_columns(data_p, ["close"])["close"])
+    rolling_quantile.rolling_quantiles(close[:2000], 720, [0.35, 0.74], 360)  # JIT 컴파일은 측정에서 제외
+    res["rolling_quantiles"] = timeit(lambda: rolling_quantile.rolling_quantiles(close, 720, [0.35, 0.74], 360), repeat)
+
+    res["precheck_contract"] = timeit(lambda: (precheck_contract.check_data(data_root, csv_glob),
+                                               precheck_contract.check_trades(run_src),
+                                               precheck_contract.check_preds(run_src)), repeat)
+
+    run_d = os.path.join(workdir, "run_work")
+    res["enrich_metrics"] = timeit(lambda: metrics_enforcer.enrich_metrics(run_d, data_root, csv_glob, 0.3, 9),
+                                   repeat, setup=lambda: _fresh_run(run_src, run_d))
+    res["post_enrich"] = timeit(lambda: wfo_entry.post_enrich(run_d), repeat,
+                                setup=lambda: _fresh_run(run_src, run_d))
+
+    # aggregator: 같은 run 디렉터리를 n_bundles 개의 멤버 번들로
+    agg_root = os.path.join(workdir, "all_artifacts")
+    shutil.rmtree(agg_root, ignore_errors=True)
+    _fresh_run(run_src, run_d)
+    with contextlib.redirect_stdout(io.StringIO()):
+        metrics_enforcer.enrich_metrics(run_d, data_root, csv_glob, 0.3, 9)
+    for i in range(n_bundles):
+        d = os.path.join(agg_root, f"bundle_0.{80+i}_9_none")
+        os.makedirs(d)
+        shutil.make_archive(os.path.join(d, f"bundle_0.{80+i}_9_none"), "zip", run_d)
+    final = os.path.join(workdir, "final.zip"); summ_csv = os.path.join(workdir, "final_pack", "WFO_aggregated_summary.csv")
+    def _agg():
+        rows = aggregate.collect(agg_root)
+        os.makedirs(os.path.dirname(summ_csv), exist_ok=True)
+        aggregate.summary_frame(rows).to_csv(summ_csv, index=False)
+        aggregate.pack(agg_root, summ_csv, final)
+    res["aggregate"] = timeit(_agg, repeat)
+
+    return {
+        "meta": {
+            "git": _git_sha(), "size": size, "rows": synth.n_rows(size), "seed": seed, "repeat": repeat,
+            "python": platform.python_version(), "numpy": np.__version__, "pandas": pd.__version__,
+            "machine": platform.machine(), "cpus": os.cpu_count(),
+        },
+        "results": res,
+    }
+
+def compare(cur, base, max_regression):
+    worst, bad = [], []
+    for k, v in cur["results"].items():
+        b = base.get("results", {}).get(k)
+        if not b: continue
+        ratio = v["median_s"] / max(b["median_s"], 1e-9)
+        worst.append((k, ratio))
+        flag = " REGRESSION" if ratio > max_regression else ""
+        if flag: bad.append(k)
+        print(f"[bench] {k:<18} {b['median_s']:>9.4f}s -> {v['median_s']:>9.4f}s  x{ratio:.2f}{flag}")
+    worst.sort(key=lambda kr: -kr[1])
+    if worst:
+        print("[bench] worst ratios: " + ", ".join(f"{k} x{r:.2f}" for k, r in worst[:3]))
+    return bad
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--size", default="1m", help="1m | 1y | 5y | <rows>")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--workdir", default=os.path.join(ROOT, "bench_data"))
+    ap.add_argument("--out", default="")
+    ap.add_argument("--baseline", default="", help="previous result JSON to compare against")
+    ap.add_argument("--max-regression", type=float, default=1.25)
+    args = ap.parse_args()
+
+    os.makedirs(args.workdir, exist_ok=True)
+    cur = run(args.size, args.repeat, args.workdir, args.seed)
+    txt = json.dumps(cur, indent=2, sort_keys=True)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f: f.write(txt + "\n")
+    print(txt)
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f: base = json.load(f)
+        bad = compare(cur, base, args.max_regression)
+        if bad:
+            raise SystemExit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+# bench/synth.py
+# 목적: schema.md 규격을 만족하는 합성 1분봉 OHLCV (+ trades.csv / preds_test.csv) 생성
+#  - open_time 단조 증가(UTC ISO8601), 모든 값 유한, low <= open,close <= high, volume >= 0
+#  - 코드팩 러너가 요구하는 number_of_trades / taker_buy_base_asset_volume 포함
+#  - seed 고정 → 같은 인자면 항상 같은 파일 (커밋 간 벤치 비교용)
+# Usage:
+#   python bench/synth.py --size 1y --out bench_data
+
+import argparse, os
+import numpy as np
+import pandas as pd
+
+SIZES = {"1m": 30 * 1440, "1y": 365 * 1440, "5y": (5 * 365 + 1) * 1440}
+
+def n_rows(size):
+    return SIZES[size] if size in SIZES else int(size)
+
+def make_candles(n, start="2020-01-01", seed=0, price0=2000.0, sigma=0.0008):
+    rng = np.random.default_rng(seed)
+    t = pd.date_range(start, periods=n, freq="1min")
+    close = price0 * np.exp(np.cumsum(rng.normal(0.0, sigma, n)))
+    open_ = np.r_[price0, close[:-1]]
+    hi = np.maximum(open_, close) * (1.0 + np.abs(rng.normal(0.0, sigma / 2, n)))
+    lo = np.minimum(open_, close) * (1.0 - np.abs(rng.normal(0.0, sigma / 2, n)))
+    vol = rng.gamma(2.0, 15.0, n)
+    return pd.DataFrame({
+        "open_time": t.strftime("%Y-%m-%d %H:%M:%S"),
+        "open": open_, "high": hi, "low": lo, "close": close, "volume": vol,
+        "number_of_trades": rng.integers(5, 800, n),
+        "taker_buy_base_asset_volume": vol * rng.uniform(0.0, 1.0, n),
+    })
+
+def make_trades(candles, n_trades, max_hold=12, seed=1):
+    """겹치지 않는 ENTRY/EXIT 쌍 — 러너의 trades.csv 모양(t_idx, event, open_time)"""
+    rng = np.random.default_rng(seed)
+    n = len(candles)
+    n_trades = int(min(n_trades, max(1, n // (max_hold + 2))))
+    slot = n // n_trades
+    ent = np.arange(n_trades) * slot + rng.integers(0, max(1, slot - max_hold - 1), n_trades)
+    ext = np.minimum(ent + rng.integers(1, max_hold + 1, n_trades), n - 1)
+    idx = np.r_[ent, ext]
+    ev = np.array(["ENTRY"] * n_trades + ["EXIT"] * n_trades)
+    order = np.lexsort((ev == "ENTRY", idx))
+    tl = pd.DataFrame({"t_idx": idx[order], "event": ev[order]})
+    tl["open_time"] = candles["open_time"].to_numpy()[tl["t_idx"].to_numpy()]
+    return tl
+
+def make_preds(candles, seed=2):
+    rng = np.random.default_rng(seed)
+    n = len(candles)
+    return pd.DataFrame({
+        "open_time": candles["open_time"].to_numpy(),
+        "mode": rng.integers(-1, 2, n),
+        "gatep": rng.beta(2.0, 5.0, n),
+        "entry_flag": (rng.random(n) < 0.002).astype(int),
+    })
+
+def write_dataset(out, size="1m", seed=0, trades_per_day=20):
+    """out/data/ETHUSDT_1min_synth_<size>.csv + out/run/{trades,preds_test}.csv (이미 있으면 재사용)"""
+    n = n_rows(size)
+    data_p = os.path.join(out, "data", f"ETHUSDT_1min_synth_{size}_s{seed}.csv")
+    run_d = os.path.join(out, f"run_{size}_s{seed}")
+    if os.path.exists(data_p) and os.path.exists(os.path.join(run_d, "preds_test.csv")):
+        return data_p, run_d
+    os.makedirs(os.path.dirname(data_p), exist_ok=True); os.makedirs(run_d, exist_ok=True)
+    c = make_candles(n, seed=seed)
+    c.to_csv(data_p, index=False)
+    make_trades(c, trades_per_day * max(1, n // 1440), seed=seed + 1).to_csv(os.path.join(run_d, "trades.csv"), index=False)
+    make_preds(c, seed=seed + 2).to_csv(os.path.join(run_d, "preds_test.csv"), index=False)
+    return data_p, run_d
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--size", default="1m", help="1m | 1y | 5y | <rows>")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--out", default="bench_data")
+    args = ap.parse_args()
+    data_p, run_d = write_dataset(args.out, args.size, args.seed)
+    print(f"[synth] {data_p} ({n_rows(args.size)} rows), {run_d}/trades.csv, {run_d}/preds_test.csv")
+
+if __name__ == "__main__":
+    main()
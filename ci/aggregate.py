@@ -0,0 +1,185 @@
+# ci/aggregate.py
+# 목적: WFO 멤버 번들(zip)들을 풀지 않고 바로 집계 + 최종 ZIP 패키징
+#  - summary.json / trades.csv / preds_test.csv 멤버를 ZipFile에서 스트리밍으로 읽음 (tmp_extract 없음)
+#  - trades/preds는 chunk 단위로 누적 집계 (전체 DataFrame 안 만듦), .npz 멤버(artifacts)는 한 번에 읽음
+#  - 번들별 집계는 프로세스 풀에서 병렬
+#  - 최종 ZIP: 이미 압축된 멤버 번들(.zip)은 ZIP_STORED로 그대로 담음 (재압축 없음)
+# Usage:
+#   python ci/aggregate.py --root all_artifacts --out WFO_results_all.zip \
+#       --summary final_pack/WFO_aggregated_summary.csv
+
+import argparse, os, io, re, glob, json, math, zipfile
+from concurrent.futures import ProcessPoolExecutor
+import pandas as pd
+import numpy as np
+import artifacts
+
+PNL_CANDS = ['pnl_close_based','pnl','pnl_value','pnl_usd','pnl_krw','pnl_pct','pnl_percent']
+SUMM_KEYS = ['entries','exits','cum_pnl_close_based','avg_gatep','sharpe','mdd','profit_factor','win_rate']
+COLS = ['run_id','n_trades','win_rate','cum_pnl','avg_pnl','median_pnl','entries','exits','avg_gatep',
+        'profit_factor','sharpe','mdd','mcc','tp','tn','fp','fn']
+CHUNK = 200_000
+
+def infer_run_id(name):
+    m = re.search(r'(?:bundle|out)[-_]([0-9.]+)[-_]([0-9]+)[-_]([A-Za-z0-9]+)', name)
+    if m: return f"thr={m.group(1)},hold={m.group(2)},filter={m.group(3)}"
+    if 'single' in name: return 'single'
+    return name
+
+def _member(z, fn):
+    """번들 루트 또는 하위 폴더에 있는 fn 멤버 이름 (없으면 None)"""
+    names = z.namelist()
+    if fn in names: return fn
+    return next((n for n in names if n.endswith("/" + fn)), None)
+
+def _chunks(fobj):
+    if isinstance(fobj, pd.DataFrame):  # NPZ 멤버는 이미 고정 dtype 배열 → 그대로 1 chunk
+        yield fobj
+        return
+    try:
+        for ch in pd.read_csv(fobj, chunksize=CHUNK):
+            yield ch
+    except Exception:
+        return  # 읽기 실패/빈 파일 → 빈 결과 (safe_read_csv와 동일)
+
+def trade_metrics_stream(fobj):
+    n = 0; wins = 0; pos = 0.0; neg = 0.0; tot = 0.0
+    pnl_col, parts = None, []
+    for ch in _chunks(fobj):
+        n += len(ch)
+        if pnl_col is None:
+            pnl_col = next((c for c in PNL_CANDS if c in ch.columns), False)
+        if not pnl_col: continue
+        s = pd.to_numeric(ch[pnl_col], errors='coerce').fillna(0.0).to_numpy(float)
+        wins += int((s > 0).sum()); pos += float(s[s > 0].sum()); neg += float(s[s < 0].sum())
+        tot += float(s.sum()); parts.append(s)
+    r = {'n_trades': n}
+    if n == 0:
+        r.update({'win_rate':np.nan,'cum_pnl':0.0,'avg_pnl':np.nan,'median_pnl':np.nan,'profit_factor':np.nan}); return r
+    if not pnl_col:
+        r.update({'win_rate':np.nan,'cum_pnl':np.nan,'avg_pnl':np.nan,'median_pnl':np.nan,'profit_factor':np.nan}); return r
+    r['cum_pnl'] = tot; r['avg_pnl'] = tot / n; r['median_pnl'] = float(np.median(np.concatenate(parts)))
+    r['win_rate'] = float(wins) / max(n, 1); r['profit_factor'] = (pos / abs(neg)) if neg != 0 else np.nan
+    return r
+
+def mcc_stream(fobj):
+    tp = tn = fp = fn = 0; seen = False
+    yt = yp = None
+    for ch in _chunks(fobj):
+        if yt is None:
+            m = {c.lower(): c for c in ch.columns}
+            yt = next((m.get(k) for k in ['y_true','true','label','target'] if k in m), None) or False
+            yp = next((m.get(k) for k in ['y_pred','pred','prediction','pred_label'] if k in m), None) or False
+        if not yt or not yp: return {}
+        seen = True
+        Yt = ch[yt].values; Yp = ch[yp].values
+        if ch[yp].dtype.kind in 'f': Yp = (Yp >= 0.5).astype(int)
+        tp += int(((Yt==1)&(Yp==1)).sum()); tn += int(((Yt==0)&(Yp==0)).sum())
+        fp += int(((Yt==0)&(Yp==1)).sum()); fn += int(((Yt==1)&(Yp==0)).sum())
+    if not seen: return {}
+    den = (tp+fp)*(tp+fn)*(tn+fp)*(tn+fn); den = math.sqrt(den) if den else 0
+    mcc = (tp*tn - fp*fn)/den if den else float('nan')
+    return {'mcc':float(mcc),'tp':tp,'tn':tn,'fp':fp,'fn':fn}
+
+def _table(f, name):
+    """zip 멤버 → .npz 면 DataFrame, .csv 면 스트리밍용 파일 객체 그대로"""
+    return artifacts.read_npz(io.BytesIO(f.read())) if name.endswith('.npz') else f
+
+def summarize_bundle(zp):
+    """번들 zip 1개 → 집계 row (읽을 수 없는 zip이면 None)"""
+    nm = os.path.splitext(os.path.basename(zp))[0]
+    try:
+        with zipfile.ZipFile(zp, 'r') as z:
+            r = {'run_id': infer_run_id(nm)}
+            t = artifacts.member(z, 'trades'); s = _member(z, 'summary.json'); p = artifacts.member(z, 'preds_test')
+            if t:
+                with z.open(t) as f: r.update(trade_metrics_stream(_table(f, t)))
+            if s:
+                try:
+                    with z.open(s) as f: summ = json.load(f)
+                    for k in SUMM_KEYS:
+                        if k in summ and (k != 'win_rate' or pd.isna(r.get('win_rate', np.nan))):
+                            r[k] = summ[k]
+                except Exception: pass
+            if p:
+                with z.open(p) as f: r.update(mcc_stream(_table(f, p)))
+            tm = _member(z, 'timings.json')
+            if tm:
+                try:
+                    with z.open(tm) as f: r['_timings'] = json.load(f)
+                except Exception: pass
+            return r
+    except Exception:
+        return None
+
+def collect(root, workers=None):
+    bundles = glob.glob(os.path.join(root, '**', '*.zip'), recursive=True)
+    if workers == 1 or len(bundles) <= 1:
+        rows = [summarize_bundle(zp) for zp in bundles]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as ex:
+            rows = list(ex.map(summarize_bundle, bundles, chunksize=4))
+    return [r for r in rows if r is not None]
+
+def summary_frame(rows):
+    df = pd.DataFrame([{k: v for k, v in r.items() if not k.startswith('_')} for r in rows])
+    for c in COLS:
+        if c not in df.columns: df[c] = np.nan
+    df = df[COLS]
+    for c in ['cum_pnl','win_rate','mcc']: df[c] = pd.to_numeric(df[c], errors='coerce')
+    return df.sort_values(by=['cum_pnl','win_rate','mcc'], ascending=[False,False,False], na_position='last')
+
+def timing_rollup(rows):
+    """번들별 timings.json(wfo_entry) → 단계별 wall/cpu/peak RSS 합계·평균·최대 (없으면 None)"""
+    recs = []
+    for r in rows:
+        tm = r.get('_timings') or {}
+        for st in tm.get('stages', []):
+            recs.append({'run_id': r['run_id'], 'stage': st.get('stage'), 'wall_s': st.get('wall_s'),
+                         'cpu_s': st.get('cpu_s'), 'peak_rss_mb': st.get('peak_rss_mb')})
+    if not recs:
+        return None
+    t = pd.DataFrame(recs)
+    g = t.groupby('stage', sort=False).agg(
+        runs=('run_id', 'nunique'), wall_sum=('wall_s', 'sum'), wall_mean=('wall_s', 'mean'),
+        wall_max=('wall_s', 'max'), cpu_sum=('cpu_s', 'sum'), peak_rss_max=('peak_rss_mb', 'max'))
+    g['wall_share'] = g['wall_sum'] / max(float(g['wall_sum'].sum()), 1e-12)
+    return g.reset_index().sort_values('wall_sum', ascending=False)
+
+def aggregate(root, workers=None):
+    return summary_frame(collect(root, workers))
+
+def pack(root, summary_csv, out_zip, readme=None, extra=()):
+    """root 아래 파일 전체 + summary CSV → out_zip. .zip 멤버는 재압축 없이 STORED"""
+    with zipfile.ZipFile(out_zip, 'w', zipfile.ZIP_DEFLATED) as z:
+        for base, dirs, files in os.walk(root):
+            for fn in sorted(files):
+                p = os.path.join(base, fn)
+                ct = zipfile.ZIP_STORED if fn.lower().endswith('.zip') else zipfile.ZIP_DEFLATED
+                z.write(p, os.path.relpath(p, root), compress_type=ct)
+        for p in [summary_csv, *extra]:
+            z.write(p, os.path.basename(p))
+        z.writestr('README.txt', readme or f'This package includes all member bundles and {os.path.basename(summary_csv)}\n')
+    return out_zip
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--root", default="all_artifacts")
+    ap.add_argument("--out", default="WFO_results_all.zip")
+    ap.add_argument("--summary", default="final_pack/WFO_aggregated_summary.csv")
+    ap.add_argument("--workers", type=int, default=None, help="process pool size (default: cpu count)")
+    args = ap.parse_args()
+    rows = collect(args.root, args.workers)
+    df = summary_frame(rows)
+    os.makedirs(os.path.dirname(args.summary) or ".", exist_ok=True)
+    df.to_csv(args.summary, index=False)
+    extra = []
+    tr = timing_rollup(rows)
+    if tr is not None:
+        extra.append(os.path.join(os.path.dirname(args.summary) or ".", "timings_rollup.csv"))
+        tr.to_csv(extra[-1], index=False)
+    pack(args.root, args.summary, args.out, extra=extra)
+    print(f"[aggregate] {len(df)} runs -> {args.summary}, {args.out}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+# ci/artifacts.py
+# 목적: 러너 산출물 trades / preds_test 를 CSV 대신 고정 dtype NPZ 로 저장·읽기 (CSV 는 선택적 export)
+#  - <name>.npz : 컬럼별 배열 + "__columns__" (컬럼 순서), np.savez_compressed, pickle 없음
+#      open_time → int64 epoch ns (읽을 때 datetime64[ns] 로 복원)
+#      SCHEMA 에 있는 컬럼은 고정 dtype (flag/상태 int8, 가격·확률 float64, event 는 고정폭 유니코드)
+#      나머지: 숫자 → int64/float64, 문자열 → 고정폭 유니코드
+#  - 출력 형식: --format 인자 또는 MR4T_OUTPUT_FORMAT (csv | npz, 기본 csv)
+#      npz 일 때 CSV 도 남기려면 --csv-export 또는 MR4T_OUTPUT_CSV=1
+#  - 읽기: read_table(outdir, name) 는 .npz 가 있으면 그것을, 없으면 .csv (engine="python" fallback 포함)
+#  - 번들 zip 안의 멤버도 같은 규칙 (read_member)
+# Usage:
+#   python ci/artifacts.py --outdir _out_4u/run --to npz            # CSV → NPZ (CSV 삭제)
+#   python ci/artifacts.py --outdir _out_4u/run --to npz --keep-csv
+#   python ci/artifacts.py --outdir _out_4u/run --to csv            # NPZ → CSV export
+
+import argparse, os, io
+import numpy as np
+import pandas as pd
+
+FORMAT_ENV = "MR4T_OUTPUT_FORMAT"
+CSV_EXPORT_ENV = "MR4T_OUTPUT_CSV"
+FORMATS = ("csv", "npz")
+TABLES = ("trades", "preds_test")
+NAT = np.iinfo(np.int64).min
+_I8 = ["session", "mode", "entry_flag", "in_pos", "exit_reason",
+       "BOS_UP", "BOS_DN", "RETEST_UP", "RETEST_DN", "STOPRUN_LONG", "STOPRUN_SHORT"]
+SCHEMA = {"t_idx": "int64", "event": "<U8", "side": "int8",
+          "p_thr": "float64", "gatep": "float64", "score": "float64", "OFI": "float64", "AggBuy": "float64",
+          "AggSell": "float64", "pnl_close_based": "float64", **{c: "int8" for c in _I8}}
+
+def output_format(fmt=None):
+    fmt = (fmt or os.environ.get(FORMAT_ENV) or "csv").lower()
+    if fmt not in FORMATS:
+        raise ValueError(f"[artifacts] unknown output format: {fmt} (use {FORMATS})")
+    return fmt
+
+def csv_export(flag=None):
+    return bool(flag) if flag is not None else os.environ.get(CSV_EXPORT_ENV, "") not in ("", "0")
+
+def table_path(outdir, name):
+    """outdir 안의 name 산출물 경로 (.npz 우선, 없으면 .csv, 둘 다 없으면 None)"""
+    for ext in (".npz", ".csv"):
+        p = os.path.join(outdir, name + ext)
+        if os.path.exists(p):
+            return p
+    return None
+
+def _array(name, s):
+    if name == "open_time":
+        import data_cache
+        return data_cache.to_epoch_ns(s)
+    dt = SCHEMA.get(name)
+    if dt is not None and dt.startswith("<U"):
+        return s.astype(str).to_numpy(dtype=dt)
+    if dt is not None and dt.startswith("int") and s.notna().all():
+        return pd.to_numeric(s, errors="coerce").to_numpy(dtype=dt)
+    if dt is not None:
+        return pd.to_numeric(s, errors="coerce").to_numpy(dtype=np.float64)
+    if s.dtype.kind in "biuf":
+        return s.to_numpy()
+    if s.dtype.kind == "M":
+        return s.to_numpy(dtype="datetime64[ns]").view("int64")
+    return s.astype(str).to_numpy(dtype=str)
+
+def write_npz(df, path):
+    cols = [str(c) for c in df.columns]
+    arrays = {f"c{i}": _array(c, df[c]) for i, c in enumerate(cols)}
+    tmp = path + ".tmp.npz"
+    np.savez_compressed(tmp, __columns__=np.array(cols, dtype=str), **arrays)
+    os.replace(tmp, path)
+    return path
+
+def read_npz(src, columns=None):
+    """NPZ 경로 또는 file-like → DataFrame (open_time 은 datetime64[ns])"""
+    with np.load(src, allow_pickle=False) as z:
+        cols = [str(c) for c in z["__columns__"]]
+        want = cols if columns is None else [c for c in cols if c in set(columns)]
+        data = {}
+        for c in want:
+            a = z[f"c{cols.index(c)}"]
+            data[c] = a.view("datetime64[ns]") if c == "open_time" and a.dtype == np.int64 else a
+    return pd.DataFrame(data, columns=want)
+
+def npz_columns(src):
+    with np.load(src, allow_pickle=False) as z:
+        return [str(c) for c in z["__columns__"]]
+
+def read_path(p, columns=None):
+    """.npz / .csv 파일 하나 → DataFrame"""
+    if str(p).lower().endswith(".npz"):
+        return read_npz(p, columns)
+    try:
+        return pd.read_csv(p, usecols=columns)
+    except (ValueError, pd.errors.ParserError):
+        return pd.read_csv(p, engine="python", sep=",", on_bad_lines="skip", usecols=columns)
+
+def read_table(outdir, name, columns=None):
+    """outdir 의 trades / preds_test → DataFrame (없으면 None)"""
+    p = table_path(outdir, name)
+    return None if p is None else read_path(p, columns)
+
+def columns(outdir, name):
+    """헤더만 — NPZ 는 __columns__ 만 읽고, CSV 는 첫 줄만"""
+    p = table_path(outdir, name)
+    if p is None:
+        return None
+    return npz_columns(p) if p.endswith(".npz") else [str(c) for c in pd.read_csv(p, nrows=0).columns]
+
+def member(z, name):
+    """번들 ZipFile 안의 name(.npz 우선 / .csv) 멤버 이름 (루트 또는 하위 폴더)"""
+    names = z.namelist()
+    for fn in (name + ".npz", name + ".csv"):
+        if fn in names: return fn
+        hit = next((n for n in names if n.endswith("/" + fn)), None)
+        if hit: return hit
+    return None
+
+def read_member(z, name, columns=None):
+    m = member(z, name)
+    if m is None:
+        return None
+    with z.open(m) as f:
+        raw = io.BytesIO(f.read())
+    return read_npz(raw, columns) if m.endswith(".npz") else pd.read_csv(raw, usecols=columns)
+
+def write_table(df, outdir, name, fmt=None, csv_export=False):
+    """fmt 형식으로 기록 (npz + csv_export 면 CSV 도, 이미 있는 CSV export 도 갱신) → 기록한 경로 목록"""
+    fmt = output_format(fmt)
+    out = []
+    if fmt == "npz":
+        out.append(write_npz(df, os.path.join(outdir, name + ".npz")))
+    p = os.path.join(outdir, name + ".csv")
+    if fmt == "csv" or csv_export or os.path.exists(p):
+        df.to_csv(p, index=False); out.append(p)
+    return out
+
+def table_format(outdir, name):
+    p = table_path(outdir, name)
+    return None if p is None else ("npz" if p.endswith(".npz") else "csv")
+
+def clear_tables(outdir):
+    """outdir 을 재사용할 때 이전 실행의 trades / preds_test (두 형식 모두) 제거 — .npz 우선 읽기가 옛 결과를 집지 않도록"""
+    for name in TABLES:
+        for ext in (".csv", ".npz"):
+            p = os.path.join(outdir, name + ext)
+            if os.path.exists(p): os.remove(p)
+
+def convert_outdir(outdir, fmt=None, keep_csv=None):
+    """러너가 쓴 CSV 를 fmt 로 변환 (npz: CSV 는 keep_csv 일 때만 남김 / csv: CSV 가 기준, 없으면 NPZ 에서 export)"""
+    fmt, keep_csv = output_format(fmt), csv_export(keep_csv)
+    done = []
+    for name in TABLES:
+        csv_p, npz_p = (os.path.join(outdir, name + ext) for ext in (".csv", ".npz"))
+        if fmt == "npz" and os.path.exists(csv_p):
+            write_npz(pd.read_csv(csv_p, float_precision="round_trip"), npz_p); done.append(npz_p)  # 텍스트 값 그대로
+            if not keep_csv: os.remove(csv_p)
+        elif fmt == "csv" and os.path.exists(csv_p):
+            if os.path.exists(npz_p): os.remove(npz_p)  # 러너가 방금 쓴 CSV 가 기준 → 남은 NPZ 는 이전 실행 것
+        elif fmt == "csv" and os.path.exists(npz_p):
+            read_npz(npz_p).to_csv(csv_p, index=False); done.append(csv_p)
+    return done
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--outdir", required=True)
+    ap.add_argument("--to", choices=FORMATS, default="npz")
+    ap.add_argument("--keep-csv", action="store_true", help="with --to npz: keep the CSV export")
+    args = ap.parse_args()
+    before = {n: os.path.getsize(table_path(args.outdir, n)) for n in TABLES if table_path(args.outdir, n)}
+    done = convert_outdir(args.outdir, args.to, args.keep_csv or None)
+    for p in done:
+        name = os.path.splitext(os.path.basename(p))[0]
+        print(f"[artifacts] {p}: {os.path.getsize(p)/1e6:.2f} MB (was {before.get(name, 0)/1e6:.2f} MB)")
+    if not done:
+        print(f"[artifacts] nothing to convert in {args.outdir}")
+
+if __name__ == "__main__":
+    main()
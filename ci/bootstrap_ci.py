@@ -0,0 +1,202 @@
+# ci/bootstrap_ci.py
+# 목적: 거래별 pnl_close_based 시계열로 PF / Sharpe / MDD / win_rate / cum_pnl 의 신뢰구간 (점추정만으로는 champion vs alt 비교 불가)
+#  - 입력: run 디렉터리 또는 번들 zip 의 trades.csv / trades.npz (EXIT 행, post_enrich 와 같은 pnl 컬럼 후보)
+#          pnl 컬럼이 없으면 --data-root/--csv-glob 로 close 기준 pnl 계산 (cost_surface.trade_prices)
+#  - 방법
+#      block   : circular block bootstrap (블록 길이 기본 n^(1/3)) → 거래 간 자기상관 유지, 모든 지표
+#      shuffle : 거래 순서 무작위 치환 → 순서에만 의존하는 MDD 분포 (PF/Sharpe/win_rate 는 순서 불변이라 제외)
+#  - 리샘플 (m, n) 행렬을 NumPy 로 한 번에 계산 (m x n 이 CHUNK_CELLS 넘으면 잘라서), 잘린 작업들을 spawn 프로세스 풀에 분배
+#  - 작업마다 SeedSequence.spawn 시드 → workers 수와 무관하게 같은 결과
+# Output (--out-dir):
+#   bootstrap_ci.csv       run_id, method, metric, n_trades, point, mean, std, lo, hi, p_null, n_resamples, block
+#                          (p_null = P(지표 <= 귀무값): PF 1, Sharpe 0, cum_pnl 0, win_rate 0.5)
+#   bootstrap_compare.csv  (run 2개 이상) 첫 run 대비 P(run 지표 > 기준 지표), block 샘플끼리 비교 (MDD 는 작을수록 좋음)
+# Usage:
+#   python ci/bootstrap_ci.py --runs out_champion out_alt --n-resamples 5000 --workers 4
+#   python ci/bootstrap_ci.py --root all_artifacts --alpha 0.1 --out-dir final_pack
+
+import argparse, os, glob, json, time, zipfile
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+import artifacts
+
+PNL_CANDS = ['pnl_close_based','pnl','pnl_value','pnl_usd','pnl_krw','pnl_pct','pnl_percent','ret','return','pnl_close']
+METRICS = ["profit_factor", "sharpe", "mdd", "win_rate", "cum_pnl"]
+METHOD_METRICS = {"block": METRICS, "shuffle": ["mdd"]}
+NULL = {"profit_factor": 1.0, "sharpe": 0.0, "cum_pnl": 0.0, "win_rate": 0.5}
+CHUNK_CELLS = 4_000_000  # 리샘플 수 x 거래 수 상한 (작업 하나가 만드는 행렬 크기)
+
+def _pnl_from_trades(tr):
+    ev = next((c for c in tr.columns if str(c).lower() == "event"), None)
+    if ev is not None:
+        tr = tr[tr[ev].astype(str).str.upper() == "EXIT"]
+    col = next((c for c in PNL_CANDS if c in tr.columns), None)
+    return None if col is None else pd.to_numeric(tr[col], errors="coerce").fillna(0.0).to_numpy(float)
+
+def load_pnl(src, data_root=None, csv_glob=None):
+    """run 디렉터리 / 번들 zip → 거래별 pnl 배열"""
+    if src.lower().endswith(".zip"):
+        with zipfile.ZipFile(src) as z:
+            tr = artifacts.read_member(z, "trades")
+        if tr is None:
+            raise FileNotFoundError(f"[bootstrap_ci] no trades.csv/.npz in {src}")
+        pnl = _pnl_from_trades(tr)
+    else:
+        tr = artifacts.read_table(src, "trades")
+        if tr is None:
+            raise FileNotFoundError(f"[bootstrap_ci] no trades.csv/.npz in {src}")
+        pnl = _pnl_from_trades(tr)
+        if pnl is None and data_root and csv_glob:
+            import cost_surface
+            pnl = cost_surface.trade_prices(src, data_root, csv_glob)["pnl"].to_numpy(float)
+    if pnl is None:
+        raise ValueError(f"[bootstrap_ci] no pnl column in {src} (run metrics_enforcer or pass --data-root/--csv-glob)")
+    return pnl
+
+def run_name(src):
+    import aggregate
+    src = src.rstrip("/")
+    return aggregate.infer_run_id(os.path.splitext(os.path.basename(src))[0])
+
+def metric_matrix(X):
+    """X (m, n) 리샘플 행렬 → {metric: (m,)}  (wfo_splits.trade_metrics 와 같은 정의)"""
+    pos = np.where(X > 0, X, 0.0).sum(axis=1)
+    neg = np.where(X < 0, X, 0.0).sum(axis=1)
+    mean = X.mean(axis=1)
+    sd = X.std(axis=1)
+    eq = np.cumsum(X, axis=1)
+    peak = np.maximum.accumulate(np.maximum(eq, 0.0), axis=1)  # 시작점 0 포함
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return {"profit_factor": np.where(neg != 0, pos / -neg, np.nan),
+                "sharpe": np.where(sd > 0, mean / sd, np.nan),
+                "mdd": (peak - eq).max(axis=1),
+                "win_rate": (X > 0).mean(axis=1),
+                "cum_pnl": eq[:, -1]}
+
+def resample_idx(rng, n, m, method, block):
+    if method == "shuffle":
+        return np.argsort(rng.random((m, n)), axis=1)
+    nb = -(-n // block)
+    starts = rng.integers(0, n, size=(m, nb))
+    return ((starts[:, :, None] + np.arange(block)) % n).reshape(m, nb * block)[:, :n]
+
+def _job(pnl, method, m, block, seed):
+    rng = np.random.default_rng(seed)
+    st = metric_matrix(pnl[resample_idx(rng, len(pnl), m, method, block)])
+    return np.column_stack([st[k] for k in METHOD_METRICS[method]])
+
+def plan_jobs(runs, methods, n_resamples, block, seed):
+    """(run_idx, method, m, block, SeedSequence) 목록 — run x method 마다 n_resamples 를 행렬 크기로 나눔"""
+    root = np.random.SeedSequence(seed)
+    jobs = []
+    for r, pnl in enumerate(runs):
+        n = len(pnl)
+        if n < 2:
+            continue
+        step = max(1, CHUNK_CELLS // n)
+        for method in methods:
+            b = 1 if method == "shuffle" else (block or max(1, int(round(n ** (1 / 3)))))
+            sizes = [min(step, n_resamples - i) for i in range(0, n_resamples, step)]
+            for m, ss in zip(sizes, root.spawn(len(sizes))):
+                jobs.append((r, method, m, b, ss))
+    return jobs
+
+def bootstrap(runs, methods=("block", "shuffle"), n_resamples=2000, block=None, seed=0, workers=None):
+    """runs: [pnl 배열] → {(run_idx, method): (샘플 행렬 (n_resamples, k), block)}"""
+    jobs = plan_jobs(runs, methods, n_resamples, block, seed)
+    args = [(runs[r], method, m, b, ss) for r, method, m, b, ss in jobs]
+    workers = min(workers or os.cpu_count() or 1, max(len(jobs), 1))
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=mp.get_context("spawn")) as ex:
+            parts = list(ex.map(_job, *zip(*args)))
+    else:
+        parts = [_job(*a) for a in args]
+    out = {}
+    for (r, method, _, b, _), part in zip(jobs, parts):
+        prev = out.get((r, method))
+        out[(r, method)] = (part if prev is None else np.vstack([prev[0], part]), b)
+    return out
+
+def ci_table(names, runs, samples, alpha=0.05):
+    rows = []
+    for (r, method), (S, b) in sorted(samples.items()):
+        point = metric_matrix(runs[r][None, :])
+        for j, k in enumerate(METHOD_METRICS[method]):
+            s = S[:, j]; v = s[~np.isnan(s)]
+            null = NULL.get(k)
+            rows.append({"run_id": names[r], "method": method, "metric": k, "n_trades": len(runs[r]),
+                         "point": float(point[k][0]),
+                         "mean": float(v.mean()) if len(v) else np.nan, "std": float(v.std()) if len(v) else np.nan,
+                         "lo": float(np.quantile(v, alpha / 2)) if len(v) else np.nan,
+                         "hi": float(np.quantile(v, 1 - alpha / 2)) if len(v) else np.nan,
+                         "p_null": float((v <= null).mean()) if null is not None and len(v) else np.nan,
+                         "n_resamples": len(s), "block": b})
+    return pd.DataFrame(rows)
+
+def compare_table(names, samples):
+    """첫 run 의 block 샘플 대비 P(run 이 더 좋음) — 독립 리샘플끼리 같은 인덱스로 짝지음"""
+    ref = samples.get((0, "block"))
+    if ref is None:
+        return pd.DataFrame()
+    rows = []
+    for (r, method), (S, _) in sorted(samples.items()):
+        if method != "block" or r == 0:
+            continue
+        m = min(len(S), len(ref[0]))
+        for j, k in enumerate(METRICS):
+            a, b = S[:m, j], ref[0][:m, j]
+            ok = ~(np.isnan(a) | np.isnan(b))
+            better = (a[ok] < b[ok]) if k == "mdd" else (a[ok] > b[ok])
+            rows.append({"run_id": names[r], "ref_run_id": names[0], "metric": k,
+                         "p_better": float(better.mean()) if ok.any() else np.nan,
+                         "mean_diff": float((a[ok] - b[ok]).mean()) if ok.any() else np.nan, "n_pairs": int(ok.sum())})
+    return pd.DataFrame(rows)
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--runs", nargs="*", default=[], help="run dirs or bundle zips (first one is the comparison reference)")
+    ap.add_argument("--root", default="", help="also take every bundle zip under this root")
+    ap.add_argument("--data-root", default=None, help="for runs whose trades.csv has no pnl column")
+    ap.add_argument("--csv-glob", default=None)
+    ap.add_argument("--method", nargs="+", choices=list(METHOD_METRICS), default=list(METHOD_METRICS))
+    ap.add_argument("--n-resamples", type=int, default=2000)
+    ap.add_argument("--block", type=int, default=None, help="block length (default: n_trades^(1/3))")
+    ap.add_argument("--alpha", type=float, default=0.05)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--workers", type=int, default=None)
+    ap.add_argument("--out-dir", default=".")
+    args = ap.parse_args()
+
+    srcs = list(args.runs)
+    if args.root:
+        srcs += sorted(glob.glob(os.path.join(args.root, "**", "*.zip"), recursive=True))
+    if not srcs:
+        raise SystemExit("[bootstrap_ci] --runs or --root required")
+    t0 = time.time()
+    names, runs, failed = [], [], []
+    for s in srcs:
+        try:
+            runs.append(load_pnl(s, args.data_root, args.csv_glob)); names.append(run_name(s))
+        except Exception as e:
+            failed.append({"src": s, "error": f"{type(e).__name__}: {e}"})
+            print(f"[bootstrap_ci] skip {s}: {e}")
+    samples = bootstrap(runs, args.method, args.n_resamples, args.block, args.seed, args.workers)
+    os.makedirs(args.out_dir, exist_ok=True)
+    ci = ci_table(names, runs, samples, args.alpha)
+    ci.to_csv(os.path.join(args.out_dir, "bootstrap_ci.csv"), index=False)
+    cmp_ = compare_table(names, samples)
+    if len(cmp_):
+        cmp_.to_csv(os.path.join(args.out_dir, "bootstrap_compare.csv"), index=False)
+    print(f"[bootstrap_ci] {len(runs)} runs x {args.n_resamples} resamples in {time.time()-t0:.2f}s -> {args.out_dir}/bootstrap_ci.csv")
+    if len(ci):
+        print(ci[ci["method"] == "block"].to_string(index=False))
+    if len(cmp_):
+        print(cmp_.to_string(index=False))
+    if failed:
+        print(json.dumps(failed, ensure_ascii=False, indent=2))
+        raise SystemExit(15)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+# ci/codepack.py
+# 목적: strategy 코드팩 zip을 zip 해시별 디렉터리에 한 번만 풀어서 재사용
+#  - <cache>/<sha256[:16]>/ 에 풀려 있으면 extractall 생략
+#  - 임시 디렉터리에 풀고 rename → 동시에 뜬 워커끼리도 안전
+#  - strategy/, strategy/v2/, backtest/ 에 __init__.py 보장
+
+import os, hashlib, shutil, tempfile, zipfile
+
+CACHE_ENV = "MR4T_CODEPACK_CACHE"
+PKG_DIRS = ["strategy", os.path.join("strategy", "v2"), "backtest"]
+_DIGEST = {}  # (abspath, size, mtime_ns) -> sha256
+
+def cache_root(workspace="."):
+    return os.environ.get(CACHE_ENV) or os.path.join(os.path.abspath(workspace), ".codepack_cache")
+
+def zip_digest(path):
+    st = os.stat(path)
+    k = (os.path.abspath(path), st.st_size, st.st_mtime_ns)
+    if k not in _DIGEST:
+        h = hashlib.sha256()
+        with open(path, "rb") as f:
+            for b in iter(lambda: f.read(1 << 20), b""):
+                h.update(b)
+        _DIGEST[k] = h.hexdigest()
+    return _DIGEST[k]
+
+def find_zips(workspace="."):
+    return sorted(os.path.join(workspace, fn) for fn in os.listdir(workspace)
+                  if fn.endswith(".zip") and "strategy" in fn.lower())
+
+def _ensure_packages(root):
+    for pkg in PKG_DIRS:
+        p = os.path.join(root, pkg)
+        if os.path.isdir(p):
+            ip = os.path.join(p, "__init__.py")
+            if not os.path.exists(ip):
+                with open(ip, "w", encoding="utf-8") as f: f.write("# auto-generated\n")
+
+def extract(zip_path, root=None):
+    """zip_path를 해시 디렉터리에 풀고 그 경로를 반환 (이미 있으면 그대로 반환)"""
+    root = root or cache_root(os.path.dirname(os.path.abspath(zip_path)))
+    d = os.path.join(root, zip_digest(zip_path)[:16])
+    if os.path.isdir(d):
+        return d
+    os.makedirs(root, exist_ok=True)
+    tmp = tempfile.mkdtemp(prefix=".extract.", dir=root)
+    try:
+        with zipfile.ZipFile(zip_path, "r") as z: z.extractall(tmp)
+        _ensure_packages(tmp)
+        try: os.rename(tmp, d)
+        except OSError: shutil.rmtree(tmp, ignore_errors=True)  # 다른 워커가 먼저 완료
+    except Exception:
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+    print(f"[codepack] extracted {os.path.basename(zip_path)} -> {d}")
+    return d
@@ -0,0 +1,101 @@
+# ci/cost_surface.py
+# 목적: 거래 1회 결과(trades.csv)로 수수료 x 슬리피지(bps) 그리드 전체의 비용 반영 성과를 한 번에 계산
+#  - backtest_grid_tuned10_48.yml 의 인라인 비용 보정(entries * 2*(fee+slip)/1e4, 한 쌍만)을 대체
+#  - 모델
+#      per_side     : 거래당 왕복 2*(fee+slip) bps 를 수익률(pnl/entry_price)에서 차감 (기존 workflow 와 같은 단위)
+#      proportional : 실제 체결가 기준 (entry_price + exit_price) * (fee+slip)/1e4 를 pnl_close_based(가격 단위)에서 차감
+#  - 거래 x 비용 그리드를 브로드캐스팅으로 계산 (거래가 많으면 chunk), cum_pnl 은 합만으로 바로 계산
+#  - 페어링/가격 조인은 metrics_enforcer 와 동일 (FIFO ENTRY/EXIT, 캐시된 close 에 searchsorted)
+# Output: <outdir>/summary_cost_surface.csv
+#   model, units, fee_bps, slip_bps, roundtrip_bps, n_trades, n_unpriced, cum_pnl, avg_pnl, win_rate, profit_factor, cum_pnl_gross
+#   (n_unpriced: 진입/청산 시각의 close 가 없어 빠진 거래 수 — n_trades 에는 포함 안 됨)
+# Usage:
+#   python ci/cost_surface.py --outdir _out_4u/run --data-root tmp/data --csv-glob "**/*ETHUSDT*1min*.csv" \
+#       --fee-bps 0 2 4 5 7.5 10 --slip-bps 0 1 2 5
+
+import argparse, os
+import numpy as np
+import pandas as pd
+import metrics_enforcer as me
+import artifacts
+
+MODELS = ("per_side", "proportional")
+CHUNK_CELLS = 20_000_000  # 거래 수 x 비용 조합 수 상한 (한 번에 만드는 행렬 크기)
+
+def trade_prices(outdir, data_root, csv_glob):
+    """trades(.npz/.csv) → DataFrame(entry_price, exit_price, side, pnl)  (pnl = (exit - entry) * side)
+    가격을 못 붙인 거래는 제외 — 개수는 .attrs["n_unpriced"]"""
+    tr = artifacts.read_table(outdir, "trades")
+    if tr is None:
+        raise FileNotFoundError(f"[cost_surface] no trades.csv/.npz in {outdir}")
+    pairs, _ = me._pair_trades(tr)
+    data = me._load_close(data_root, csv_glob)
+    out = pd.DataFrame({"entry_price": me._lookup(*data, pairs["entry_time"]),
+                        "exit_price": me._lookup(*data, pairs["exit_time"]),
+                        "side": pairs["side"].to_numpy(float)})
+    out["pnl"] = (out["exit_price"] - out["entry_price"]) * out["side"]
+    priced = out.dropna().reset_index(drop=True)
+    priced.attrs["n_unpriced"] = n_unpriced = len(out) - len(priced)  # 진입/청산 시각의 close 가 시세에 없음
+    if n_unpriced:
+        print(f"[cost_surface] dropped {n_unpriced} unpriced trades (of {len(out)}; no close at entry/exit time)")
+    return priced
+
+def _stats(gross, w, rt):
+    """gross (n,) 거래별 성과, w (n,) 비용 가중치, rt (g,) 왕복 비용률 → 조합별 win_rate / profit_factor"""
+    g = len(rt)
+    wins = np.zeros(g); pos = np.zeros(g); neg = np.zeros(g)
+    step = max(1, CHUNK_CELLS // max(g, 1))
+    for i in range(0, len(gross), step):
+        adj = gross[None, i:i+step] - rt[:, None] * w[None, i:i+step]
+        wins += (adj > 0).sum(axis=1)
+        pos += np.where(adj > 0, adj, 0.0).sum(axis=1)
+        neg += np.where(adj < 0, adj, 0.0).sum(axis=1)
+    return wins, pos, neg
+
+def cost_surface(trades, fee_bps, slip_bps, models=MODELS):
+    fee, slip = np.meshgrid(np.asarray(fee_bps, float), np.asarray(slip_bps, float), indexing="ij")
+    fee, slip = fee.ravel(), slip.ravel()
+    n = len(trades)
+    frames = []
+    for model in models:
+        if model == "per_side":
+            gross = (trades["pnl"] / trades["entry_price"].where(trades["entry_price"] != 0)).fillna(0.0).to_numpy(float)
+            w = np.full(n, 2.0)                   # 진입 + 청산, 명목 1 기준
+            rt = (fee + slip) / 1e4
+            units = "return"
+        elif model == "proportional":
+            gross = trades["pnl"].to_numpy(float)
+            w = (trades["entry_price"] + trades["exit_price"]).to_numpy(float)  # 양쪽 체결 명목
+            rt = (fee + slip) / 1e4
+            units = "price"
+        else:
+            raise ValueError(f"[cost_surface] unknown model: {model}")
+        cum = gross.sum() - rt * w.sum()
+        wins, pos, neg = _stats(gross, w, rt)
+        frames.append(pd.DataFrame({
+            "model": model, "units": units, "fee_bps": fee, "slip_bps": slip, "roundtrip_bps": 2.0 * (fee + slip),
+            "n_trades": n, "n_unpriced": int(trades.attrs.get("n_unpriced", 0)), "cum_pnl": cum, "avg_pnl": cum / n if n else np.nan,
+            "win_rate": wins / n if n else np.nan,
+            "profit_factor": np.where(neg != 0, pos / np.where(neg != 0, -neg, 1.0), np.nan),
+            "cum_pnl_gross": float(gross.sum()),
+        }))
+    return pd.concat(frames, ignore_index=True)
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--outdir", required=True, help="run directory with trades.csv")
+    ap.add_argument("--data-root", required=True)
+    ap.add_argument("--csv-glob", required=True)
+    ap.add_argument("--fee-bps", nargs="+", type=float, default=[0, 2, 4, 5, 7.5, 10])
+    ap.add_argument("--slip-bps", nargs="+", type=float, default=[0, 1, 2, 5])
+    ap.add_argument("--model", nargs="+", choices=MODELS, default=list(MODELS))
+    ap.add_argument("--out", default="", help="default: <outdir>/summary_cost_surface.csv")
+    args = ap.parse_args()
+    trades = trade_prices(args.outdir, args.data_root, args.csv_glob)
+    df = cost_surface(trades, args.fee_bps, args.slip_bps, args.model)
+    out = args.out or os.path.join(args.outdir, "summary_cost_surface.csv")
+    df.to_csv(out, index=False)
+    print(f"[cost_surface] {len(trades)} trades x {len(df)} cost cells -> {out}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+# ci/data_cache.py
+# 목적: 1분봉 시세 CSV를 한 번만 파싱해 컬럼별 .npy(memmap) 캐시로 재사용
+#  - 캐시 키: 절대경로 + 파일 크기 + mtime  (원본이 바뀌면 자동으로 새 엔트리)
+#  - open_time은 int64 epoch(ns), 나머지 숫자 컬럼은 float64
+#  - 동시에 여러 워커가 만들어도 안전하도록 임시 디렉터리에 쓰고 rename
+# Usage:
+#   python ci/data_cache.py --data-root . --csv-glob "**/*ETHUSDT*1min*.csv"
+
+import os, json, glob, hashlib, shutil, tempfile, argparse
+import numpy as np
+
+CACHE_ENV = "MR4T_DATA_CACHE"
+DT_CANDS = ("open_time", "timestamp", "time", "datetime", "date")
+CLOSE_CANDS = ("close", "close_price", "c")
+_META = {}  # in-process memo: cache key -> meta
+
+def cache_root():
+    return os.environ.get(CACHE_ENV) or os.path.join(os.getcwd(), ".data_cache")
+
+def match_csvs(data_root, pattern):
+    return sorted(glob.glob(os.path.join(data_root or ".", pattern), recursive=True))
+
+def find_col(cols, cands):
+    low = [str(c).lower() for c in cols]
+    for cand in cands:
+        if cand in low: return cols[low.index(cand)]
+    return None
+
+def fingerprint(path):
+    st = os.stat(path)
+    return {"path": os.path.abspath(path), "size": int(st.st_size), "mtime_ns": int(st.st_mtime_ns)}
+
+def cache_key(path):
+    fp = fingerprint(path)
+    raw = f"{fp['path']}|{fp['size']}|{fp['mtime_ns']}"
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:16]
+
+def to_epoch_ns(values):
+    """open_time 값(int/ISO 문자열/datetime)을 UTC 기준 int64 ns 배열로 정규화"""
+    import pandas as pd
+    s = pd.to_datetime(pd.Series(values), errors="coerce")
+    if getattr(s.dt, "tz", None) is not None:
+        s = s.dt.tz_convert("UTC").dt.tz_localize(None)
+    s = s.astype("datetime64[ns]")
+    return s.to_numpy().view("int64").copy()  # NaT -> int64 min
+
+def to_datetime_ns(values):
+    return to_epoch_ns(values).view("datetime64[ns]")
+
+def _build(path, dst):
+    import pandas as pd
+    df = pd.read_csv(path)
+    head = pd.read_csv(path, nrows=5)
+    cols = [str(c) for c in df.columns]
+    dcol = find_col(cols, DT_CANDS)
+    files, skipped = {}, []
+    if dcol is not None:
+        np.save(os.path.join(dst, "open_time.npy"), to_epoch_ns(df[dcol]))
+        files["open_time"] = "open_time.npy"
+    for i, c in enumerate(cols):
+        if c == dcol: continue
+        v = pd.to_numeric(df[c], errors="coerce")
+        if v.notna().sum() == 0 and df[c].notna().sum() > 0:
+            skipped.append(c); continue  # symbol/exchange 같은 문자열 컬럼
+        fn = f"col_{i}.npy"
+        np.save(os.path.join(dst, fn), v.to_numpy(dtype=np.float64, na_value=np.nan))
+        files[c] = fn
+    return write_meta(dst, path, len(df), cols, dcol, files, skipped, head)
+
+def write_meta(dst, path, rows, cols, dcol, files, skipped, head, **extra):
+    meta = dict(fingerprint(path))
+    meta.update({
+        "rows": int(rows), "columns": cols, "time_col": dcol,
+        "close_col": find_col(cols, CLOSE_CANDS), "files": files, "skipped": skipped,
+        "head": json.loads(head.head(3).to_json(orient="records")),
+    })
+    meta.update(extra)
+    with open(os.path.join(dst, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False, indent=2)
+    return meta
+
+def publish(path, builder, replace=False):
+    """builder(tmp_dir) -> meta 로 캐시 엔트리를 만들고 원자적으로 게시 (replace=True면 기존 엔트리 교체)"""
+    key = cache_key(path)
+    root = cache_root()
+    d = os.path.join(root, key)
+    os.makedirs(root, exist_ok=True)
+    tmp = tempfile.mkdtemp(prefix=f".{key}.", dir=root)
+    try:
+        builder(tmp)
+        if replace and os.path.isdir(d):
+            old = tempfile.mkdtemp(prefix=f".{key}.old.", dir=root)
+            os.rename(d, os.path.join(old, "x"))
+            shutil.rmtree(old, ignore_errors=True)
+        try: os.rename(tmp, d)
+        except OSError: shutil.rmtree(tmp, ignore_errors=True)  # 다른 워커가 먼저 만듦
+    except Exception:
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+    _META.pop(key, None)
+    return d
+
+def ensure(path):
+    """Return the cache meta for `path`, converting the CSV on first use."""
+    key = cache_key(path)
+    if key in _META: return _META[key]
+    d = os.path.join(cache_root(), key)
+    meta_p = os.path.join(d, "meta.json")
+    if not os.path.exists(meta_p):
+        publish(path, lambda tmp: _build(path, tmp))
+        print(f"[data_cache] built {key} <- {os.path.basename(path)}")
+    with open(meta_p, "r", encoding="utf-8") as f:
+        meta = json.load(f)
+    meta["dir"] = d
+    _META[key] = meta
+    return meta
+
+def load_columns(path, columns=None):
+    """{name: np.ndarray(memmap)} — columns=None 이면 캐시된 전체 컬럼"""
+    meta = ensure(path)
+    names = list(meta["files"]) if columns is None else list(columns)
+    out = {}
+    for c in names:
+        fn = meta["files"].get(c)
+        if fn is None:
+            raise KeyError(f"[data_cache] column not cached: {c} (have={list(meta['files'])[:12]})")
+        out[c] = np.load(os.path.join(meta["dir"], fn), mmap_mode="r")
+    return out
+
+def load_frame(path, columns=None):
+    """DataFrame(open_time=datetime64[ns], ...) built from the cached arrays."""
+    import pandas as pd
+    meta = ensure(path)
+    names = [c for c in meta["files"] if c != "open_time"] if columns is None else [c for c in columns if c != "open_time"]
+    arrs = load_columns(path, names)
+    df = pd.DataFrame({c: np.asarray(a) for c, a in arrs.items()})
+    if "open_time" in meta["files"]:
+        ot = load_columns(path, ["open_time"])["open_time"]
+        df.insert(0, "open_time", np.asarray(ot).view("datetime64[ns]"))
+    return df
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--data-root", default=".")
+    ap.add_argument("--csv-glob", required=True)
+    args = ap.parse_args()
+    paths = match_csvs(args.data_root, args.csv_glob)
+    if not paths:
+        print("[data_cache] No CSV matched"); raise SystemExit(11)
+    for p in paths:
+        m = ensure(p)
+        print(f"[data_cache] {p}: rows={m['rows']} cols={len(m['files'])} dir={m['dir']}")
+
+if __name__ == "__main__":
+    main()
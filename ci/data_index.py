@@ -0,0 +1,182 @@
+# ci/data_index.py
+# 목적: 데이터 CSV 마다 1회 만드는 사이드카 인덱스 (<file>.csv.idx.json)
+#  - 컬럼 목록, 행 수, 첫/마지막 open_time, head 3행, 원본 fingerprint(크기 + mtime)
+#  - sparse 인덱스: stride 행마다 [row, open_time(ns), 바이트 오프셋]
+#    → 프로브(diag_probe / precheck_contract / preflight_strict)는 사이드카만 읽음 (CSV 전체 파싱 없음)
+#    → read_range(path, start, end) 는 해당 구간 바이트만 읽음 (5년치 파일에서 한 분기만 필요할 때)
+#  - 만들 때도 CSV 파싱 없이 바이트 블록에서 줄바꿈 위치만 찾고, 샘플 행의 시간 필드만 해석
+#  - 원본 옆에 쓸 수 없으면 data_cache 루트 아래 index/<cache_key>.idx.json
+#  - 원본이 바뀌면 (크기/mtime 다름) 다음 조회에서 다시 만듦, 쓰기는 tmp + os.replace
+# Usage:
+#   python ci/data_index.py --data-root . --csv-glob "**/*ETHUSDT*1min*.csv"
+#   python ci/data_index.py --data-root . --csv-glob "**/*ETHUSDT*1min*.csv" --start 2023-04-01 --end 2023-07-01
+
+import argparse, os, io, json, tempfile
+import numpy as np
+import data_cache
+
+SUFFIX = ".idx.json"
+STRIDE = 4096
+BLOCK = 64 << 20
+VERSION = 1
+
+def sidecar_path(path):
+    return path + SUFFIX
+
+def _fallback_path(path):
+    return os.path.join(data_cache.cache_root(), "index", data_cache.cache_key(path) + SUFFIX)
+
+def _line_starts(path):
+    """데이터 행 시작 바이트 오프셋 (헤더 제외), 헤더 바이트, 파일 크기"""
+    size = os.path.getsize(path)
+    parts, base = [], 0
+    with open(path, "rb") as f:
+        while True:
+            buf = f.read(BLOCK)
+            if not buf:
+                break
+            parts.append(np.flatnonzero(np.frombuffer(buf, dtype=np.uint8) == 10).astype(np.int64) + base + 1)
+            base += len(buf)
+        f.seek(0)
+        header = f.readline()
+        nl = np.concatenate(parts) if parts else np.empty(0, np.int64)
+        starts = nl[nl < size]  # 마지막 줄바꿈 뒤 (EOF) 는 행이 아님
+        while len(starts):  # 끝의 빈 줄 제외
+            f.seek(int(starts[-1]))
+            if f.read().strip():
+                break
+            starts = starts[:-1]
+    return starts, header, size
+
+def _field(path, offsets, col):
+    out = []
+    with open(path, "rb") as f:
+        for off in offsets:
+            f.seek(int(off))
+            out.append(f.readline().decode("utf-8", "replace").rstrip("\r\n").split(",")[col].strip().strip('"'))
+    return out
+
+def build(path, stride=STRIDE):
+    import pandas as pd
+    starts, header, size = _line_starts(path)
+    cols = [c.strip().strip('"') for c in header.decode("utf-8-sig").rstrip("\r\n").split(",")]
+    dcol = data_cache.find_col(cols, data_cache.DT_CANDS)
+    rows = len(starts)
+    head = pd.read_csv(path, nrows=3)
+    idx = {"version": VERSION, **data_cache.fingerprint(path), "rows": int(rows), "columns": cols, "time_col": dcol,
+           "stride": int(stride), "data_offset": len(header), "head": json.loads(head.to_json(orient="records")),
+           "first_open_time": None, "last_open_time": None, "first_ns": None, "last_ns": None,
+           "sorted": None, "index": []}
+    if dcol is None or rows == 0:
+        return idx
+    sample = np.unique(np.r_[np.arange(0, rows, int(stride)), rows - 1])
+    ns = data_cache.to_epoch_ns(_field(path, starts[sample], cols.index(dcol)))
+    idx["index"] = [[int(r), int(t), int(starts[r])] for r, t in zip(sample, ns)]
+    idx["first_ns"], idx["last_ns"] = int(ns[0]), int(ns[-1])
+    idx["first_open_time"], idx["last_open_time"] = (str(pd.Timestamp(int(x))) for x in (ns[0], ns[-1]))
+    idx["sorted"] = bool((np.diff(ns) >= 0).all())  # 샘플 기준 (전 행 검사는 validate_data)
+    return idx
+
+def _write(p, idx):
+    os.makedirs(os.path.dirname(os.path.abspath(p)), exist_ok=True)
+    fd, tmp = tempfile.mkstemp(prefix=".idx.", dir=os.path.dirname(os.path.abspath(p)))
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(idx, f, ensure_ascii=False)
+    os.replace(tmp, p)
+
+def _fresh(p, path):
+    try:
+        with open(p, "r", encoding="utf-8") as f:
+            idx = json.load(f)
+    except (OSError, ValueError):
+        return None
+    fp = data_cache.fingerprint(path)
+    ok = idx.get("version") == VERSION and idx.get("size") == fp["size"] and idx.get("mtime_ns") == fp["mtime_ns"]
+    return idx if ok else None
+
+def load(path, stride=STRIDE, rebuild=False):
+    """사이드카 인덱스 dict (없거나 낡았으면 만들어서 기록)"""
+    for p in (sidecar_path(path), _fallback_path(path)):
+        idx = None if rebuild else _fresh(p, path)
+        if idx is not None:
+            return idx
+    idx = build(path, stride)
+    try:
+        _write(sidecar_path(path), idx)
+    except OSError:  # 읽기 전용 데이터 디렉터리
+        _write(_fallback_path(path), idx)
+    print(f"[data_index] built {os.path.basename(path)}: rows={idx['rows']} stride={stride}")
+    return idx
+
+def probe(path):
+    """프로브용 요약 — columns / rows / head / 시간 범위"""
+    idx = load(path)
+    return {k: idx[k] for k in ("columns", "rows", "head", "time_col", "first_open_time", "last_open_time", "first_ns", "last_ns")}
+
+def byte_range(idx, start=None, end=None):
+    """[start, end) 를 포함하는 (row_lo, off_lo, off_hi) — 샘플 경계까지 넓힌 구간 (off_hi None = EOF)"""
+    pts = idx["index"]
+    if not pts:
+        return 0, idx["data_offset"], None
+    ns = np.array([p[1] for p in pts], dtype=np.int64)
+    lo = 0
+    if start is not None:
+        k = int(np.searchsorted(ns, _ns(start), side="left")) - 1  # start 보다 확실히 앞선 마지막 샘플
+        lo = max(k, 0)
+    row_lo, off_lo = (pts[lo][0], pts[lo][2]) if lo > 0 else (0, idx["data_offset"])
+    off_hi = None
+    if end is not None:
+        k = int(np.searchsorted(ns, _ns(end), side="left"))  # end 이상인 첫 샘플부터는 필요 없음
+        if k < len(pts):
+            off_hi = pts[k][2]
+    return row_lo, off_lo, off_hi
+
+def _ns(t):
+    return int(data_cache.to_epoch_ns([t])[0])
+
+def read_range(path, start=None, end=None, usecols=None):
+    """open_time in [start, end) 행만 읽은 DataFrame (index = 원본 데이터 행 번호, 시간 컬럼은 원문 그대로)"""
+    import pandas as pd
+    idx = load(path)
+    if idx["time_col"] is None or not idx.get("sorted"):
+        df = pd.read_csv(path, usecols=usecols)  # 정렬 안 된 파일은 오프셋으로 자를 수 없음
+        row_lo = 0
+    else:
+        row_lo, off_lo, off_hi = byte_range(idx, start, end)
+        with open(path, "rb") as f:
+            header = f.read(idx["data_offset"])
+            f.seek(off_lo)
+            body = f.read() if off_hi is None else f.read(off_hi - off_lo)
+        df = pd.read_csv(io.BytesIO(header + body), usecols=usecols)
+    df.index = pd.RangeIndex(row_lo, row_lo + len(df))
+    tcol = idx["time_col"]
+    if tcol is not None and tcol in df.columns and (start is not None or end is not None):
+        t = data_cache.to_epoch_ns(df[tcol])
+        keep = np.ones(len(df), dtype=bool)
+        if start is not None: keep &= t >= _ns(start)
+        if end is not None: keep &= t < _ns(end)
+        df = df[keep]
+    return df
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--data-root", default=".")
+    ap.add_argument("--csv-glob", required=True)
+    ap.add_argument("--stride", type=int, default=STRIDE, help="rows between sparse index points")
+    ap.add_argument("--rebuild", action="store_true")
+    ap.add_argument("--start", default=None, help="with --end: print the rows covering [start, end)")
+    ap.add_argument("--end", default=None)
+    args = ap.parse_args()
+    paths = data_cache.match_csvs(args.data_root, args.csv_glob)
+    if not paths:
+        print("[data_index] No CSV matched"); raise SystemExit(11)
+    for p in paths:
+        idx = load(p, args.stride, args.rebuild)
+        msg = f"[data_index] {p}: rows={idx['rows']} {idx['first_open_time']} .. {idx['last_open_time']} points={len(idx['index'])}"
+        if args.start or args.end:
+            df = read_range(p, args.start, args.end, usecols=[idx["time_col"]] if idx["time_col"] else None)
+            msg += f" | [{args.start}, {args.end}): " + (f"rows {df.index[0]}..{df.index[-1]} ({len(df)})" if len(df) else "no rows")
+        print(msg)
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,7 @@
 # ci/diag_probe.py (kept for reference if you want to run standalone)
 # (Embedded version already runs from wfo_entry.py)
-import argparse, glob, os, json, pandas as pd
+import argparse, glob, os, json
+import data_index
 def main():
     ap = argparse.ArgumentParser()
     ap.add_argument("--data-root", required=True)
@@ -12,7 +13,10 @@ def main():
     paths = sorted(glob.glob(pat, recursive=True))
     rep = {"pattern": pat, "n_files": len(paths), "samples": []}
     for p in paths[:args.limit]:
-        try: df = pd.read_csv(p, nrows=5); rep["samples"].append({"path": p, "cols": list(df.columns)})
+        try:
+            m = data_index.probe(p)
+            rep["samples"].append({"path": p, "cols": m["columns"], "rows": m["rows"],
+                                   "first_open_time": m["first_open_time"], "last_open_time": m["last_open_time"]})
         except Exception as e: rep["samples"].append({"path": p, "error": str(e)})
     os.makedirs(args.outdir, exist_ok=True)
     with open(os.path.join(args.outdir,"diag_probe.json"),"w",encoding="utf-8") as f:
@@ -0,0 +1,200 @@
+# ci/exit_grid.py
+# 목적: 진입 신호는 고정, 청산 파라미터 조합 여러 개를 한 번에 시뮬레이션 (조합마다 전략 전체 재실행 없음)
+#  - 입력: 러너 1회 실행 결과의 preds_test.csv (entry_flag 또는 gatep/p_thr) + 시세 OHLC (data_cache)
+#  - ATR 은 regime.atr 와 같은 식 (true range 의 EMA, alpha = 2/(atr_n+1), 첫 값으로 시작)
+#  - 청산 규칙은 코드팩 state.run_state_engine 과 동일 (TP/SL/BE/trail/min_hold/max_hold, long-only)
+#    조합별 numba 커널: 포지션 없을 때는 다음 진입 신호로 바로 점프 → 비용 ≈ 조합 수 x 거래 수 x 보유 바
+#  - cooldown_bars 도 그리드 가능: entry_raw = gatep >= p_thr 에 apply_cooldown 을 다시 적용
+#    (cooldown 은 청산과 무관하게 원시 신호에만 걸리므로 러너 결과와 같음)
+#  - 지정 안 한 축은 --params 의 exit / entry 값 사용
+# Output: exit_grid.csv  (조합당 1행: tp_atr, sl_atr, trail_atr, be_after_atr, min_hold, max_hold, cooldown_bars,
+#                         n_trades, win_rate, cum_pnl, avg_pnl, profit_factor, sharpe, mdd, n_tp, n_sl, n_time, avg_hold, open_at_end)
+# Usage:
+#   python ci/exit_grid.py --params conf/params.v2.yml --preds _out_4u/run/preds_test.csv \
+#       --data-root tmp/data --csv-glob "**/*ETHUSDT*1min*.csv" \
+#       --tp-atr 2.0 2.1 2.2 --sl-atr 0.45 0.50 --min-hold 11 12 --cooldown 32 34 --out exit_grid.csv
+
+import argparse, os, time, itertools
+import numpy as np
+import pandas as pd
+import wfo_entry, data_cache, artifacts
+
+try:
+    from numba import njit, prange
+except ImportError:
+    njit = None; prange = range
+
+AXES = ["tp_atr", "sl_atr", "trail_atr", "be_after_atr", "min_hold", "max_hold"]
+DEFAULTS = {"tp_atr": 0.8, "sl_atr": 0.5, "trail_atr": 1.2, "be_after_atr": 0.5, "min_hold": 3, "max_hold": 60}  # StrategyV2.run 기본값
+STATS = ["n_trades", "wins", "pos", "neg", "sum", "sumsq", "mdd", "n_tp", "n_sl", "n_time", "hold", "open_at_end"]
+
+def _ema_tr(high, low, close, n):
+    out = np.empty(close.shape[0], dtype=np.float64)
+    alpha = 2.0 / (n + 1.0)
+    s = 0.0
+    for i in range(close.shape[0]):
+        pc = close[i - 1] if i > 0 else close[0]
+        tr = max(high[i] - low[i], abs(high[i] - pc), abs(low[i] - pc))
+        s = tr if (i == 0 or n <= 1) else (alpha * tr + (1.0 - alpha) * s)
+        out[i] = s
+    return out
+
+def _cooldown(raw, cooldown):
+    out = np.zeros(raw.shape[0], dtype=np.int8)
+    last = -10**9
+    for i in range(raw.shape[0]):
+        if raw[i] and (i - last) > cooldown:
+            out[i] = 1; last = i
+    return out
+
+def _simulate(close, high, low, atr, sig_idx, P):
+    """P: (m, 6) = AXES 순서. 반환 (m, len(STATS))"""
+    n = close.shape[0]; m = P.shape[0]; ns = sig_idx.shape[0]
+    out = np.zeros((m, 12), dtype=np.float64)
+    for c in prange(m):
+        tp_a = P[c, 0]; sl_a = P[c, 1]; tr_a = P[c, 2]; be_a = P[c, 3]
+        min_h = int(P[c, 4]); max_h = int(P[c, 5])
+        cnt = 0; wins = 0; pos = 0.0; neg = 0.0; tot = 0.0; sq = 0.0
+        peak = 0.0; mdd = 0.0; n_tp = 0; n_sl = 0; n_time = 0; hold = 0; open_end = 0
+        k = 0
+        while k < ns:
+            e = sig_idx[k]
+            entry = close[e]; trail = entry - tr_a * atr[e]
+            bars = 0; ex = 0; px = 0.0; j = e + 1
+            while j < n:
+                bars += 1
+                a = atr[j]
+                tp = entry + tp_a * a
+                sl = entry - sl_a * a
+                if close[j] - entry >= be_a * a:
+                    sl = max(sl, entry)
+                trail = max(trail, high[j] - tr_a * a)
+                sl = max(sl, trail)
+                if bars >= max_h:
+                    ex = 4; px = close[j]
+                elif bars >= min_h:
+                    if low[j] <= sl:
+                        ex = 2; px = sl
+                    elif high[j] >= tp:
+                        ex = 1; px = tp
+                if ex != 0:
+                    break
+                j += 1
+            if ex == 0:
+                open_end = 1
+                break
+            r = (px - entry) / max(entry, 1e-12)
+            cnt += 1; tot += r; sq += r * r; hold += bars
+            if r > 0:
+                wins += 1; pos += r
+            elif r < 0:
+                neg += r
+            peak = max(peak, tot); mdd = max(mdd, peak - tot)
+            if ex == 1: n_tp += 1
+            elif ex == 2: n_sl += 1
+            else: n_time += 1
+            while k < ns and sig_idx[k] <= j:  # 청산 바에서는 재진입 없음 → 다음 신호는 j 이후
+                k += 1
+        out[c, 0] = cnt; out[c, 1] = wins; out[c, 2] = pos; out[c, 3] = neg; out[c, 4] = tot; out[c, 5] = sq
+        out[c, 6] = mdd; out[c, 7] = n_tp; out[c, 8] = n_sl; out[c, 9] = n_time; out[c, 10] = hold; out[c, 11] = open_end
+    return out
+
+if njit is not None:
+    _ema_tr = njit(cache=True)(_ema_tr)
+    _cooldown = njit(cache=True)(_cooldown)
+    _simulate = njit(cache=True, parallel=True)(_simulate)
+
+def summary_table(combos, stats):
+    s = pd.DataFrame(stats, columns=STATS)
+    n = s["n_trades"].replace(0, np.nan)
+    mean = s["sum"] / n
+    sd = np.sqrt(np.maximum(s["sumsq"] / n - mean ** 2, 0.0))
+    out = pd.DataFrame(combos)
+    out["n_trades"] = s["n_trades"].astype(int)
+    out["win_rate"] = s["wins"] / n
+    out["cum_pnl"] = s["sum"]
+    out["avg_pnl"] = mean
+    out["profit_factor"] = np.where(s["neg"] != 0, s["pos"] / s["neg"].abs().replace(0, np.nan), np.nan)
+    out["sharpe"] = np.where(sd > 0, mean / sd.replace(0, np.nan), np.nan)  # 거래 단위 (연율화 없음)
+    out["mdd"] = s["mdd"]
+    for c in ["n_tp", "n_sl", "n_time", "open_at_end"]:
+        out[c] = s[c].astype(int)
+    out["avg_hold"] = s["hold"] / n
+    return out
+
+def load_inputs(preds_path, data_root, csv_glob, atr_n=14):
+    """시세 (close, high, low, atr) + preds 를 시세 행 순서로 정렬한 DataFrame"""
+    paths = data_cache.match_csvs(data_root, csv_glob)
+    if not paths:
+        raise FileNotFoundError(f"[exit_grid] No CSV matched: {csv_glob}")
+    cols = data_cache.load_columns(paths[0], ["open_time", "close", "high", "low"])
+    close, high, low = (np.ascontiguousarray(cols[c], dtype=np.float64) for c in ("close", "high", "low"))
+    pr = artifacts.read_path(preds_path)
+    n = len(close)
+    if len(pr) != n:  # 러너는 시세 전체 행을 그대로 쓰므로 보통 같음 — 아니면 open_time 으로 맞춤
+        ot = np.asarray(cols["open_time"])
+        idx = np.searchsorted(ot, data_cache.to_epoch_ns(pr["open_time"]))
+        ok = (idx < n) & (ot[np.minimum(idx, n - 1)] == data_cache.to_epoch_ns(pr["open_time"]))
+        full = pd.DataFrame(index=np.arange(n), columns=pr.columns)
+        full.iloc[idx[ok]] = pr[ok].to_numpy()
+        pr = full.infer_objects()
+    return close, high, low, _ema_tr(high, low, close, int(atr_n)), pr
+
+def entry_signals(pr, cooldowns):
+    """{cooldown: 진입 신호 바 인덱스} (cooldowns 없으면 {None: entry_flag 그대로})"""
+    if not cooldowns:
+        if "entry_flag" not in pr.columns:
+            raise ValueError("[exit_grid] preds has no entry_flag column")
+        flag = pd.to_numeric(pr["entry_flag"], errors="coerce").fillna(0).to_numpy()
+        return {None: np.flatnonzero(flag > 0).astype(np.int64)}
+    if not {"gatep", "p_thr"} <= set(pr.columns):
+        raise ValueError("[exit_grid] --cooldown needs gatep/p_thr columns in preds")
+    p = pd.to_numeric(pr["gatep"], errors="coerce").to_numpy(float)
+    thr = pd.to_numeric(pr["p_thr"], errors="coerce").to_numpy(float)
+    with np.errstate(invalid="ignore"):
+        raw = (p >= thr).astype(np.int8)
+    return {int(cd): np.flatnonzero(_cooldown(raw, int(cd))).astype(np.int64) for cd in cooldowns}
+
+def run_grid(close, high, low, atr, signals, grid):
+    """grid: {axis: [values]} (AXES 전부) → 조합별 요약 DataFrame"""
+    rows = []
+    for cd, sig in signals.items():
+        combos = [dict(zip(AXES, v)) for v in itertools.product(*[grid[a] for a in AXES])]
+        P = np.array([[c[a] for a in AXES] for c in combos], dtype=np.float64)
+        t = summary_table(combos, _simulate(close, high, low, atr, sig, P))
+        t.insert(len(AXES), "cooldown_bars", cd)
+        t.insert(len(AXES) + 1, "n_signals", len(sig))
+        rows.append(t)
+    return pd.concat(rows, ignore_index=True)
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--params", "--config", dest="params", required=True, help="base params (unset axes come from exit/entry)")
+    ap.add_argument("--preds", required=True, help="preds_test.csv / preds_test.npz from one runner pass")
+    ap.add_argument("--data-root", default=".")
+    ap.add_argument("--csv-glob", required=True)
+    for a in AXES:
+        ap.add_argument("--" + a.replace("_", "-"), dest=a, nargs="+", type=int if "hold" in a else float)
+    ap.add_argument("--cooldown", nargs="+", type=int, help="re-apply cooldown_bars to gatep >= p_thr (default: use entry_flag)")
+    ap.add_argument("--out", default="exit_grid.csv")
+    args = ap.parse_args()
+
+    params = wfo_entry.load_params(args.params)
+    ex = params.get("exit") or {}
+    grid = {a: getattr(args, a) or [ex.get(a, DEFAULTS[a])] for a in AXES}
+    t0 = time.time()
+    close, high, low, atr, pr = load_inputs(args.preds, args.data_root, args.csv_glob,
+                                             (params.get("regime") or {}).get("atr_n", 14))
+    signals = entry_signals(pr, args.cooldown)
+    if None in signals:  # entry_flag 그대로 → 러너가 쓴 cooldown_bars
+        signals = {int((params.get("entry") or {}).get("cooldown_bars", 5)): signals[None]}
+    t1 = time.time()
+    df = run_grid(close, high, low, atr, signals, grid)
+    df = df.sort_values(["cum_pnl", "profit_factor"], ascending=[False, False], na_position="last")
+    os.makedirs(os.path.dirname(args.out) or ".", exist_ok=True)
+    df.to_csv(args.out, index=False)
+    print(f"[exit_grid] {len(df)} combos over {len(close)} bars: load {t1-t0:.2f}s, simulate {time.time()-t1:.2f}s -> {args.out}")
+    print(df.head(5).to_string(index=False))
+
+if __name__ == "__main__":
+    main()
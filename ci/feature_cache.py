@@ -0,0 +1,144 @@
+# ci/feature_cache.py
+# 목적: 지표 시계열(MACD / regime(ATR, Donchian, 롤링 퍼센타일, VAH/VAL) / orderflow z / structure pivot)을
+#       (데이터 지문, 지표 파라미터, 코드팩 소스) 조합당 1회만 계산해 .npy(memmap)로 재사용
+#  - entry.p_thr / exit.* / cooldown_bars 만 바꾸는 스윕은 지표 재계산 없이 결정 단계만 다시 돌게 됨
+#  - StrategyV2.run 은 그대로 두고, strategy.v2.strategy 모듈이 import 한 지표 함수들을 캐시 래퍼로 교체
+#      fc = feature_cache.attach(strategy_module); fc.data_key = data_cache.cache_key(csv_path)
+#      data_key 가 None 이면 원래 함수로 그대로 통과
+#  - 그룹별 키: regime ← regime.*, macd ← macd.*, oflow ← orderflow.*, structure ← structure.*
+#    (structure 는 데이터에서만 나오는 PDH/PDL 레벨을 쓰므로 regime 파라미터와 무관)
+#  - data_cache 와 같은 방식으로 임시 디렉터리에 쓰고 rename (워커 동시 생성 안전)
+# Usage:
+#   python ci/feature_cache.py --list
+#   python ci/feature_cache.py --clear
+
+import os, json, hashlib, shutil, tempfile, argparse
+import numpy as np
+
+CACHE_ENV = "MR4T_FEATURE_CACHE"
+# strategy.v2.strategy 의 모듈 전역 이름 -> (그룹, 호출 인자에서 파라미터 꺼내기)
+HOOKS = {
+    "regime_analyze":    ("regime",    lambda a, kw: a[1]),
+    "macd":              ("macd",      lambda a, kw: dict(zip(("fast", "slow", "signal"), a[1:]), **kw)),
+    "oflow_features":    ("oflow",     lambda a, kw: a[1]),
+    "structure_signals": ("structure", lambda a, kw: a[2]),
+}
+
+def cache_root():
+    return os.environ.get(CACHE_ENV) or os.path.join(os.getcwd(), ".feature_cache")
+
+def code_digest(module):
+    """코드팩 strategy 패키지 소스(.py) 해시 — 지표 구현이 바뀌면 새 엔트리"""
+    pkg = os.path.dirname(os.path.dirname(os.path.abspath(module.__file__)))  # .../strategy
+    h = hashlib.sha1()
+    for base, dirs, files in os.walk(pkg):
+        dirs[:] = sorted(d for d in dirs if d != "__pycache__")
+        for fn in sorted(files):
+            if fn.endswith(".py"):
+                h.update(fn.encode("utf-8"))
+                with open(os.path.join(base, fn), "rb") as f: h.update(f.read())
+    return h.hexdigest()[:16]
+
+def feature_key(group, data_key, params, code):
+    raw = json.dumps({"group": group, "data": data_key, "params": params or {}, "code": code},
+                     sort_keys=True, default=str)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:16]
+
+def load(group, key):
+    """캐시된 결과 (없으면 None) — dict 또는 tuple, 배열은 read-only memmap"""
+    d = os.path.join(cache_root(), group, key)
+    meta_p = os.path.join(d, "meta.json")
+    if not os.path.exists(meta_p):
+        return None
+    with open(meta_p, "r", encoding="utf-8") as f:
+        meta = json.load(f)
+    arrs = [np.load(os.path.join(d, f"{i:02d}.npy"), mmap_mode="r") for i in range(len(meta["names"]))]
+    if meta["kind"] == "tuple":
+        return tuple(arrs)
+    return dict(zip(meta["names"], arrs))
+
+def store(group, key, value, info=None):
+    """dict/tuple of 1-D 숫자 배열 → 캐시. 저장할 수 없는 값(object dtype 등)이면 False"""
+    kind = "tuple" if isinstance(value, tuple) else "dict"
+    items = list(enumerate(value)) if kind == "tuple" else list(value.items())
+    arrs = [np.asarray(v) for _, v in items]
+    if any(a.dtype.kind not in "biuf" for a in arrs):
+        return False
+    root = os.path.join(cache_root(), group)
+    os.makedirs(root, exist_ok=True)
+    tmp = tempfile.mkdtemp(prefix=f".{key}.", dir=root)
+    try:
+        for i, a in enumerate(arrs):
+            np.save(os.path.join(tmp, f"{i:02d}.npy"), a)
+        with open(os.path.join(tmp, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump({"kind": kind, "names": [str(k) for k, _ in items], "rows": int(len(arrs[0])) if arrs else 0,
+                       **(info or {})}, f, ensure_ascii=False, indent=2, default=str)
+        try: os.rename(tmp, os.path.join(root, key))
+        except OSError: shutil.rmtree(tmp, ignore_errors=True)  # 다른 워커가 먼저 만듦
+    except Exception:
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+    return True
+
+class Attached:
+    """strategy.v2.strategy 모듈의 지표 함수들을 캐시 래퍼로 교체 (detach()로 원복)"""
+
+    def __init__(self, module):
+        self.module = module
+        self.code = code_digest(module)
+        self.data_key = None
+        self.hits = self.misses = 0
+        self._orig = {name: getattr(module, name) for name in HOOKS}
+        for name, (group, pick) in HOOKS.items():
+            setattr(module, name, self._wrap(self._orig[name], group, pick))
+
+    def _wrap(self, fn, group, pick):
+        def cached(*args, **kwargs):
+            if self.data_key is None:
+                return fn(*args, **kwargs)
+            params = pick(args, kwargs)
+            key = feature_key(group, self.data_key, params, self.code)
+            hit = load(group, key)
+            if hit is not None:
+                self.hits += 1
+                return hit
+            self.misses += 1
+            out = fn(*args, **kwargs)
+            store(group, key, out, {"group": group, "data_key": self.data_key, "params": params, "code": self.code})
+            return out
+        cached.__wrapped__ = fn
+        return cached
+
+    def detach(self):
+        for name, fn in self._orig.items():
+            setattr(self.module, name, fn)
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "root": cache_root()}
+
+def attach(module):
+    return Attached(module)
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--list", action="store_true")
+    ap.add_argument("--clear", action="store_true")
+    args = ap.parse_args()
+    root = cache_root()
+    if args.clear:
+        shutil.rmtree(root, ignore_errors=True)
+        print(f"[feature_cache] cleared {root}"); return
+    n = size = 0
+    for base, dirs, files in os.walk(root):
+        if "meta.json" in files:
+            with open(os.path.join(base, "meta.json"), "r", encoding="utf-8") as f:
+                m = json.load(f)
+            b = sum(os.path.getsize(os.path.join(base, fn)) for fn in files)
+            n += 1; size += b
+            if args.list:
+                print(f"[feature_cache] {m.get('group')}/{os.path.basename(base)} rows={m.get('rows')} "
+                      f"data={m.get('data_key')} params={json.dumps(m.get('params'), sort_keys=True)} {b/1e6:.1f}MB")
+    print(f"[feature_cache] {n} entries, {size/1e6:.1f}MB under {root}")
+
+if __name__ == "__main__":
+    main()
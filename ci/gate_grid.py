@@ -0,0 +1,236 @@
+# ci/gate_grid.py
+# 목적: gate.trend / gate.range (a, thr, beta, of_shift) + entry.p_thr (+ cooldown_bars) 조합 전체를 백테스트 N회 대신 데이터 1패스로 평가
+#  - 봉별 입력 (score_tr / score_rg = combine_edges, trend_state, close) 은 코드팩 StrategyV2.run 과 같은 함수로 1회 계산
+#    (RunnerSession 으로 코드팩 import / 시세 로드, --feature-cache 면 지표 시계열 재사용)
+#  - gatep = soft_gate(score; a, thr, beta, of_shift) 를 레짐별 (trend 봉 / range 봉) 로 따로:
+#      (gate 조합 블록 x 봉 블록) 행렬을 CHUNK_CELLS (L2 크기) 단위로 계산 → gatep 합 + p_thr 별 진입 후보 봉 위치 (희소 CSR)
+#    trend 조합과 range 조합은 서로 다른 봉에만 적용되므로 전체 조합 = 두 쪽 결과의 조합 (행렬 계산은 각 쪽 고유 값만큼)
+#  - 조합별: 두 쪽 후보 봉을 병합 → apply_cooldown 과 같은 규칙 → 진입 수, 진입 봉의 forward return > 0 비율 (numba, 조합 병렬)
+#  - 중립 봉 (trend_state 0) 의 gatep 는 0 (러너와 동일) → avg_gatep 는 summary.json 의 avg_gatep 와 같은 정의
+#  - --verify: base params 로 러너 1회 → preds_test 의 entry_flag 합 / gatep 평균과 비교, 다르면 exit 16
+#  - grid 에는 gate.* / entry.p_thr.* / thr / entry.cooldown_bars 만 (지표 파라미터가 바뀌면 입력이 달라짐 → runner_session)
+#      gate.a 처럼 레짐 없이 쓰면 trend / range 양쪽, thr 는 entry.p_thr 양쪽 (wfo_entry.overlay_params 와 같음)
+# Output (--out-dir):
+#   gate_grid.csv   cell, gate.trend.a .. entry.cooldown_bars, raw_signals, entries, avg_gatep, hit_rate_h<H> ...
+#   gate_grid.json  설정, 봉 수, 단계별 시간, verify 결과
+# Usage:
+#   python ci/gate_grid.py --params conf/params.v2.yml --data-root . --csv-glob "**/*ETHUSDT*1min*.csv" \
+#       --grid gate_grid.yml --horizons 9 30 --verify --out-dir _out_gate
+# gate_grid.yml (runner_session.load_grid 형식):
+#   grid:
+#     gate.trend.a: [1.0, 1.3, 1.6]
+#     gate.trend.thr: [0.05, 0.1]
+#     gate.range.beta: [1.2, 1.4]
+#     thr: [0.80, 0.82, 0.84]
+
+import argparse, os, json, time
+import numpy as np
+import pandas as pd
+import wfo_entry, runner_session
+
+try:
+    from numba import njit, prange
+except ImportError:
+    njit = None; prange = range
+
+SIDES = {"trend": 1, "range": -1}  # trend_state 값
+GATE_KEYS = ["a", "thr", "beta", "of_shift"]
+GATE_DEFAULTS = {"trend": {"a": 1.3, "thr": 0.1, "beta": 1.2, "of_shift": 0.0},  # StrategyV2.run 기본값 (블록 자체가 없을 때)
+                 "range": {"a": 1.0, "thr": 0.05, "beta": 1.4, "of_shift": 0.0}}
+SOFT_GATE_DEFAULTS = {"a": 1.0, "thr": 0.0, "beta": 1.0, "of_shift": 0.0}  # 블록은 있는데 키가 빠졌을 때 (entry.soft_gate)
+P_THR_DEFAULTS = {"trend": 0.6, "range": 0.55}
+AXES = ([f"gate.{s}.{k}" for s in SIDES for k in GATE_KEYS] + [f"entry.p_thr.{s}" for s in SIDES] + ["entry.cooldown_bars"])
+CHUNK_CELLS = 1 << 18  # gatep 블록 원소 수 (float64 2 MB)
+COL_BLOCK = 8192       # 봉 방향 블록
+
+def base_values(params):
+    """params 의 gate / entry 값 (없으면 러너 기본값) → {axis: value}"""
+    gp, ep = params.get("gate") or {}, params.get("entry") or {}
+    out = {}
+    for s in SIDES:
+        g = {**SOFT_GATE_DEFAULTS, **(gp.get(s) or {})} if s in gp else GATE_DEFAULTS[s]
+        out.update({f"gate.{s}.{k}": float(g[k]) for k in GATE_KEYS})
+        out[f"entry.p_thr.{s}"] = float((ep.get("p_thr") or {}).get(s, P_THR_DEFAULTS[s]))
+    out["entry.cooldown_bars"] = int(ep.get("cooldown_bars", 5))
+    return out
+
+def resolve(base, overlay):
+    """grid 셀 overlay → 전체 축 값 (gate 축이 아닌 키는 ValueError)"""
+    v = dict(base)
+    for k, x in overlay.items():
+        parts = str(k).split(".")
+        if k == "thr":
+            keys = [f"entry.p_thr.{s}" for s in SIDES]
+        elif len(parts) == 2 and parts[0] == "gate" and parts[1] in GATE_KEYS:
+            keys = [f"gate.{s}.{parts[1]}" for s in SIDES]
+        elif k in AXES:
+            keys = [k]
+        else:
+            raise ValueError(f"[gate_grid] not a gate/entry key: {k} (indicator params change the inputs → use runner_session)")
+        for kk in keys:
+            v[kk] = int(x) if kk == "entry.cooldown_bars" else float(x)
+    return v
+
+def inputs(strategy_mod, df, params):
+    """StrategyV2.run 의 점수 단계 그대로 → (score_tr, score_rg, trend_state, close)"""
+    m = strategy_mod
+    reg = m.regime_analyze(df, params.get("regime", {}))
+    _, _, hist = m.macd(df["close"].to_numpy(float), **params.get("macd", {"fast": 12, "slow": 26, "signal": 9}))
+    ofl = m.oflow_features(df, params.get("orderflow", {}))
+    levels = {"PDH": reg["PDH"], "PDL": reg["PDL"], "VAH": reg["VAH"], "VAL": reg["VAL"]}
+    struct = m.structure_signals(df, levels, params.get("structure", {}))
+    w = params.get("weights", {})
+    edges = [np.asarray(m.combine_edges(mode, hist, ofl["OFI"], ofl["AggBuy"], ofl["AggSell"], struct, reg, w), dtype=np.float64)
+             for mode in SIDES]
+    return edges[0], edges[1], np.asarray(reg["trend_state"]), df["close"].to_numpy(float)
+
+def side_pass(s, G, T):
+    """s (m,) 한 레짐 봉들의 점수, G (u, 4) gate 파라미터, T (t,) p_thr
+    → gatep 합 (u,), CSR (ptr (u*t+1,), pos) — 행 g*t+j = soft_gate(s; G[g]) >= T[j] 인 봉의 s 안 위치 (오름차순)"""
+    u, t, m = len(G), len(T), len(s)
+    sums = np.zeros(u)
+    keys, pos = [], []
+    cb = max(1, min(m, COL_BLOCK))
+    rb = max(1, CHUNK_CELLS // cb)
+    for c0 in range(0, m, cb):  # 봉 블록이 바깥 → 같은 행의 위치가 순서대로 쌓임
+        sc = s[None, c0:c0 + cb]
+        for r0 in range(0, u, rb):
+            a, thr, beta, of = (G[r0:r0 + rb, i:i + 1] for i in range(4))
+            p = np.power(1.0 / (1.0 + np.exp(-(a * (sc - thr) + of))), beta)  # entry.soft_gate 와 같은 연산 순서
+            sums[r0:r0 + rb] += p.sum(axis=1)
+            for j in range(t):
+                rr, cc = np.nonzero(p >= T[j])
+                keys.append(((rr + r0) * t + j).astype(np.int32)); pos.append((cc + c0).astype(np.int32))
+    keys = np.concatenate(keys) if keys else np.empty(0, np.int32)
+    pos = np.concatenate(pos) if pos else np.empty(0, np.int32)
+    order = np.argsort(keys, kind="stable")
+    ptr = np.zeros(u * t + 1, dtype=np.int64)
+    np.cumsum(np.bincount(keys, minlength=u * t), out=ptr[1:])
+    return sums, ptr, pos[order]
+
+def _combine(ptr_t, idx_t, ptr_r, idx_r, C, up):
+    """C (k, 3) = (trend 행, range 행, cooldown) → (k, 2 + H): 후보 수, cooldown 후 진입 수, horizon 별 상승 수"""
+    k = C.shape[0]; H = up.shape[0]
+    out = np.zeros((k, 2 + H), dtype=np.int64)
+    for c in prange(k):
+        a = ptr_t[C[c, 0]]; a1 = ptr_t[C[c, 0] + 1]
+        b = ptr_r[C[c, 1]]; b1 = ptr_r[C[c, 1] + 1]
+        cd = C[c, 2]
+        out[c, 0] = (a1 - a) + (b1 - b)
+        last = -10**9; cnt = 0
+        while a < a1 or b < b1:
+            if b >= b1 or (a < a1 and idx_t[a] < idx_r[b]):
+                i = idx_t[a]; a += 1
+            else:
+                i = idx_r[b]; b += 1
+            if i - last > cd:  # strategy.apply_cooldown 과 같은 규칙
+                last = i; cnt += 1
+                for h in range(H):
+                    out[c, 2 + h] += up[h, i]
+        out[c, 1] = cnt
+    return out
+
+if njit is not None:
+    _combine = njit(cache=True, parallel=True)(_combine)
+
+def fwd_up(close, horizons):
+    """(H, n) int8: close[t+h] > close[t] (끝 h 봉은 0 — metrics_enforcer._fwd_up 과 같음)"""
+    up = np.zeros((len(horizons), len(close)), dtype=np.int8)
+    for i, h in enumerate(horizons):
+        if 0 < h < len(close):
+            up[i, :-h] = close[h:] > close[:-h]
+    return up
+
+def evaluate(score_tr, score_rg, state, close, combos, horizons):
+    """combos: [{axis: value}] → DataFrame (combos 순서), 단계별 시간"""
+    n = len(close)
+    t0 = time.time()
+    side_rows, side_sums, csr = {}, {}, {}
+    for s, code in SIDES.items():
+        bars = np.flatnonzero(state == code)
+        gkeys = sorted({tuple(c[f"gate.{s}.{k}"] for k in GATE_KEYS) for c in combos})
+        pthrs = sorted({c[f"entry.p_thr.{s}"] for c in combos})
+        G, T = np.array(gkeys, dtype=np.float64).reshape(-1, 4), np.array(pthrs, dtype=np.float64)
+        sums, ptr, pos = side_pass((score_tr if s == "trend" else score_rg)[bars], G, T)
+        gi, ti = {g: i for i, g in enumerate(gkeys)}, {p: j for j, p in enumerate(pthrs)}
+        side_rows[s] = [gi[tuple(c[f"gate.{s}.{k}"] for k in GATE_KEYS)] * len(T) + ti[c[f"entry.p_thr.{s}"]] for c in combos]
+        side_sums[s] = sums[[gi[tuple(c[f"gate.{s}.{k}"] for k in GATE_KEYS)] for c in combos]]
+        csr[s] = (ptr, bars[pos].astype(np.int64))
+    t1 = time.time()
+    C = np.column_stack([side_rows["trend"], side_rows["range"], [c["entry.cooldown_bars"] for c in combos]]).astype(np.int64)
+    res = _combine(csr["trend"][0], csr["trend"][1], csr["range"][0], csr["range"][1], C, fwd_up(close, horizons))
+    t2 = time.time()
+    out = pd.DataFrame(combos, columns=AXES)
+    out.insert(0, "cell", range(len(combos)))
+    out["raw_signals"] = res[:, 0]
+    out["entries"] = res[:, 1]
+    out["avg_gatep"] = (side_sums["trend"] + side_sums["range"]) / n
+    ent = np.where(res[:, 1] > 0, res[:, 1], np.nan)
+    for i, h in enumerate(horizons):
+        out[f"hit_rate_h{h}"] = res[:, 2 + i] / ent
+    return out, {"gate_matrix_sec": round(t1 - t0, 3), "combine_sec": round(t2 - t1, 3)}
+
+def verify(sess, params, row, out_dir):
+    """base params 러너 1회 → preds_test 의 entry_flag 합 / gatep 평균과 row 비교"""
+    import artifacts
+    vdir = os.path.join(out_dir, "verify")
+    sess.run(params, vdir, enrich=False)
+    pr = artifacts.read_table(vdir, "preds_test", columns=["gatep", "entry_flag"])
+    rep = {"runner_entries": int(pr["entry_flag"].sum()), "grid_entries": int(row["entries"]),
+           "runner_avg_gatep": float(pr["gatep"].mean()), "grid_avg_gatep": float(row["avg_gatep"])}
+    rep["ok"] = rep["runner_entries"] == rep["grid_entries"] and abs(rep["runner_avg_gatep"] - rep["grid_avg_gatep"]) <= 1e-12
+    return rep
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--params", "--config", dest="params", required=True, help="base params (unset gate/entry axes come from here)")
+    ap.add_argument("--data-root", default=".")
+    ap.add_argument("--csv-glob", required=True)
+    ap.add_argument("--grid", required=True, help="YAML/JSON with 'grid' (cartesian) and/or 'cells' over gate/entry keys")
+    ap.add_argument("--horizons", type=int, nargs="+", default=None, help="forward-return bars (default: exit.min_hold)")
+    ap.add_argument("--start", default=None); ap.add_argument("--end", default=None)
+    ap.add_argument("--feature-cache", action="store_true", help="reuse indicator series across runs")
+    ap.add_argument("--verify", action="store_true", help="run the runner once with the base params and compare (exit 16 on mismatch)")
+    ap.add_argument("--min-entries", type=int, default=30, help="only for the printed top list")
+    ap.add_argument("--out-dir", default="_out_gate")
+    args = ap.parse_args()
+
+    params = wfo_entry.load_params(args.params)
+    base = base_values(params)
+    cells = runner_session.load_grid(args.grid)
+    if not cells:
+        raise SystemExit("[gate_grid] grid has no cells")
+    combos = [base] + [resolve(base, ov) for ov in cells]  # 0번 = base (verify 기준)
+    horizons = args.horizons or [int((params.get("exit") or {}).get("min_hold", 3))]
+    os.makedirs(args.out_dir, exist_ok=True)
+
+    t0 = time.time()
+    sess = runner_session.RunnerSession(args.data_root, args.csv_glob, os.getcwd(), feature_cache=args.feature_cache,
+                                        start=args.start, end=args.end)
+    import strategy.v2.strategy as strategy_mod  # RunnerSession 이 코드팩 경로를 sys.path 에 넣음
+    score_tr, score_rg, state, close = inputs(strategy_mod, sess.df, params)
+    t1 = time.time()
+    df, timing = evaluate(score_tr, score_rg, state, close, combos, horizons)
+    grid_df = df.iloc[1:].assign(cell=lambda d: d["cell"] - 1)
+    grid_df.to_csv(os.path.join(args.out_dir, "gate_grid.csv"), index=False)
+    report = {"params": args.params, "grid": args.grid, "bars": len(close), "combos": len(cells), "horizons": horizons,
+              "timings": {"load_inputs_sec": round(t1 - t0, 3), **timing}, "base": df.iloc[0].to_dict()}
+    print(f"[gate_grid] {len(cells)} combos over {len(close)} bars: inputs {t1-t0:.2f}s, "
+          f"gate matrix {timing['gate_matrix_sec']}s, combine {timing['combine_sec']}s -> {args.out_dir}/gate_grid.csv")
+    ok = True
+    if args.verify:
+        report["verify"] = verify(sess, params, df.iloc[0], args.out_dir)
+        ok = report["verify"]["ok"]
+        print(f"[gate_grid] verify: {report['verify']}")
+    if sess.features is not None:
+        sess.features.detach()
+    with open(os.path.join(args.out_dir, "gate_grid.json"), "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2, default=str)
+    hr = f"hit_rate_h{horizons[0]}"
+    top = grid_df[grid_df["entries"] >= args.min_entries].sort_values([hr, "entries"], ascending=[False, False])
+    print(top.head(5).to_string(index=False))
+    if not ok:
+        raise SystemExit(16)
+
+if __name__ == "__main__":
+    main()
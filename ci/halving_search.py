@@ -0,0 +1,176 @@
+# ci/halving_search.py
+# 목적: successive halving — 전체 후보를 짧은 앞부분(prefix) 데이터로 먼저 평가하고,
+#       지표 상위 1/eta 만 더 긴 기간으로 승급 (마지막 단계 = 전체 기간)
+#  - 후보 = base params + grid 파일의 overlay (runner_session.load_grid / wfo_entry.overlay_dotted 와 같은 형식)
+#  - 실행 = wfo_splits 워커 (코드팩 StrategyV2 1회 import, 시세는 data_cache memmap 공유) 를 spawn 풀에서
+#    prefix [0, rows) 구간으로 돌림 — 워커 안에서 CSV 재파싱 없음
+#  - 가지치기 지표: cum_pnl | profit_factor | mcc  (mcc = gatep vs hold 봉 뒤 상승, thr = entry.p_thr.trend)
+#  - 출력 (--out-root):
+#      rung_R/cand_XXX/        단계별 러너 산출물
+#      halving_ladder.csv      rung, frac, rows, cand, run_id, 지표, rank, promoted (후보 x 도달한 단계)
+#      halving_summary.csv     집계 요약 (aggregate.COLS) + rung_reached / ladder ("0.11:-3.2>0.33:5.1>1:12.0")
+#      halving.json            설정, 단계별 후보 수, 실패 목록
+# Usage:
+#   python ci/halving_search.py --params conf/params.v2.yml --data-root . --csv-glob "**/*ETHUSDT*1min*.csv" \
+#       --grid grid.yml --metric profit_factor --eta 3 --min-frac 0.1 --workers 4
+
+import argparse, os, json, math, time
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+import pandas as pd
+import wfo_entry, data_cache, wfo_splits, aggregate, runner_session
+
+METRICS = ("cum_pnl", "profit_factor", "mcc")
+
+def rung_fracs(eta, min_frac):
+    """[1/eta^k, ..., 1/eta, 1.0] (가장 작은 값 >= min_frac)"""
+    fr = [1.0]
+    while fr[-1] / eta >= min_frac * (1 - 1e-9):
+        fr.append(fr[-1] / eta)
+    return sorted(round(x, 6) for x in fr)
+
+def run_id(overlay):
+    return ",".join(f"{k}={v}" for k, v in overlay.items()) or "base"
+
+def _mcc_of(outdir, data_root, csv_glob, thr, hold):
+    import metrics_enforcer as me
+    import artifacts
+    pt = artifacts.table_path(outdir, "preds_test")
+    preds = me._read_preds(pt) if pt else None
+    if preds is None:
+        return np.nan
+    times, prob = preds
+    y = me._fwd_up(me._load_close(data_root, csv_glob), times, hold)
+    TP, TN, FP, FN = (int(x[0]) for x in me._confusion_curve(prob, y, [thr]))
+    return float(me._mcc(TP, TN, FP, FN))
+
+def evaluate(cand, params, rows, outdir, metric, data_root, csv_glob):
+    """후보 1개를 prefix [0, rows) 로 실행 → 지표 dict (실패는 rec['error'])"""
+    rec = wfo_splits.run_segment(cand, params, 0, 0, rows, rows, outdir)
+    out = {"cand": cand, "rows": rows, "outdir": outdir, "error": rec.get("error"), "sec": rec.get("sec")}
+    if out["error"]:
+        out["traceback"] = rec.get("traceback")
+        return out
+    out.update(wfo_splits.trade_metrics(rec["pnl"]))
+    if metric == "mcc":
+        thr = float(((params.get("entry") or {}).get("p_thr") or {}).get("trend", 0.6))
+        hold = int((params.get("exit") or {}).get("min_hold", 3))
+        out["mcc"] = _mcc_of(outdir, data_root, csv_glob, thr, hold)
+    return out
+
+def _score(r, metric):
+    v = r.get(metric)
+    if v is None or (isinstance(v, float) and math.isnan(v)):
+        # profit_factor 는 손실 거래가 없으면 NaN (wfo_splits.trade_metrics) → 이익만 낸 후보는 맨 위, 거래 없음/오류만 맨 아래
+        if metric == "profit_factor" and (r.get("n_trades") or 0) > 0 and (r.get("cum_pnl") or 0) > 0:
+            return math.inf
+        return -math.inf
+    return float(v)
+
+def search(base, overlays, data_root, csv_glob, out_root, metric="cum_pnl", eta=3, min_frac=0.1,
+           workers=None, workspace=".", feature_cache=False):
+    paths = data_cache.match_csvs(data_root, csv_glob)
+    if not paths:
+        raise FileNotFoundError(f"[halving_search] No CSV matched: {csv_glob}")
+    data_path = paths[0]
+    n = int(data_cache.ensure(data_path)["rows"])
+    cands = {i: (ov, wfo_entry.overlay_dotted(base, ov)) for i, ov in enumerate(overlays)}
+    fracs = rung_fracs(eta, min_frac)
+    sys_paths = [os.path.abspath(workspace), *wfo_entry.unzip_codepack_if_any(workspace)]
+    workers = min(workers or os.cpu_count() or 1, len(cands))
+
+    ex = None
+    if workers > 1:
+        ex = ProcessPoolExecutor(max_workers=workers, mp_context=mp.get_context("spawn"),
+                                 initializer=wfo_splits._init_worker, initargs=(sys_paths, data_path, feature_cache))
+    else:
+        wfo_splits._init_worker(sys_paths, data_path, feature_cache)
+    ladder, failed, alive, rungs = [], [], sorted(cands), []
+    try:
+        for r, frac in enumerate(fracs):
+            rows = max(1, int(round(n * frac)))
+            jobs = [(c, cands[c][1], rows, os.path.join(out_root, f"rung_{r}", f"cand_{c:03d}"), metric, data_root, csv_glob)
+                    for c in alive]
+            if ex is not None:
+                futs = {ex.submit(evaluate, *j): j[0] for j in jobs}
+                res = []
+                for fut in as_completed(futs):
+                    try: res.append(fut.result())
+                    except Exception as e:  # worker 프로세스 자체가 죽은 경우
+                        res.append({"cand": futs[fut], "rows": rows, "error": f"{type(e).__name__}: {e}"})
+            else:
+                res = [evaluate(*j) for j in jobs]
+            ok = sorted((x for x in res if not x.get("error")), key=lambda x: (-_score(x, metric), x["cand"]))
+            failed += [{"rung": r, **x} for x in res if x.get("error")]
+            keep = len(ok) if r == len(fracs) - 1 else max(1, math.ceil(len(ok) / eta))
+            for rank, x in enumerate(ok):
+                ladder.append({"rung": r, "frac": frac, **{k: v for k, v in x.items() if k != "traceback"},
+                               "run_id": run_id(cands[x["cand"]][0]), "rank": rank + 1, "promoted": rank < keep and r < len(fracs) - 1})
+            rungs.append({"rung": r, "frac": frac, "rows": rows, "candidates": len(jobs), "ok": len(ok), "kept": min(keep, len(ok))})
+            print(f"[halving_search] rung {r}: frac={frac:g} rows={rows} candidates={len(jobs)} -> keep {min(keep, len(ok))}")
+            alive = [x["cand"] for x in ok[:keep]]
+            if not alive:
+                break
+    finally:
+        if ex is not None: ex.shutdown()
+    return ladder, failed, rungs
+
+def write_outputs(out_root, ladder, failed, rungs, metric, info):
+    wfo_entry.ensure_dir(out_root)
+    lad = pd.DataFrame(ladder)
+    lad.to_csv(os.path.join(out_root, "halving_ladder.csv"), index=False)
+    rows, extra = [], []
+    if len(lad):
+        for cand, g in lad.sort_values("rung").groupby("cand", sort=False):
+            last = g.iloc[-1]
+            rows.append({"run_id": last["run_id"], **{k: last.get(k) for k in aggregate.COLS if k in last.index and k != "run_id"}})
+            extra.append({"run_id": last["run_id"], "rung_reached": int(last["rung"]), "frac_reached": float(last["frac"]),
+                          "ladder": ">".join(f"{f:g}:{v:.6g}" for f, v in zip(g["frac"], g[metric].astype(float)))})
+    summ = aggregate.summary_frame(rows) if rows else pd.DataFrame(columns=aggregate.COLS)
+    if extra:
+        summ = summ.merge(pd.DataFrame(extra), on="run_id", how="left")
+        summ["_score"] = [_score(r, metric if metric in summ.columns else "cum_pnl") for _, r in summ.iterrows()]
+        summ = summ.sort_values(["rung_reached", "_score"], ascending=[False, False], kind="stable").drop(columns="_score")
+    summ.to_csv(os.path.join(out_root, "halving_summary.csv"), index=False)
+    with open(os.path.join(out_root, "halving.json"), "w", encoding="utf-8") as f:
+        json.dump({**info, "metric": metric, "rungs": rungs, "failed": failed}, f, ensure_ascii=False, indent=2, default=str)
+    return summ
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--params", "--config", dest="params", required=True)
+    ap.add_argument("--data-root", default=".")
+    ap.add_argument("--csv-glob", required=True)
+    ap.add_argument("--grid", required=True, help="YAML/JSON with 'grid' (cartesian) and/or 'cells' (list)")
+    ap.add_argument("--metric", choices=METRICS, default="cum_pnl")
+    ap.add_argument("--eta", type=float, default=3.0, help="keep top 1/eta per rung; data prefix grows by eta")
+    ap.add_argument("--min-frac", type=float, default=0.1, help="smallest data prefix (fraction of rows)")
+    ap.add_argument("--workers", type=int, default=None)
+    ap.add_argument("--feature-cache", action="store_true")
+    ap.add_argument("--out-root", default="out_halving")
+    args = ap.parse_args()
+    if args.eta <= 1:
+        raise SystemExit("[halving_search] --eta must be > 1")
+
+    base = wfo_entry.load_params(args.params)
+    overlays = runner_session.load_grid(args.grid)
+    if not overlays:
+        raise SystemExit("[halving_search] grid has no cells")
+    t0 = time.time()
+    ladder, failed, rungs = search(base, overlays, args.data_root, args.csv_glob, args.out_root, args.metric,
+                                   args.eta, args.min_frac, args.workers, os.getcwd(), args.feature_cache)
+    summ = write_outputs(args.out_root, ladder, failed, rungs, args.metric,
+                         {"params": args.params, "grid": args.grid, "eta": args.eta, "min_frac": args.min_frac,
+                          "candidates": len(overlays), "sec": round(time.time() - t0, 3)})
+    full = len(overlays)
+    cost = sum(r["candidates"] * r["frac"] for r in rungs)
+    print(f"[halving_search] {full} candidates, cost {cost:.2f} full-runs (vs {full}) in {time.time()-t0:.2f}s "
+          f"-> {args.out_root}/halving_summary.csv")
+    if len(summ):
+        print(summ.head(5).to_string(index=False))
+    if failed:
+        raise SystemExit(15)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,408 @@
+# ci/matrix_runner.py
+# 목적: GitHub 워크플로 matrix (backtest_grid_tuned10_48.yml, wfo_allinone.yml 의 prep 이 만드는 thr x hold) 를
+#       로컬 한 대에서 끝까지 — 중단돼도 이어서, 실패 셀은 재시도, 끝나면 바로 aggregate
+#  - 셀 정의: --workflow 의 jobs.<job>.strategy.matrix
+#      리터럴 matrix → 카테시안 곱 (exclude 지원, include 는 독립 셀로 추가), 키는 MATRIX_KEYS 로 params 경로에 매핑
+#        (워크플로 "Patch params" 단계와 같은 매핑, 그 단계 env 의 고정값(R_LO 등)도 ENV_KEYS 로 반영, --map 으로 추가)
+#      fromJson(needs.prep.outputs.matrix) → wfo_allinone prep 단계와 같은 규칙으로 thr / hold 목록 (allinone_matrix)
+#    또는 --grid (runner_session.load_grid 형식)
+#  - 셀 1개 = wfo_entry 서브프로세스 1개 (워크플로 member job 과 같은 경로: codepack + overlay + runpy + run_cache + enrich)
+#    → 러너가 죽어도 (segfault / OOM kill) 그 셀만 실패, 로그는 logs/<name>.log
+#  - 동시 실행 수 = min(CPU, MemAvailable * 0.8 / 셀당 메모리)
+#      셀당 메모리: --mem-per-cell-mb 또는 데이터 크기로 추정 → 끝난 셀의 timings.json peak RSS 로 계속 갱신
+#      자식마다 NUMBA_NUM_THREADS = CPU / workers (미설정일 때) — 과다 구독 방지
+#  - 체크포인트: matrix_state.jsonl (append + fsync) — 번들 zip 을 tmp + os.replace 로 만든 뒤에만 done 기록
+#      다시 실행하면 done + 번들 있는 셀은 건너뜀 (셀 키 = overlay + base params 내용 + csv_glob 해시)
+#  - 재시도: --retries 회, 대기 --backoff * 2^(attempt-1) 초 / 결정적 실패 (NO_RETRY: 11 데이터 없음, 12 거래 없음, 13/14 precheck) 는 재시도 안 함
+#  - 끝나면 bundles/ 를 aggregate (셀 overlay 컬럼을 run_id 로 붙임) → final_pack/WFO_aggregated_summary.csv (+ --out 이면 최종 ZIP)
+# Output (--out-root):
+#   runs/<name>/  bundles/<name>.zip  logs/<name>.log  params/<key>.yml
+#   matrix_plan.json  matrix_state.jsonl  final_pack/WFO_aggregated_summary.csv  final_pack/timings_rollup.csv
+# Usage:
+#   python ci/matrix_runner.py --workflow .github/workflows/backtest_grid_tuned10_48.yml \
+#       --params tmp/trade/conf/params.v2.yml --data-root tmp/data --out-root _out_matrix --fees-bps 10
+#   python ci/matrix_runner.py --workflow .github/workflows/wfo_allinone.yml --data-root . --out-root _out_wfo --out WFO_results_all.zip
+#   python ci/matrix_runner.py --grid grid.yml --params conf/params.v2.yml --csv-glob "**/*ETHUSDT*1min*.csv" --dry-run
+
+import argparse, os, sys, json, time, hashlib, itertools, shutil, signal, subprocess, zipfile
+from collections import deque
+import yaml
+import wfo_entry
+
+# 워크플로 matrix 키 → params 경로 (backtest_grid_tuned10_48.yml "Patch params", wfo_allinone 의 thr/hold/filter)
+MATRIX_KEYS = {"p_thr_trend": "entry.p_thr.trend", "p_thr_range": "entry.p_thr.range", "tp_atr": "exit.tp_atr",
+               "sl_atr": "exit.sl_atr", "cooldown": "entry.cooldown_bars", "min_hold": "exit.min_hold",
+               "ofi_thr": "orderflow.ofi_thr", "t_hi": "regime.trend_hi_pctile", "r_lo": "regime.range_lo_pctile",
+               "thr": "thr", "hold": "hold", "filter": "filter"}
+ENV_KEYS = {"R_LO": "regime.range_lo_pctile", "T_HI": "regime.trend_hi_pctile", "OFI_THR": "orderflow.ofi_thr",
+            "P_THR_TREND": "entry.p_thr.trend", "COOLDOWN_BARS": "entry.cooldown_bars", "TP_ATR": "exit.tp_atr",
+            "SL_ATR": "exit.sl_atr", "MIN_HOLD": "exit.min_hold"}
+CLI_KEYS = ("thr", "hold", "filter")  # wfo_entry 인자로 넘김 (manifest / result_store 에 남도록)
+NO_RETRY = {11, 12, 13, 14}
+STATE = "matrix_state.jsonl"
+POLL = 0.5
+_WFO_ENTRY = os.path.join(os.path.dirname(os.path.abspath(__file__)), "wfo_entry.py")
+
+def allinone_matrix(params, grid_thr="", grid_hold=""):
+    """wfo_allinone.yml prep 단계 "Build matrix from params" 와 같은 thr / hold / filter 목록"""
+    ep, ex = params.get("entry") or {}, params.get("exit") or {}
+    thr_tr = (ep.get("p_thr") or {}).get("trend") or 0.60
+    thr_rg = (ep.get("p_thr") or {}).get("range") or 0.55
+    thr_base = float((thr_tr + thr_rg) / 2.0)
+    hold_base = int(ex.get("min_hold") or 3)
+    thr = [round(x, 3) for x in [thr_base - 0.05, thr_base, thr_base + 0.05] if 0.3 < x < 0.95] or [0.55, 0.60, 0.65]
+    hold = sorted(set(max(1, hold_base + i) for i in [0, 3, 6])) or [3, 6, 9]
+    def ov(v, cur, cast):
+        xs = [t.strip() for t in str(v or "").split(",") if t.strip()]
+        try: xs = [cast(x) for x in xs]
+        except ValueError: pass
+        return xs or cur
+    return {"thr": ov(grid_thr, thr, float), "hold": ov(grid_hold, hold, int), "filter": ["none"]}
+
+def expand(matrix):
+    """GitHub matrix dict → [dict] (카테시안 곱 - exclude + include)"""
+    m = dict(matrix)
+    include, exclude = m.pop("include", None) or [], m.pop("exclude", None) or []
+    keys = list(m)
+    cells = [dict(zip(keys, v)) for v in itertools.product(*[x if isinstance(x, list) else [x] for x in m.values()])] if keys else []
+    cells = [c for c in cells if not any(all(c.get(k) == v for k, v in e.items()) for e in exclude)]
+    return cells + [dict(i) for i in include]
+
+def _load_workflow(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return yaml.safe_load(f) or {}
+
+def workflow_defaults(path):
+    """workflow_dispatch inputs 의 default → {PARAMS_FILE: .., CSV_GLOB: .., ...}"""
+    wf = _load_workflow(path)
+    trig = wf.get("on", wf.get(True)) or {}  # YAML 1.1: on → True
+    inputs = ((trig.get("workflow_dispatch") or {}).get("inputs") or {}) if isinstance(trig, dict) else {}
+    return {k: (v or {}).get("default") for k, v in inputs.items()}
+
+def workflow_cells(path, params, job=None, key_map=None, grid_thr=None, grid_hold=None):
+    """워크플로 YAML → overlay 목록 (dotted 키)"""
+    wf = _load_workflow(path)
+    jobs = wf.get("jobs") or {}
+    name = job or next((j for j, d in jobs.items() if isinstance((d.get("strategy") or {}).get("matrix"), (dict, str))), None)
+    if name is None or name not in jobs:
+        raise ValueError(f"[matrix_runner] no job with strategy.matrix in {path}")
+    matrix = jobs[name]["strategy"]["matrix"]
+    if isinstance(matrix, str):  # ${{ fromJson(needs.prep.outputs.matrix) }} → prep 규칙 재현
+        d = workflow_defaults(path)
+        raw = expand(allinone_matrix(params, grid_thr if grid_thr is not None else d.get("GRID_THR"),
+                                     grid_hold if grid_hold is not None else d.get("GRID_HOLD")))
+    else:
+        raw = expand(matrix)
+    fixed = {}
+    for st in jobs[name].get("steps") or []:  # Patch params 단계의 고정 env (예: R_LO: "0.40")
+        for k, v in (st.get("env") or {}).items():
+            if k in ENV_KEYS and "${{" not in str(v):
+                fixed[ENV_KEYS[k]] = yaml.safe_load(str(v))
+    kmap = {**MATRIX_KEYS, **(key_map or {})}
+    unknown = sorted({k for c in raw for k in c if k not in kmap and "." not in k})
+    if unknown:
+        raise ValueError(f"[matrix_runner] unmapped matrix keys {unknown} (pass --map key=dotted.path)")
+    return [{**fixed, **{kmap.get(k, k): v for k, v in c.items()}} for c in raw]
+
+def cell_key(overlay, base_digest, csv_glob):
+    h = hashlib.sha1(json.dumps(overlay, sort_keys=True, default=str).encode("utf-8"))
+    h.update(f"|{base_digest}|{csv_glob}".encode("utf-8"))
+    return h.hexdigest()[:12]
+
+def cell_name(overlay, key):
+    """thr/hold/filter 만이면 워크플로와 같은 out_<thr>_<hold>_<filter> (aggregate.infer_run_id 가 알아봄)"""
+    if set(overlay) <= set(CLI_KEYS) and {"thr", "hold"} <= set(overlay):
+        return f"out_{overlay['thr']}_{overlay['hold']}_{overlay.get('filter', 'none')}"
+    return f"cell_{key}"
+
+def plan(cells, params_path, csv_glob, out_root):
+    import aggregate
+    with open(params_path, "rb") as f:
+        digest = hashlib.sha1(f.read()).hexdigest()
+    out, seen = [], set()
+    for ov in cells:
+        key = cell_key(ov, digest, csv_glob)
+        if key in seen:
+            continue
+        seen.add(key)
+        name = cell_name(ov, key)
+        bundle = ("bundle_" + name[4:] if name.startswith("out_") else name) + ".zip"
+        out.append({"key": key, "name": name, "overlay": ov, "outdir": os.path.join(out_root, "runs", name),
+                    "bundle": os.path.join(out_root, "bundles", bundle),
+                    "run_id": aggregate.infer_run_id(os.path.splitext(bundle)[0])})
+    return out
+
+def read_state(out_root):
+    """key → 마지막 기록 (깨진 마지막 줄은 무시)"""
+    st = {}
+    p = os.path.join(out_root, STATE)
+    if os.path.exists(p):
+        with open(p, "r", encoding="utf-8") as f:
+            for line in f:
+                try: r = json.loads(line)
+                except ValueError: continue
+                st[r["key"]] = r
+    return st
+
+def append_state(out_root, rec):
+    with open(os.path.join(out_root, STATE), "a", encoding="utf-8") as f:
+        f.write(json.dumps({**rec, "ts": time.time()}, ensure_ascii=False, default=str) + "\n")
+        f.flush(); os.fsync(f.fileno())
+
+def mem_available_mb():
+    try:
+        with open("/proc/meminfo") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) / 1024.0
+    except OSError:
+        pass
+    try: return os.sysconf("SC_AVPHYS_PAGES") * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (ValueError, OSError, AttributeError): return None
+
+class Sizer:
+    """동시 실행 상한 — CPU 와 (시작 시 MemAvailable * 0.8) / 셀당 메모리 중 작은 쪽"""
+    def __init__(self, workers=None, mem_per_cell_mb=None, data_paths=()):
+        self.cpu = os.cpu_count() or 1
+        self.fixed = workers
+        self.avail = mem_available_mb()
+        data_mb = sum(os.path.getsize(p) for p in data_paths) / 2**20
+        self.est = float(mem_per_cell_mb or max(512.0, 300.0 + 4.0 * data_mb))  # DataFrame + 지표 ≈ CSV 의 수 배
+        self.pinned = mem_per_cell_mb is not None
+        self.seen = 0.0
+    def observe(self, outdir):
+        if self.pinned:
+            return
+        try:
+            with open(os.path.join(outdir, "timings.json"), "r", encoding="utf-8") as f:
+                tm = json.load(f)
+        except (OSError, ValueError):
+            return
+        peaks = [tm.get("peak_rss_mb")] + [s.get("peak_rss_mb") for s in tm.get("stages", [])]
+        peaks = [p for p in peaks if p]
+        if peaks:  # 추정치 대신 지금까지 관측한 최대 peak RSS + 여유 25%
+            self.seen = max(self.seen, max(peaks))
+            self.est = self.seen * 1.25
+    def limit(self):
+        if self.fixed:
+            return self.fixed
+        by_mem = self.cpu if self.avail is None else int(self.avail * 0.8 // max(self.est, 1.0))
+        return max(1, min(self.cpu, by_mem))
+
+def _zip_dir(src, zpath):
+    os.makedirs(os.path.dirname(zpath), exist_ok=True)
+    tmp = zpath + ".tmp"
+    with zipfile.ZipFile(tmp, "w", zipfile.ZIP_DEFLATED) as z:
+        for base, _, files in os.walk(src):
+            for fn in sorted(files):
+                p = os.path.join(base, fn)
+                z.write(p, os.path.relpath(p, src))
+    os.replace(tmp, zpath)
+
+def _cost_summary(outdir, fees_bps, slip_bps):
+    """backtest_grid_tuned10_48.yml "Cost-adjust summary" 와 같은 summary_cost.json"""
+    p = os.path.join(outdir, "summary.json")
+    with open(p, "r", encoding="utf-8") as f:
+        s = json.load(f)
+    rt = 2.0 * (fees_bps + slip_bps) / 10000.0
+    s["cost_model"] = {"fees_bps_per_side": fees_bps, "slip_bps_per_side": slip_bps, "roundtrip_cost": rt}
+    s["cum_pnl_cost_adj"] = float(s.get("cum_pnl_close_based", 0.0)) - int(s.get("entries", 0)) * rt
+    with open(os.path.join(outdir, "summary_cost.json"), "w", encoding="utf-8") as f:
+        json.dump(s, f, indent=2)
+
+class Runner:
+    def __init__(self, args, base, out_root, sizer):
+        self.args, self.base, self.out_root, self.sizer = args, base, out_root, sizer
+        self.running, self.failed, self.done = {}, [], 0
+
+    def _argv(self, cell):
+        ov = cell["overlay"]
+        rest = {k: v for k, v in ov.items() if k not in CLI_KEYS}
+        pfile = self.args.params
+        if rest:  # thr/hold/filter 외의 키는 셀 params 파일로
+            pfile = os.path.join(self.out_root, "params", cell["key"] + ".yml")
+            os.makedirs(os.path.dirname(pfile), exist_ok=True)
+            with open(pfile, "w", encoding="utf-8") as f:
+                yaml.safe_dump(wfo_entry.overlay_dotted(self.base, rest), f, sort_keys=False, allow_unicode=True)
+        argv = [sys.executable, _WFO_ENTRY, "--params", pfile, "--data-root", self.args.data_root,
+                "--csv-glob", self.args.csv_glob, "--outdir", cell["outdir"]]
+        for k in CLI_KEYS:
+            if k in ov: argv += [f"--{k}", str(ov[k])]
+        if self.args.runner: argv += ["--runner", self.args.runner]
+        if self.args.no_cache: argv += ["--no-cache"]
+        if self.args.format: argv += ["--format", self.args.format]
+        if self.args.store: argv += ["--store", self.args.store]
+        return argv
+
+    def launch(self, cell, attempt):
+        shutil.rmtree(cell["outdir"], ignore_errors=True)  # 이전 시도의 부분 산출물 제거
+        os.makedirs(os.path.join(self.out_root, "logs"), exist_ok=True)
+        log = open(os.path.join(self.out_root, "logs", cell["name"] + ".log"), "a", encoding="utf-8")
+        log.write(f"\n===== attempt {attempt} {time.strftime('%Y-%m-%d %H:%M:%S')} =====\n"); log.flush()
+        env = dict(os.environ)
+        env.setdefault("NUMBA_NUM_THREADS", str(max(1, (os.cpu_count() or 1) // max(1, self.sizer.limit()))))
+        proc = subprocess.Popen(self._argv(cell), stdout=log, stderr=subprocess.STDOUT, env=env, cwd=os.getcwd())
+        self.running[cell["key"]] = {"cell": cell, "attempt": attempt, "proc": proc, "log": log, "t0": time.time(), "timeout": False}
+
+    def reap(self, pending):
+        now = time.time()
+        for key, r in list(self.running.items()):
+            rc = r["proc"].poll()
+            if rc is None:
+                if self.args.timeout and now - r["t0"] > self.args.timeout and not r["timeout"]:
+                    r["timeout"] = True; r["proc"].kill()
+                continue
+            r["log"].close(); del self.running[key]
+            cell, attempt, sec = r["cell"], r["attempt"], round(now - r["t0"], 1)
+            rec = {"key": key, "name": cell["name"], "attempt": attempt, "rc": rc, "sec": sec}
+            if rc == 0:
+                try:
+                    if self.args.fees_bps is not None or self.args.slip_bps is not None:
+                        _cost_summary(cell["outdir"], float(self.args.fees_bps or 0), float(self.args.slip_bps or 0))
+                    _zip_dir(cell["outdir"], cell["bundle"])
+                except Exception as e:
+                    rc = rec["rc"] = -1; rec["error"] = f"{type(e).__name__}: {e}"
+            if rc == 0:
+                self.sizer.observe(cell["outdir"])
+                self.done += 1
+                append_state(self.out_root, {**rec, "status": "done", "bundle": cell["bundle"]})
+                print(f"[matrix_runner] done {cell['name']} ({sec}s, attempt {attempt})")
+            elif rc in NO_RETRY or attempt > self.args.retries:
+                rec.update(status="failed", timeout=r["timeout"])
+                self.failed.append(rec)
+                append_state(self.out_root, rec)
+                print(f"[matrix_runner] FAILED {cell['name']} rc={rc} (attempt {attempt}) -> logs/{cell['name']}.log")
+            else:
+                wait = self.args.backoff * 2 ** (attempt - 1)
+                append_state(self.out_root, {**rec, "status": "retry", "wait": wait, "timeout": r["timeout"]})
+                pending.append((cell, attempt + 1, now + wait))
+                print(f"[matrix_runner] retry {cell['name']} rc={rc} in {wait:.0f}s (attempt {attempt + 1})")
+
+    def run(self, cells):
+        pending = deque((c, 1, 0.0) for c in cells)
+        while pending or self.running:
+            self.reap(pending)
+            now = time.time()
+            while len(self.running) < self.sizer.limit():
+                ready = next((x for x in pending if x[2] <= now), None)
+                if ready is None:
+                    break
+                pending.remove(ready)
+                self.launch(ready[0], ready[1])
+            time.sleep(POLL)
+
+    def stop(self):
+        for r in self.running.values():
+            r["proc"].terminate()
+        for r in self.running.values():
+            try: r["proc"].wait(timeout=10)
+            except subprocess.TimeoutExpired: r["proc"].kill()
+            r["log"].close()
+
+def finalize(cells, out_root, out_zip=None, workers=None):
+    """bundles/ → aggregate + 셀 overlay 컬럼 (run_id 로 조인)"""
+    import pandas as pd, aggregate
+    bdir = os.path.join(out_root, "bundles")
+    rows = [r for r in aggregate.collect(bdir, workers) if r["run_id"] in {c["run_id"] for c in cells}]
+    df = aggregate.summary_frame(rows)
+    ov = pd.DataFrame([{"run_id": c["run_id"], **{k: v for k, v in c["overlay"].items() if k not in ("thr", "hold", "filter")}}
+                       for c in cells])
+    df = df.merge(ov, on="run_id", how="left")
+    df = df[["run_id", *[c for c in ov.columns if c != "run_id"], *[c for c in df.columns if c not in ov.columns]]]
+    summary = os.path.join(out_root, "final_pack", "WFO_aggregated_summary.csv")
+    os.makedirs(os.path.dirname(summary), exist_ok=True)
+    df.to_csv(summary, index=False)
+    extra = []
+    tr = aggregate.timing_rollup(rows)
+    if tr is not None:
+        extra.append(os.path.join(os.path.dirname(summary), "timings_rollup.csv"))
+        tr.to_csv(extra[-1], index=False)
+    if out_zip:
+        aggregate.pack(bdir, summary, out_zip, extra=extra)
+    return df, summary
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--workflow", default=None, help="workflow YAML whose strategy.matrix defines the cells")
+    ap.add_argument("--job", default=None, help="job name in --workflow (default: first job with a matrix)")
+    ap.add_argument("--grid", default=None, help="or a runner_session grid file (grid / cells of dotted keys)")
+    ap.add_argument("--map", nargs="*", default=[], help="extra matrix key mappings: key=dotted.path")
+    ap.add_argument("--grid-thr", default=None, help="wfo_allinone GRID_THR override (comma list)")
+    ap.add_argument("--grid-hold", default=None, help="wfo_allinone GRID_HOLD override (comma list)")
+    ap.add_argument("--params", "--config", dest="params", default=None, help="base params (default: workflow PARAMS_FILE input)")
+    ap.add_argument("--data-root", default=".")
+    ap.add_argument("--csv-glob", default=None, help="default: workflow CSV_GLOB input")
+    ap.add_argument("--out-root", default="_out_matrix")
+    ap.add_argument("--workers", type=int, default=None, help="fixed pool size (default: from CPU and memory)")
+    ap.add_argument("--mem-per-cell-mb", type=float, default=None, help="default: estimated from data size, then measured")
+    ap.add_argument("--retries", type=int, default=2)
+    ap.add_argument("--backoff", type=float, default=30.0, help="seconds before the first retry (doubles each time)")
+    ap.add_argument("--timeout", type=float, default=None, help="kill a cell after this many seconds (counts as a failure)")
+    ap.add_argument("--fees-bps", type=float, default=None, help="write summary_cost.json like the tuned grid workflow")
+    ap.add_argument("--slip-bps", type=float, default=None)
+    ap.add_argument("--runner", default=None)
+    ap.add_argument("--no-cache", action="store_true")
+    ap.add_argument("--format", default=None, choices=["csv", "npz"])
+    ap.add_argument("--store", default=None)
+    ap.add_argument("--out", default=None, help="also pack bundles + summary into this ZIP")
+    ap.add_argument("--dry-run", action="store_true", help="print the plan and pool size, run nothing")
+    args = ap.parse_args()
+
+    if not args.workflow and not args.grid:
+        raise SystemExit("[matrix_runner] --workflow or --grid required")
+    key_map = dict(m.split("=", 1) for m in args.map)
+    wf_defaults = workflow_defaults(args.workflow) if args.workflow else {}
+    args.params = args.params or wf_defaults.get("PARAMS_FILE")  # allinone 의 matrix 는 params 에서 만들어지므로 먼저
+    if not args.params or not os.path.exists(args.params):
+        raise SystemExit(f"[matrix_runner] params file not found: {args.params}")
+    base = wfo_entry.load_params(args.params)
+    if args.workflow:
+        cells = workflow_cells(args.workflow, base, args.job, key_map, args.grid_thr, args.grid_hold)
+    else:
+        import runner_session
+        cells = runner_session.load_grid(args.grid)
+    args.csv_glob = args.csv_glob or base.get("csv_glob") or wf_defaults.get("CSV_GLOB")  # prep 단계와 같은 우선순위
+    if not args.csv_glob:
+        raise SystemExit("[matrix_runner] --csv-glob required")
+    if not cells:
+        raise SystemExit("[matrix_runner] no cells")
+
+    import data_cache
+    data_paths = data_cache.match_csvs(args.data_root, args.csv_glob)
+    if not data_paths:
+        print(f"[matrix_runner] No CSV matched: {args.csv_glob}"); raise SystemExit(11)
+    os.makedirs(args.out_root, exist_ok=True)
+    todo_all = plan(cells, args.params, args.csv_glob, args.out_root)
+    state = read_state(args.out_root)
+    todo = [c for c in todo_all if not (state.get(c["key"], {}).get("status") == "done" and os.path.exists(c["bundle"]))]
+    sizer = Sizer(args.workers, args.mem_per_cell_mb, data_paths)
+    with open(os.path.join(args.out_root, "matrix_plan.json"), "w", encoding="utf-8") as f:
+        json.dump({"workflow": args.workflow, "grid": args.grid, "params": args.params, "csv_glob": args.csv_glob,
+                   "data_root": args.data_root, "cells": todo_all}, f, ensure_ascii=False, indent=2, default=str)
+    print(f"[matrix_runner] {len(todo_all)} cells, {len(todo_all) - len(todo)} already done, {len(todo)} to run; "
+          f"workers={sizer.limit()} (cpu={sizer.cpu}, mem_avail={sizer.avail and round(sizer.avail)}MB, est/cell={round(sizer.est)}MB)")
+    if args.dry_run:
+        for c in todo:
+            print(f"  {c['name']}: {c['overlay']}")
+        return
+
+    wfo_entry.unzip_codepack_if_any(os.getcwd())  # 코드팩 해시 캐시를 미리 (셀마다 동시에 풀지 않게)
+    runner = Runner(args, base, args.out_root, sizer)
+    def _term(signum, frame): raise KeyboardInterrupt
+    signal.signal(signal.SIGTERM, _term)
+    t0 = time.time()
+    try:
+        runner.run(todo)
+    except KeyboardInterrupt:
+        runner.stop()
+        print(f"[matrix_runner] interrupted after {runner.done} cells; rerun the same command to resume")
+        raise SystemExit(130)
+    df, summary = finalize(todo_all, args.out_root, args.out)
+    print(f"[matrix_runner] {runner.done} cells ran in {time.time()-t0:.1f}s, {len(runner.failed)} failed; "
+          f"{len(df)} runs aggregated -> {summary}" + (f", {args.out}" if args.out else ""))
+    if runner.failed:
+        print(json.dumps(runner.failed, ensure_ascii=False, indent=2))
+        raise SystemExit(15)
+
+if __name__ == "__main__":
+    main()
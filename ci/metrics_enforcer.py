@@ -7,6 +7,7 @@
 import os, json, argparse, glob
 import pandas as pd
 import numpy as np
+import data_cache, artifacts
 
 def _find_datetime_col(cols):
     low = [c.lower() for c in cols]
@@ -20,53 +21,82 @@ def _find_close_col(cols):
         if cand in low: return cols[low.index(cand)]
     return None
 
-def _read_one_csv(data_root, pattern):
-    matches = glob.glob(os.path.join(data_root, pattern), recursive=True)
+def _load_close(data_root, pattern):
+    """캐시된 시세에서 (open_time int64 ns, close) 를 시간순 정렬 배열로 반환"""
+    matches = data_cache.match_csvs(data_root, pattern)
     if not matches:
         raise FileNotFoundError(f"[metrics_enforcer] No CSV matched: {pattern}")
-    df = pd.read_csv(matches[0])
-    dcol = _find_datetime_col(df.columns)
-    ccol = _find_close_col(df.columns)
+    if len(matches) > 1:  # 월/연 분할 파일 → 합쳐 정렬·중복 제거 (러너가 어느 파일을 집었든 그 시각이 다 들어 있음)
+        import re, multi_loader
+        syms = sorted({m.group(1) for p in matches
+                       for m in [re.search(multi_loader.SYMBOL_RE, os.path.basename(p).upper())] if m})
+        if len(syms) > 1:  # 러너는 glob 첫 파일 하나만 거래 — 시각만으로 조인하면 다른 심볼 close 로 가격이 매겨짐
+            raise ValueError(f"[metrics_enforcer] --csv-glob matched {len(syms)} symbols {syms}; "
+                             f"narrow it to the symbol the runner traded")
+        data, _ = multi_loader.merge([multi_loader._load_one(p, None, None, None) for p in matches])
+        ccol = next((c for c in data if c != "open_time" and _find_close_col([c])), None)
+        if ccol is None:
+            raise ValueError(f"[metrics_enforcer] Data CSV missing close column. have={list(data)[:12]}")
+        return data["open_time"], data[ccol]
+    meta = data_cache.ensure(matches[0])  # 최초 1회만 CSV 파싱, 이후 memmap 캐시
+    cols = meta["columns"]
+    dcol = _find_datetime_col(cols)
+    ccol = _find_close_col(cols)
     if not dcol or not ccol:
-        raise ValueError(f"[metrics_enforcer] Data CSV missing datetime/close columns. have={list(df.columns)[:12]}")
-    df[dcol] = pd.to_datetime(df[dcol])
-    return df[[dcol, ccol]].rename(columns={dcol: "open_time", ccol: "close"})
+        raise ValueError(f"[metrics_enforcer] Data CSV missing datetime/close columns. have={list(cols)[:12]}")
+    arr = data_cache.load_columns(matches[0], ["open_time", ccol])
+    ot, close = np.asarray(arr["open_time"]), np.asarray(arr[ccol])
+    if len(ot) > 1 and not (ot[1:] >= ot[:-1]).all():
+        order = np.argsort(ot, kind="stable")
+        ot, close = ot[order], close[order]
+    return ot, close
+
+def _lookup(ot, vals, times):
+    """정확히 같은 시각의 값 (없으면 NaN) — 정렬된 ot에 대해 searchsorted"""
+    t = np.asarray(times, dtype="datetime64[ns]").view("int64")
+    idx = np.searchsorted(ot, t)
+    idx_c = np.minimum(idx, max(len(ot) - 1, 0))
+    hit = (idx < len(ot)) & (ot[idx_c] == t) if len(ot) else np.zeros(len(t), dtype=bool)
+    out = np.full(len(t), np.nan)
+    out[hit] = vals[idx_c[hit]]
+    return out
 
 def _detect_event_col(cols):
     low = [c.lower() for c in cols]
     return cols[low.index("event")] if "event" in low else None
 
 def _pair_trades(tr):
-    """ENTRY/EXIT 순서대로 1:1 페어링하여 trade_id를 만들어 반환"""
+    """ENTRY/EXIT 순서대로 FIFO 1:1 페어링하여 (trade_id, entry_time, exit_time, side) 반환
+    루프 대신 누적 카운트로 매칭: k번째로 '매칭되는' EXIT이 k번 trade를 닫는다.
+    M_i = X_i + min(0, min_{j<=i}(E_j - X_j)) 는 i행까지 닫힌 trade 수 (열린 게 없을 때의 EXIT은 버림)"""
     evcol = _detect_event_col(tr.columns)
     if evcol is None:
         raise ValueError("[metrics_enforcer] trades.csv has no 'event' column")
 
     t = tr.copy()
-    t["open_time"] = pd.to_datetime(t["open_time"], errors="coerce")
+    t["open_time"] = data_cache.to_datetime_ns(t["open_time"])
+    side = _infer_side(t)  # side/direction 컬럼 없으면 +1
+    t["side"] = 1 if side is None else side.astype(int)
     t = t.sort_values("open_time", kind="stable").reset_index(drop=True)
 
     e = t[evcol].astype(str).str.upper()
-    t["is_entry"] = e.str.contains("ENTRY")
-    t["is_exit"]  = e.str.contains("EXIT")
-
-    trade_id = []
-    q = []  # FIFO queue of open trades
-    next_id = 0
-    for is_ent, is_ex in zip(t["is_entry"], t["is_exit"]):
-        if is_ent:
-            next_id += 1
-            q.append(next_id)
-            trade_id.append(next_id)
-        elif is_ex and q:
-            trade_id.append(q.pop(0))
-        else:
-            trade_id.append(np.nan)
+    is_entry = e.str.contains("ENTRY").to_numpy()
+    is_exit  = e.str.contains("EXIT").to_numpy()
+    ex_only  = is_exit & ~is_entry  # ENTRY가 우선
+
+    E = np.cumsum(is_entry)
+    X = np.cumsum(ex_only)
+    M = X + np.minimum(np.minimum.accumulate(E - X), 0)
+    closed = ex_only & (np.diff(M, prepend=0) > 0)
+
+    trade_id = np.full(len(t), np.nan)
+    trade_id[is_entry] = E[is_entry]
+    trade_id[closed] = M[closed]
     t["trade_id"] = trade_id
 
-    ent = t[t["is_entry"]][["trade_id", "open_time"]].rename(columns={"open_time": "entry_time"})
-    ex  = t[t["is_exit"] ][["trade_id", "open_time"]].rename(columns={"open_time": "exit_time"})
-    pairs = ent.merge(ex, on="trade_id", how="inner")
+    ent = t.loc[is_entry, ["trade_id", "open_time", "side"]].rename(columns={"open_time": "entry_time"})
+    ex  = t.loc[is_exit,  ["trade_id", "open_time"]].rename(columns={"open_time": "exit_time"})
+    pairs = ent.merge(ex, on="trade_id", how="inner").sort_values("trade_id", kind="stable").reset_index(drop=True)
     return pairs, evcol
 
 def _infer_side(tr):
@@ -78,10 +108,72 @@ def _infer_side(tr):
             return np.where(s.str.contains("short|sell|-1"), -1, 1)
     return None  # 못 찾으면 None 반환(후속에서 +1로 채움)
 
-def enrich_metrics(outdir, data_root, csv_glob, thr=0.83, hold=9):
+def _read_preds(pt_path):
+    """preds_test(.npz/.csv) → (open_time datetime64[ns], 확률 배열) / 필요한 컬럼 없으면 None"""
+    pt = artifacts.read_path(pt_path)
+    pcols = ["p","p_gate","gatep","prob","score","p_trend","p_range"]
+    prob = next((c for c in pcols if c in pt.columns), None)
+    dcol = _find_datetime_col(pt.columns)
+    if not prob or not dcol:
+        return None
+    return data_cache.to_datetime_ns(pt[dcol]), pd.to_numeric(pt[prob], errors="coerce").to_numpy(float)
+
+def _fwd_up(data, times, hold):
+    """hold 봉 뒤 close가 더 높으면 1 (시세에 없는 시각은 0)"""
+    ot, close = data
+    fwd = pd.Series(close).shift(-int(hold)).to_numpy() / close - 1.0
+    return (_lookup(ot, fwd, times) > 0).astype(np.int64)
+
+def _confusion_curve(prob, y_true, thrs):
+    """확률을 한 번 정렬하고 prefix-sum으로 모든 thr의 (TP,TN,FP,FN)을 계산 (pred = prob >= thr)
+    y_true는 1D 또는 (hold 개수, n) 2D — 정렬은 hold 수와 무관하게 1회"""
+    p = np.where(np.isnan(prob), -np.inf, prob)  # NaN은 항상 pred=0
+    order = np.argsort(p, kind="stable")
+    ps = p[order]
+    y = np.atleast_2d(y_true)[:, order]
+    cpos = np.concatenate([np.zeros((y.shape[0], 1), dtype=np.int64), np.cumsum(y, axis=1)], axis=1)
+    k = np.searchsorted(ps, np.asarray(thrs, dtype=float), side="left")  # k개는 pred=0
+    n = len(ps)
+    FN = cpos[:, k]; TN = k - FN
+    TP = cpos[:, -1:] - FN; FP = (n - k) - TP
+    if np.ndim(y_true) == 1:
+        return TP[0], TN[0], FP[0], FN[0]
+    return TP, TN, FP, FN
+
+def _mcc(TP, TN, FP, FN):
+    TP, TN, FP, FN = (np.asarray(x, dtype=float) for x in (TP, TN, FP, FN))
+    denom = np.sqrt((TP+FP)*(TP+FN)*(TN+FP)*(TN+FN))
+    return np.where(denom != 0, (TP*TN - FP*FN) / np.where(denom != 0, denom, 1.0), 0.0)
+
+def mcc_curve(outdir, data_root, csv_glob, thr_list, hold_list, data=None, preds=None):
+    """thr × hold 전체 MCC/혼동행렬을 확률 컬럼 1회 정렬 패스로 계산 → mcc_curve.csv"""
+    pt_path = artifacts.table_path(outdir, "preds_test")
+    if preds is None and pt_path:
+        preds = _read_preds(pt_path)
+    if preds is None:
+        print("[metrics_enforcer] mcc_curve skipped: preds_test.csv missing or lacks open_time/prob")
+        return None
+    times, prob = preds
+    if data is None: data = _load_close(data_root, csv_glob)
+    thrs = [float(x) for x in thr_list]
+    holds = [int(h) for h in hold_list]
+    Y = np.vstack([_fwd_up(data, times, h) for h in holds])
+    TP, TN, FP, FN = _confusion_curve(prob, Y, thrs)
+    mcc = _mcc(TP, TN, FP, FN)
+    rows = []
+    for j, hold in enumerate(holds):
+        for i, thr in enumerate(thrs):
+            rows.append({"hold": hold, "thr": thr, "mcc": float(mcc[j, i]),
+                         "TP": int(TP[j, i]), "TN": int(TN[j, i]), "FP": int(FP[j, i]), "FN": int(FN[j, i])})
+    curve = pd.DataFrame(rows)
+    curve.to_csv(os.path.join(outdir, "mcc_curve.csv"), index=False)
+    print(f"[metrics_enforcer] mcc_curve.csv: {len(thrs)} thr x {len(holds)} hold")
+    return curve
+
+def enrich_metrics(outdir, data_root, csv_glob, thr=0.83, hold=9, thr_list=None, hold_list=None):
     summ_path = os.path.join(outdir, "summary.json")
-    tr_path   = os.path.join(outdir, "trades.csv")
-    pt_path   = os.path.join(outdir, "preds_test.csv")
+    tr_path   = artifacts.table_path(outdir, "trades")      # .npz 우선, 없으면 .csv (None = 없음)
+    pt_path   = artifacts.table_path(outdir, "preds_test")
 
     os.makedirs(outdir, exist_ok=True)
     summ = {}
@@ -89,45 +181,18 @@ def enrich_metrics(outdir, data_root, csv_glob, thr=0.83, hold=9):
         try: summ = json.load(open(summ_path, "r", encoding="utf-8"))
         except Exception: summ = {}
 
+    data = None  # 시세는 한 번만 로드해서 PnL/MCC에서 공유
     # --------- PnL/승률/프로핏팩터/누적PnL ---------
-    if os.path.exists(tr_path):
-        tr = pd.read_csv(tr_path)
+    if tr_path:
+        tr = artifacts.read_path(tr_path)
         if "open_time" in map(str.lower, tr.columns):
-            data = _read_one_csv(data_root, csv_glob)
-            data["open_time"] = pd.to_datetime(data["open_time"])
-            pairs, evcol = _pair_trades(tr)
-
-            # 시세 조인 → entry/exit 가격
-            ent = pairs[["trade_id", "entry_time"]].merge(
-                data.rename(columns={"open_time": "entry_time", "close": "entry_price"}),
-                on="entry_time", how="left"
-            )
-            ex  = pairs[["trade_id", "exit_time"]].merge(
-                data.rename(columns={"open_time": "exit_time", "close": "exit_price"}),
-                on="exit_time", how="left"
-            )
-            px  = ent.merge(ex, on="trade_id", how="inner")
-
-            # side 추정(없으면 +1)
-            side = _infer_side(tr)
-            if side is None:
-                px["side"] = 1
-            else:
-                # ENTRY 행의 side를 trade_id에 매핑
-                t2 = tr.copy()
-                t2["open_time"] = pd.to_datetime(t2["open_time"], errors="coerce")
-                e = t2[evcol].astype(str).str.upper().str.contains("ENTRY")
-                t2 = t2[e][["open_time"]].copy()
-                t2["side"] = side[e].astype(int) if len(side)==len(tr) else 1
-                # trade_id 재부여
-                tmp_pairs, _ = _pair_trades(pd.DataFrame({
-                    "open_time": tr["open_time"],
-                    evcol: tr[evcol]
-                }))
-                sidemap = tmp_pairs.set_index("entry_time")["trade_id"].to_dict()
-                t2["trade_id"] = t2["open_time"].map(sidemap)
-                px = px.merge(t2[["trade_id","side"]], on="trade_id", how="left")
-                px["side"] = px["side"].fillna(1).astype(int)
+            data = _load_close(data_root, csv_glob)
+            pairs, evcol = _pair_trades(tr)  # 페어링은 호출당 1회
+
+            # 시세 조인 → entry/exit 가격 (정렬된 캐시 close 배열에 searchsorted)
+            px = pairs.copy()
+            px["entry_price"] = _lookup(*data, px["entry_time"])
+            px["exit_price"]  = _lookup(*data, px["exit_time"])
 
             # PnL
             px["pnl_close_based"] = (px["exit_price"] - px["entry_price"]) * px["side"]
@@ -149,36 +214,28 @@ def enrich_metrics(outdir, data_root, csv_glob, thr=0.83, hold=9):
             k = min(len(exit_idx), len(px))
             if k > 0:
                 tr_enriched.loc[exit_idx[:k], "pnl_close_based"] = px["pnl_close_based"].values[:k]
-            tr_enriched.to_csv(tr_path, index=False)
+            artifacts.write_table(tr_enriched, outdir, "trades", fmt=artifacts.table_format(outdir, "trades"))
 
         else:
             # trades.csv가 최소 키를 만족 못하면 exits만 보존
             summ["exits"] = int(summ.get("exits", 0))
 
     # ----------------- MCC (가능할 때만) -----------------
-    if os.path.exists(pt_path):
+    if pt_path:
+        preds = None
         try:
-            pt = pd.read_csv(pt_path)
-            pcols = ["p","p_gate","gatep","prob","score","p_trend","p_range"]
-            prob = next((c for c in pcols if c in pt.columns), None)
-            if prob and _find_datetime_col(pt.columns):
-                dcol = _find_datetime_col(pt.columns)
-                pt[dcol] = pd.to_datetime(pt[dcol])
-                data = _read_one_csv(data_root, csv_glob).sort_values("open_time").reset_index(drop=True)
-                data["fwd"] = data["close"].shift(-int(hold)) / data["close"] - 1.0
-                df = pt[[dcol, prob]].rename(columns={dcol:"open_time"}).merge(
-                    data[["open_time","fwd"]], on="open_time", how="left"
-                )
-                y_true = (df["fwd"] > 0).astype(int)
-                y_pred = (df[prob] >= float(thr)).astype(int)
-                TP = int(((y_pred==1) & (y_true==1)).sum())
-                TN = int(((y_pred==0) & (y_true==0)).sum())
-                FP = int(((y_pred==1) & (y_true==0)).sum())
-                FN = int(((y_pred==0) & (y_true==1)).sum())
-                denom = np.sqrt((TP+FP)*(TP+FN)*(TN+FP)*(TN+FN))
-                mcc = ((TP*TN - FP*FN)/denom) if denom!=0 else 0.0
-                summ["mcc"] = float(mcc)
+            preds = _read_preds(pt_path)
+            if preds is not None:
+                times, prob = preds
+                if data is None: data = _load_close(data_root, csv_glob)
+                TP, TN, FP, FN = (int(x[0]) for x in _confusion_curve(prob, _fwd_up(data, times, hold), [thr]))
+                summ["mcc"] = float(_mcc(TP, TN, FP, FN))
                 summ["cmatrix"] = {"TP":TP,"TN":TN,"FP":FP,"FN":FN}
+            if thr_list or hold_list:
+                if mcc_curve(outdir, data_root, csv_glob, thr_list or [thr], hold_list or [hold], data=data, preds=preds) is not None:
+                    summ["mcc_curve"] = "mcc_curve.csv"
+                else:
+                    summ.pop("mcc_curve", None)  # 이전 실행이 남긴 참조도 제거
         except Exception as e:
             # MCC는 선택사항이므로 실패해도 전체 실패로 만들지 않음
             summ.setdefault("mcc", None)
@@ -193,5 +250,21 @@ if __name__ == "__main__":
     ap.add_argument("--csv-glob", required=True)
     ap.add_argument("--thr", type=float, default=0.83)
     ap.add_argument("--hold", type=int, default=9)
+    ap.add_argument("--thr-list", nargs="+", type=float, help="also write mcc_curve.csv over these thresholds")
+    ap.add_argument("--hold-list", nargs="+", type=int, help="forward-hold horizons for mcc_curve.csv")
+    ap.add_argument("--store", default=None, help="result store SQLite (default: $MR4T_RESULT_STORE; unset = off)")
     args = ap.parse_args()
-    enrich_metrics(args.outdir, args.data_root, args.csv_glob, args.thr, args.hold)
\ No newline at end of file
+    enrich_metrics(args.outdir, args.data_root, args.csv_glob, args.thr, args.hold,
+                   args.thr_list, args.hold_list)
+    import result_store
+    store = result_store.store_path(args.store)
+    if store:
+        pu = os.path.join(args.outdir, "params_used.yml")
+        used = {}
+        if os.path.exists(pu):
+            import yaml
+            with open(pu, "r", encoding="utf-8") as f: used = yaml.safe_load(f) or {}
+        # run 식별은 실행한 쪽 manifest 의 run_id (--thr/--hold 는 MCC 라벨용) — 없으면 overlay 없는 실행으로 간주
+        ident = result_store.manifest_identity(args.outdir) or {"run_id": None, "thr": None, "hold": None, "filter": None}
+        result_store.record_run(store, args.outdir, used, ident["thr"], ident["hold"], ident["filter"], "metrics_enforcer",
+                                data_cache.match_csvs(args.data_root, args.csv_glob), run_id=ident["run_id"])
\ No newline at end of file
@@ -0,0 +1,122 @@
+# ci/multi_loader.py
+# 목적: glob 에 걸린 데이터 파일 전부를 심볼별 하나의 시간순 배열 세트로 (월/연 단위 분할, BTC/ETH/SOL 여러 심볼)
+#  - 심볼: 파일 이름에서 SYMBOL_RE (예: ETHUSDT_1min_2023-05.csv → ETHUSDT), 못 찾으면 파일 이름 stem
+#  - [start, end) 가 주어지면 사이드카 인덱스(data_index)의 첫/마지막 open_time 으로 범위 밖 파일은 열지 않음
+#  - 남은 파일은 스레드 풀에서 동시에 로드 (data_cache memmap, 첫 사용 시 CSV 파싱 → C 파서는 GIL 해제)
+#  - 심볼별로 이어 붙여 open_time 안정 정렬, 같은 시각이 여러 파일에 있으면 경로 순서상 나중 파일 값을 유지
+#  - 컬럼은 그 심볼의 모든 파일에 공통인 숫자 컬럼 (columns= 로 지정 가능)
+# Usage:
+#   python ci/multi_loader.py --data-root data --csv-glob "**/*1min*.csv" --start 2023-01-01 --end 2024-01-01
+
+import argparse, os, re, time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import data_cache, data_index
+
+SYMBOL_RE = r"([A-Z0-9]{2,12}?(?:USDT|USDC|FDUSD|BUSD|USD|BTC|ETH))"
+
+def symbol_of(path, pattern=SYMBOL_RE):
+    stem = os.path.splitext(os.path.basename(path))[0]
+    m = re.search(pattern, stem.upper())
+    return m.group(1) if m else stem
+
+def _overlaps(path, lo, hi):
+    if lo is None and hi is None:
+        return True
+    m = data_index.probe(path)
+    if m["first_ns"] is None:
+        return True  # 시간 컬럼을 못 찾음 → 로드해서 판단
+    return (lo is None or m["last_ns"] >= lo) and (hi is None or m["first_ns"] < hi)
+
+def _load_one(path, lo, hi, columns):
+    arr = data_cache.load_columns(path, None if columns is None else ["open_time", *columns])
+    if "open_time" not in arr:
+        raise ValueError(f"[multi_loader] no time column in {path}")
+    ot = np.asarray(arr["open_time"])
+    if len(ot) > 1 and (ot[1:] >= ot[:-1]).all():  # 정렬된 파일: 구간만 잘라냄 (memmap slice)
+        a = 0 if lo is None else int(np.searchsorted(ot, lo, side="left"))
+        b = len(ot) if hi is None else int(np.searchsorted(ot, hi, side="left"))
+        sel = slice(a, b)
+    else:
+        sel = np.ones(len(ot), dtype=bool)
+        if lo is not None: sel &= ot >= lo
+        if hi is not None: sel &= ot < hi
+    return {c: np.asarray(v[sel]) for c, v in arr.items()}
+
+def plan(data_root, csv_glob, start=None, end=None, symbol_re=SYMBOL_RE, symbols=None):
+    """{symbol: [path, ...]} (범위 밖 파일 제외), 제외된 파일 목록"""
+    lo = None if start is None else int(data_cache.to_epoch_ns([start])[0])
+    hi = None if end is None else int(data_cache.to_epoch_ns([end])[0])
+    groups, pruned = {}, []
+    for p in data_cache.match_csvs(data_root, csv_glob):
+        sym = symbol_of(p, symbol_re)
+        if symbols and sym not in symbols:
+            continue
+        if _overlaps(p, lo, hi):
+            groups.setdefault(sym, []).append(p)
+        else:
+            pruned.append(p)
+    return groups, pruned, lo, hi
+
+def merge(parts):
+    """파일별 배열 dict 목록 → 정렬 + 중복 시각 제거된 배열 dict, 제거된 행 수"""
+    cols = ["open_time"] + [c for c in parts[0] if c != "open_time" and all(c in p for p in parts[1:])]
+    cat = {c: np.concatenate([p[c] for p in parts]) for c in cols}
+    ot = cat["open_time"]
+    order = np.argsort(ot, kind="stable")
+    ot_s = ot[order]
+    keep = np.r_[ot_s[1:] != ot_s[:-1], True] if len(ot_s) else np.zeros(0, dtype=bool)  # 같은 시각은 마지막 것
+    idx = order[keep]
+    return {c: np.ascontiguousarray(cat[c][idx]) for c in cols}, int((~keep).sum())
+
+def load(data_root, csv_glob, start=None, end=None, columns=None, workers=None, symbol_re=SYMBOL_RE, symbols=None):
+    """{symbol: {"open_time": int64 ns, col: float64, ...}}, 통계 dict"""
+    groups, pruned, lo, hi = plan(data_root, csv_glob, start, end, symbol_re, symbols)
+    jobs = [(sym, p) for sym, ps in groups.items() for p in ps]
+    workers = min(workers or os.cpu_count() or 1, max(len(jobs), 1))
+    with ThreadPoolExecutor(max_workers=workers) as ex:
+        loaded = list(ex.map(lambda j: _load_one(j[1], lo, hi, columns), jobs))
+    per = {}
+    for (sym, _), arr in zip(jobs, loaded):
+        per.setdefault(sym, []).append(arr)
+    out, stats = {}, {"files": len(jobs), "pruned": pruned, "symbols": {}}
+    for sym, parts in per.items():
+        out[sym], dupes = merge(parts)
+        ot = out[sym]["open_time"]
+        stats["symbols"][sym] = {"files": groups[sym], "rows": int(len(ot)), "duplicates": dupes,
+                                 "first_ns": int(ot[0]) if len(ot) else None, "last_ns": int(ot[-1]) if len(ot) else None}
+    return out, stats
+
+def frame(arrays):
+    """배열 dict → DataFrame(open_time=datetime64[ns], ...) — 러너에 그대로 넘길 수 있는 형태"""
+    import pandas as pd
+    df = pd.DataFrame({c: v for c, v in arrays.items() if c != "open_time"})
+    df.insert(0, "open_time", np.asarray(arrays["open_time"]).view("datetime64[ns]"))
+    return df
+
+def data_key(stats, sym, start=None, end=None):
+    """심볼 데이터 식별자 (feature_cache / result_store 용): 파일 캐시 키 + 구간"""
+    keys = ",".join(data_cache.cache_key(p) for p in stats["symbols"][sym]["files"])
+    return f"{sym}:{keys}" + (f":{start}:{end}" if start or end else "")
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--data-root", default=".")
+    ap.add_argument("--csv-glob", required=True)
+    ap.add_argument("--start", default=None)
+    ap.add_argument("--end", default=None)
+    ap.add_argument("--symbols", nargs="*", default=None)
+    ap.add_argument("--symbol-re", default=SYMBOL_RE)
+    ap.add_argument("--workers", type=int, default=None)
+    args = ap.parse_args()
+    t0 = time.time()
+    out, stats = load(args.data_root, args.csv_glob, args.start, args.end, None, args.workers, args.symbol_re, args.symbols)
+    if not out:
+        print("[multi_loader] No CSV matched (or all pruned)"); raise SystemExit(11)
+    print(f"[multi_loader] {stats['files']} files ({len(stats['pruned'])} pruned) -> {len(out)} symbols in {time.time()-t0:.2f}s")
+    for sym, s in stats["symbols"].items():
+        rng = " .. ".join(str(np.datetime64(x, "ns")) for x in (s["first_ns"], s["last_ns"])) if s["rows"] else "-"
+        print(f"  {sym}: files={len(s['files'])} rows={s['rows']} dupes={s['duplicates']} {rng} cols={list(out[sym])}")
+
+if __name__ == "__main__":
+    main()
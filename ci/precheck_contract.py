@@ -1,37 +1,35 @@
 # ci/precheck_contract.py
-import argparse, os, glob, json, pandas as pd
+import argparse, os, json
 
 OK, WARN, FAIL = "OK","WARN","FAIL"
 def _exists(p): return os.path.exists(p)
 
 def check_data(root, pattern):
-    matches = glob.glob(os.path.join(root, pattern), recursive=True)
+    import data_cache, data_index
+    matches = data_cache.match_csvs(root, pattern)
     if not matches: return FAIL, "no CSV matched"
-    import pandas as pd
-    df = pd.read_csv(matches[0], nrows=5)
-    cols = {c.lower() for c in df.columns}
+    meta = data_index.probe(matches[0])  # 헤더/행 수는 사이드카 인덱스에서 (CSV 전체 파싱 없음)
+    cols = {c.lower() for c in meta["columns"]}
     need = {"close"}; dt_candidates = {"open_time","timestamp","time","datetime","date"}
     if "close" not in cols or not (cols & dt_candidates):
         return FAIL, f"data columns miss: have={sorted(cols)[:10]}"
-    return OK, f"csv_ok: {os.path.basename(matches[0])}"
+    return OK, f"csv_ok: {os.path.basename(matches[0])} rows={meta['rows']}"
 
 def check_trades(outdir):
-    p = os.path.join(outdir, "trades.csv")
-    if not _exists(p): return WARN, "trades.csv missing (will be empty)"
-    import pandas as pd
-    df = pd.read_csv(p, nrows=10)
-    cols = {c.lower() for c in df.columns}
+    import artifacts  # .npz 우선, 없으면 .csv — 헤더만 읽음
+    cols = artifacts.columns(outdir, "trades")
+    if cols is None: return WARN, "trades.csv/.npz missing (will be empty)"
+    cols = {c.lower() for c in cols}
     need = {"open_time","event"}
     if not need.issubset(cols):
         return FAIL, f"trades miss: need {need}, have={cols}"
     return OK, f"trades_ok cols={list(cols)[:6]}"
 
 def check_preds(outdir):
-    p = os.path.join(outdir, "preds_test.csv")
-    if not _exists(p): return WARN, "preds_test.csv missing (MCC skipped)"
-    import pandas as pd
-    df = pd.read_csv(p, nrows=5)
-    cols = {c.lower() for c in df.columns}
+    import artifacts
+    cols = artifacts.columns(outdir, "preds_test")
+    if cols is None: return WARN, "preds_test.csv/.npz missing (MCC skipped)"
+    cols = {c.lower() for c in cols}
     prob_cols = ["p","p_gate","gatep","prob","score","p_trend","p_range"]
     okprob = next((c for c in prob_cols if c in cols), None)
     if "open_time" not in cols or not okprob:
@@ -0,0 +1,73 @@
+# ci/profiling.py
+# 목적: 파이프라인 단계별 wall / CPU 시간, peak RSS 기록 (+ 선택적으로 cProfile)
+#  - with timer.stage("runner"): ...  → timer.report() 를 manifest.json / timings.json 에 기록
+#  - peak RSS는 프로세스 누적 최대값(ru_maxrss)이라 단계 종료 시점의 값과 증가분을 함께 남김
+
+import os, sys, json, time, contextlib
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+def peak_rss_mb():
+    if resource is None:
+        return None
+    r = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # linux: KB, macOS: bytes
+    return round(r / (1024.0 * 1024.0) if sys.platform == "darwin" else r / 1024.0, 1)
+
+class StageTimer:
+    def __init__(self):
+        self.stages = []
+        self._t0 = time.perf_counter(); self._c0 = time.process_time()
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        w0, c0, m0 = time.perf_counter(), time.process_time(), peak_rss_mb()
+        rec = {"stage": name}
+        try:
+            yield rec
+        except BaseException as e:
+            rec["error"] = type(e).__name__
+            raise
+        finally:
+            m1 = peak_rss_mb()
+            rec.update({
+                "wall_s": round(time.perf_counter() - w0, 4),
+                "cpu_s": round(time.process_time() - c0, 4),
+                "peak_rss_mb": m1,
+                "rss_growth_mb": (round(m1 - m0, 1) if m1 is not None and m0 is not None else None),
+            })
+            self.stages.append(rec)
+            print(f"[timing] {name}: wall={rec['wall_s']:.3f}s cpu={rec['cpu_s']:.3f}s peak_rss={m1}MB")
+
+    def report(self):
+        return {
+            "stages": self.stages,
+            "total_wall_s": round(time.perf_counter() - self._t0, 4),
+            "total_cpu_s": round(time.process_time() - self._c0, 4),
+            "peak_rss_mb": peak_rss_mb(),
+        }
+
+    def write(self, outdir, fn="timings.json"):
+        os.makedirs(outdir, exist_ok=True)
+        with open(os.path.join(outdir, fn), "w", encoding="utf-8") as f:
+            json.dump(self.report(), f, ensure_ascii=False, indent=2)
+
+@contextlib.contextmanager
+def cprofile_to(outdir, name="runner", top=40):
+    """cProfile 결과를 <name>.prof (pstats 바이너리) + <name>_profile.txt (cumulative 상위 top개)로 저장"""
+    import cProfile, pstats, io
+    pr = cProfile.Profile()
+    pr.enable()
+    try:
+        yield pr
+    finally:
+        pr.disable()
+        os.makedirs(outdir, exist_ok=True)
+        pr.dump_stats(os.path.join(outdir, f"{name}.prof"))
+        buf = io.StringIO()
+        pstats.Stats(pr, stream=buf).sort_stats("cumulative").print_stats(top)
+        with open(os.path.join(outdir, f"{name}_profile.txt"), "w", encoding="utf-8") as f:
+            f.write(buf.getvalue())
@@ -0,0 +1,214 @@
+# ci/result_store.py
+# 목적: 실행 결과를 zip/json/csv 번들 대신 로컬 SQLite 하나에 누적 (비교/랭킹은 SQL 한 번)
+#  - runs    : run_id(PK), 생성 시각, source(wfo_entry/sensitivity_vec/metrics_enforcer/ingest),
+#              params_hash, thr, hold, filter, outdir, data 지문, params JSON
+#  - metrics : (run_id, key) → value  — summary.json 의 숫자 값 전부 (key, value 인덱스로 랭킹 쿼리)
+#  - trades  : run_id 별 trades.csv 행 (t_idx, event, open_time int64 ns, pnl_close_based)
+#  - run_id = sha1(params + thr/hold/filter + 데이터 지문)[:16] → 같은 설정을 다시 돌리면 같은 run_id 를 교체
+#      실행한 쪽 (wfo_entry / sensitivity_vec) 이 outdir/manifest.json 에 run_id 를 남기고, 같은 outdir 을 나중에 기록하는
+#      metrics_enforcer 는 그 run_id 를 그대로 씀 (자기 --thr/--hold 는 MCC 라벨용이지 실행 파라미터가 아님)
+#  - 저장 위치: --store 인자 또는 MR4T_RESULT_STORE (둘 다 없으면 기록하지 않음)
+#  - WAL 모드 + busy timeout → 풀 워커 여러 개가 동시에 기록해도 안전
+# Usage:
+#   python ci/result_store.py --db results.sqlite --top 20 --metric cum_pnl_close_based
+#   python ci/result_store.py --db results.sqlite --ingest all_artifacts    # 기존 bundle zip 들 백필
+
+import argparse, os, json, glob, hashlib, sqlite3, datetime, zipfile
+import numpy as np
+import pandas as pd
+import data_cache, artifacts
+
+STORE_ENV = "MR4T_RESULT_STORE"
+WIDE_KEYS = ["cum_pnl_close_based", "entries", "exits", "win_rate", "profit_factor", "mcc", "avg_gatep"]
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id TEXT PRIMARY KEY, created_at TEXT, source TEXT, params_hash TEXT,
+    thr REAL, hold INTEGER, filter TEXT, outdir TEXT, data_fp TEXT, params_json TEXT);
+CREATE TABLE IF NOT EXISTS metrics (
+    run_id TEXT NOT NULL, key TEXT NOT NULL, value REAL, PRIMARY KEY (run_id, key));
+CREATE TABLE IF NOT EXISTS trades (
+    run_id TEXT NOT NULL, row INTEGER NOT NULL, t_idx INTEGER, event TEXT, open_time INTEGER, pnl_close_based REAL);
+CREATE INDEX IF NOT EXISTS metrics_key_value ON metrics (key, value);
+CREATE INDEX IF NOT EXISTS trades_run ON trades (run_id, row);
+CREATE INDEX IF NOT EXISTS runs_thr_hold ON runs (thr, hold, filter);
+"""
+
+def store_path(path=None):
+    return path or os.environ.get(STORE_ENV) or None
+
+def connect(path):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    con = sqlite3.connect(path, timeout=60)
+    con.execute("PRAGMA journal_mode=WAL")
+    con.execute("PRAGMA synchronous=NORMAL")
+    con.executescript(SCHEMA)
+    return con
+
+def params_hash(params):
+    return hashlib.sha1(json.dumps(params or {}, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+def make_run_id(params, thr=None, hold=None, filt=None, data_fp=""):
+    raw = json.dumps({"p": params_hash(params), "thr": thr, "hold": hold, "filter": filt, "data": data_fp},
+                     sort_keys=True, default=str)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:16]
+
+def data_fingerprint(paths):
+    return ",".join(data_cache.cache_key(p) for p in paths if os.path.exists(p))
+
+def run_identity(params, thr=None, hold=None, filt=None, data_paths=()):
+    """{run_id, thr, hold, filter} — 실행한 쪽이 manifest.json 에 남기고, 나중 기록자(metrics_enforcer)는 그대로 재사용"""
+    return {"run_id": make_run_id(params, thr, hold, filt, data_fingerprint(data_paths)),
+            "thr": thr, "hold": hold, "filter": filt}
+
+def stamp_manifest(outdir, ident):
+    """outdir/manifest.json 에 run_identity 병합 (없으면 생성)"""
+    mp = os.path.join(outdir, "manifest.json")
+    man = {}
+    if os.path.exists(mp):
+        with open(mp, "r", encoding="utf-8") as f: man = json.load(f)
+    man.update(ident)
+    with open(mp, "w", encoding="utf-8") as f:
+        json.dump(man, f, ensure_ascii=False, indent=2)
+
+def manifest_identity(outdir):
+    """outdir/manifest.json 의 {run_id, thr, hold, filter} (run_id 가 없으면 None)"""
+    mp = os.path.join(outdir, "manifest.json")
+    try:
+        with open(mp, "r", encoding="utf-8") as f: man = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not man.get("run_id"):
+        return None
+    return {k: man.get(k) for k in ("run_id", "thr", "hold", "filter")}
+
+def _numeric_items(summ, prefix=""):
+    for k, v in (summ or {}).items():
+        if isinstance(v, bool):
+            yield prefix + k, float(v)
+        elif isinstance(v, (int, float)) and v is not None:
+            yield prefix + k, float(v)
+        elif isinstance(v, dict):
+            yield from _numeric_items(v, prefix + k + ".")
+
+def _trade_rows(run_id, tr):
+    if tr is None or tr.empty:
+        return []
+    cols = {str(c).lower(): c for c in tr.columns}
+    ev = tr[cols["event"]].astype(str).to_numpy() if "event" in cols else np.full(len(tr), None)
+    ti = pd.to_numeric(tr[cols["t_idx"]], errors="coerce").to_numpy() if "t_idx" in cols else np.full(len(tr), np.nan)
+    ot = data_cache.to_epoch_ns(tr[cols["open_time"]]) if "open_time" in cols else np.full(len(tr), np.iinfo(np.int64).min)
+    pnl = (pd.to_numeric(tr[cols["pnl_close_based"]], errors="coerce").to_numpy()
+           if "pnl_close_based" in cols else np.full(len(tr), np.nan))
+    nat = np.iinfo(np.int64).min
+    return [(run_id, i, None if np.isnan(ti[i]) else int(ti[i]), ev[i], None if ot[i] == nat else int(ot[i]),
+             None if np.isnan(pnl[i]) else float(pnl[i])) for i in range(len(tr))]
+
+def write(path, run_id, meta, summ, trades=None):
+    """run 1개를 (교체) 기록. meta: source/params/thr/hold/filter/outdir/data_fp"""
+    con = connect(path)
+    try:
+        with con:
+            con.execute("DELETE FROM metrics WHERE run_id = ?", (run_id,))
+            con.execute("DELETE FROM trades WHERE run_id = ?", (run_id,))
+            p = meta.get("params") or {}
+            con.execute("INSERT OR REPLACE INTO runs VALUES (?,?,?,?,?,?,?,?,?,?)", (
+                run_id, datetime.datetime.utcnow().isoformat() + "Z", meta.get("source"), params_hash(p),
+                meta.get("thr"), meta.get("hold"), meta.get("filter"), meta.get("outdir"), meta.get("data_fp"),
+                json.dumps(p, sort_keys=True, default=str)))
+            con.executemany("INSERT INTO metrics VALUES (?,?,?)",
+                            [(run_id, k, v) for k, v in _numeric_items(summ) if not np.isnan(v)])
+            con.executemany("INSERT INTO trades VALUES (?,?,?,?,?,?)", _trade_rows(run_id, trades))
+    finally:
+        con.close()
+    return run_id
+
+def record_run(path, outdir, params, thr=None, hold=None, filt=None, source="wfo_entry", data_paths=(), run_id=None):
+    """outdir 의 summary.json / trades(.npz/.csv) 를 기록 → run_id (path 가 None 이면 아무것도 안 함)"""
+    path = store_path(path)
+    if not path:
+        return None
+    summ, tr = {}, None
+    sp = os.path.join(outdir, "summary.json")
+    if os.path.exists(sp):
+        with open(sp, "r", encoding="utf-8") as f: summ = json.load(f)
+    try: tr = artifacts.read_table(outdir, "trades")
+    except Exception: tr = None
+    fp = data_fingerprint(data_paths)
+    rid = run_id or make_run_id(params, thr, hold, filt, fp)
+    write(path, rid, {"source": source, "params": params, "thr": thr, "hold": hold, "filter": filt,
+                      "outdir": os.path.abspath(outdir), "data_fp": fp}, summ, tr)
+    print(f"[result_store] {source}: run {rid} -> {path}")
+    return rid
+
+def ingest(path, root):
+    """기존 번들 zip (bundle_*/sweep_*/...) 백필 — run_id 는 번들 이름에서 (aggregate.infer_run_id)"""
+    import aggregate
+    n = 0
+    for zp in sorted(glob.glob(os.path.join(root, "**", "*.zip"), recursive=True)):
+        try:
+            with zipfile.ZipFile(zp) as z:
+                s, pu = (aggregate._member(z, fn) for fn in ("summary.json", "params_used.yml"))
+                if not s: continue
+                with z.open(s) as f: summ = json.load(f)
+                tr = artifacts.read_member(z, "trades")
+                params = {}
+                if pu:
+                    import yaml
+                    with z.open(pu) as f: params = yaml.safe_load(f) or {}
+        except Exception as e:
+            print(f"[result_store] skip {zp}: {e}"); continue
+        rid = aggregate.infer_run_id(os.path.splitext(os.path.basename(zp))[0])
+        thr = hold = filt = None
+        if rid.startswith("thr="):
+            kv = dict(x.split("=", 1) for x in rid.split(","))
+            thr, hold, filt = float(kv["thr"]), int(kv["hold"]), kv["filter"]
+        write(path, rid, {"source": "ingest", "params": params, "thr": thr, "hold": hold, "filter": filt,
+                          "outdir": os.path.abspath(zp)}, summ, tr)
+        n += 1
+    return n
+
+def top(path, metric="cum_pnl_close_based", n=20, ascending=False):
+    """metric 기준 상위 n개 run + 주요 지표 (wide)"""
+    con = connect(path)
+    try:
+        q = f"""SELECT r.run_id, r.source, r.thr, r.hold, r.filter, m.value AS {json.dumps(metric)}
+                FROM metrics m JOIN runs r USING (run_id) WHERE m.key = ?
+                ORDER BY m.value {"ASC" if ascending else "DESC"} LIMIT ?"""
+        df = pd.read_sql_query(q, con, params=(metric, int(n)))
+        if len(df):
+            ids = df["run_id"].tolist()
+            keys = [k for k in WIDE_KEYS if k != metric]
+            wide = pd.read_sql_query(
+                f"SELECT run_id, key, value FROM metrics WHERE run_id IN ({','.join('?' * len(ids))}) "
+                f"AND key IN ({','.join('?' * len(keys))})", con, params=ids + keys)
+            if len(wide):
+                df = df.merge(wide.pivot(index="run_id", columns="key", values="value").reset_index(), on="run_id", how="left")
+        return df
+    finally:
+        con.close()
+
+def trades(path, run_id):
+    con = connect(path)
+    try:
+        return pd.read_sql_query("SELECT * FROM trades WHERE run_id = ? ORDER BY row", con, params=(run_id,))
+    finally:
+        con.close()
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--db", default=None, help=f"SQLite path (default: ${STORE_ENV})")
+    ap.add_argument("--ingest", default="", help="backfill from bundle zips under this root")
+    ap.add_argument("--metric", default="cum_pnl_close_based")
+    ap.add_argument("--top", type=int, default=20)
+    ap.add_argument("--asc", action="store_true")
+    args = ap.parse_args()
+    path = store_path(args.db)
+    if not path:
+        raise SystemExit(f"[result_store] --db or ${STORE_ENV} required")
+    if args.ingest:
+        print(f"[result_store] ingested {ingest(path, args.ingest)} bundles from {args.ingest}")
+    df = top(path, args.metric, args.top, args.asc)
+    print(df.to_string(index=False) if len(df) else f"[result_store] no runs with metric {args.metric}")
+
+if __name__ == "__main__":
+    main()
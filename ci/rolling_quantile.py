@@ -0,0 +1,256 @@
+# ci/rolling_quantile.py
+# 목적: 롤링 윈도우의 여러 분위수를 한 번의 패스로 계산 (regime 의 vahval_quantile / range_lo·trend_hi 밴드용)
+#  - pandas Series.rolling(window, min_periods).quantile(q) (interpolation="linear")와 같은 값
+#    (NaN 제외 nobs 기준, nobs < min_periods 이면 NaN, vlow + (vhigh - vlow) * frac)
+#  - numba 있으면 윈도우 상태를 한 번만 갱신하고 분위수 여러 개를 같은 상태에서 조회 (q 개수만큼 패스를 다시 돌지 않음)
+#      window <= SORTED_MAX : 정렬된 윈도우 버퍼 (이분 탐색 + 나간 값/들어온 값 사이만 이동, 분위수 조회 O(1))
+#      그보다 큰 window     : 전체 값 순위(rank) 위의 Fenwick tree 순서통계량 (삽입/삭제/k번째 조회 O(log n))
+#  - numba 없으면: pandas rolling quantile (C skiplist) 을 분위수마다 돌리는 경로로 대체
+#  - StreamWindow: 값을 하나씩 받는 증분판 (stream_engine 레짐 밴드) — 미래 값의 순위를 모르므로 Fenwick 대신
+#      window <= SORTED_MAX : 정렬 리스트 (bisect, 삽입/삭제는 최대 window 칸 memmove — 이 크기에선 가장 빠름)
+#      그보다 큰 window     : indexable skiplist (삽입/삭제/k번째 조회 기대 O(log w), pandas 의 skiplist 와 같은 구조)
+# Usage (parity + timing):
+#   python ci/rolling_quantile.py --n 2600000 --window 720 --q 0.15 0.35 0.74 0.85
+
+import argparse, time, math, bisect, random
+from collections import deque
+import numpy as np
+
+try:
+    from numba import njit
+except ImportError:  # 코드팩 러너 밖(예: CI 집계 단계)에서는 numba가 없을 수 있음
+    njit = None
+
+SORTED_MAX = 2048
+
+def _bisect(buf, nobs, v):
+    lo = 0; hi = nobs
+    while lo < hi:
+        mid = (lo + hi) >> 1
+        if buf[mid] < v: lo = mid + 1
+        else: hi = mid
+    return lo
+
+def _sorted_kernel(x, window, minp, qs):
+    n = x.shape[0]; k = qs.shape[0]
+    out = np.empty((n, k), dtype=np.float64)
+    buf = np.empty(window + 1, dtype=np.float64)
+    nobs = 0
+    for i in range(n):
+        v = x[i]
+        old = x[i - window] if i >= window else np.nan
+        if old == old:  # 나가는 값이 유효
+            p = _bisect(buf, nobs, old)
+            if v == v:  # 교체: p 와 삽입 위치 사이만 한 칸씩 이동
+                q = _bisect(buf, nobs, v)
+                if q > p:
+                    for j in range(p, q - 1): buf[j] = buf[j + 1]
+                    buf[q - 1] = v
+                else:
+                    for j in range(p, q, -1): buf[j] = buf[j - 1]
+                    buf[q] = v
+            else:
+                for j in range(p, nobs - 1): buf[j] = buf[j + 1]
+                nobs -= 1
+        elif v == v:
+            q = _bisect(buf, nobs, v)
+            for j in range(nobs, q, -1): buf[j] = buf[j - 1]
+            buf[q] = v; nobs += 1
+        if nobs == 0 or nobs < minp:
+            for c in range(k):
+                out[i, c] = np.nan
+            continue
+        for c in range(k):
+            f = qs[c] * (nobs - 1)
+            idx = int(f)
+            vlow = buf[idx]
+            out[i, c] = vlow if f == idx else vlow + (buf[idx + 1] - vlow) * (f - idx)
+    return out
+
+def _fenwick_kernel(rank, svals, window, minp, qs):
+    n = rank.shape[0]; m = svals.shape[0]; k = qs.shape[0]
+    out = np.empty((n, k), dtype=np.float64)
+    tree = np.zeros(m + 1, dtype=np.int64)
+    top = 1
+    while top * 2 <= m:
+        top *= 2
+    nobs = 0
+    for i in range(n):
+        r = rank[i]
+        if r >= 0:
+            j = r + 1
+            while j <= m:
+                tree[j] += 1; j += j & (-j)
+            nobs += 1
+        if i >= window:
+            r = rank[i - window]
+            if r >= 0:
+                j = r + 1
+                while j <= m:
+                    tree[j] -= 1; j += j & (-j)
+                nobs -= 1
+        if nobs == 0 or nobs < minp:
+            for c in range(k):
+                out[i, c] = np.nan
+            continue
+        for c in range(k):
+            f = qs[c] * (nobs - 1)
+            idx = int(f)
+            # idx 번째(0-based) 원소: Fenwick tree 내림 탐색
+            pos = 0; rem = idx + 1; step = top
+            while step > 0:
+                if pos + step <= m and tree[pos + step] < rem:
+                    pos += step; rem -= tree[pos]
+                step >>= 1
+            vlow = svals[pos]
+            if f == idx:
+                out[i, c] = vlow
+                continue
+            pos = 0; rem = idx + 2; step = top
+            while step > 0:
+                if pos + step <= m and tree[pos + step] < rem:
+                    pos += step; rem -= tree[pos]
+                step >>= 1
+            out[i, c] = vlow + (svals[pos] - vlow) * (f - idx)
+    return out
+
+if njit is not None:
+    _bisect = njit(cache=True)(_bisect)
+    _sorted_jit = njit(cache=True)(_sorted_kernel)
+    _fenwick_jit = njit(cache=True)(_fenwick_kernel)
+else:
+    _sorted_jit = _fenwick_jit = None
+
+def _pandas(x, window, qs, minp):
+    import pandas as pd
+    r = pd.Series(x).rolling(window, min_periods=minp)
+    return np.column_stack([r.quantile(float(q)).to_numpy() for q in qs])
+
+def rolling_quantiles(x, window, qs, min_periods=None, engine=None):
+    """x 의 길이-window 롤링 분위수들 → shape (n, len(qs)) 배열.
+    engine: None(자동) | "numba" | "pandas" """
+    x = np.asarray(x, dtype=np.float64)
+    window = int(window)
+    minp = window if min_periods is None else int(min_periods)
+    qs_a = np.atleast_1d(np.asarray(qs, dtype=np.float64))
+    if window < 1:
+        raise ValueError("[rolling_quantile] window must be >= 1")
+    if ((qs_a < 0) | (qs_a > 1)).any():
+        raise ValueError(f"[rolling_quantile] quantiles must be in [0, 1]: {qs_a.tolist()}")
+    engine = engine or ("numba" if _sorted_jit is not None else "pandas")
+    if engine == "pandas":
+        return _pandas(x, window, qs_a, minp)
+    if engine != "numba" or _sorted_jit is None:
+        raise ValueError(f"[rolling_quantile] engine not available: {engine}")
+    if window <= SORTED_MAX:
+        return _sorted_jit(x, window, max(minp, 1), qs_a)
+    valid = ~np.isnan(x)
+    order = np.argsort(x[valid], kind="stable")
+    rank = np.full(len(x), -1, dtype=np.int64)
+    rank[np.flatnonzero(valid)[order]] = np.arange(len(order), dtype=np.int64)
+    return _fenwick_jit(rank, x[valid][order], window, max(minp, 1), qs_a)
+
+def rolling_quantile(x, window, q, min_periods=None, engine=None):
+    return rolling_quantiles(x, window, [q], min_periods, engine)[:, 0]
+
+class _Skiplist:
+    """indexable skiplist: 노드 = [value, next[], width[]] — width[l] = l 층에서 다음 노드까지 건너는 원소 수"""
+    def __init__(self, expected):
+        self.levels = max(1, int(math.log2(max(expected, 2))) + 1)
+        self.nil = [math.inf, [], []]
+        self.head = [-math.inf, [self.nil] * self.levels, [1] * self.levels]
+        self.rng = random.Random(0)  # 층 배정만 결정적으로 (값에는 영향 없음)
+    def _chain(self, v, strict):
+        chain, steps, node = [None] * self.levels, [0] * self.levels, self.head
+        for lv in reversed(range(self.levels)):
+            nxt = node[1][lv]
+            while nxt is not self.nil and (nxt[0] < v or (not strict and nxt[0] == v)):
+                steps[lv] += node[2][lv]; node = nxt; nxt = node[1][lv]
+            chain[lv] = node
+        return chain, steps
+    def insert(self, v):
+        chain, steps = self._chain(v, strict=False)
+        d = min(self.levels, 1 - int(math.log2(1.0 - self.rng.random())))
+        new, acc = [v, [None] * d, [0] * d], 0
+        for lv in range(d):
+            prev = chain[lv]
+            new[1][lv], prev[1][lv] = prev[1][lv], new
+            new[2][lv] = prev[2][lv] - acc
+            prev[2][lv] = acc + 1
+            acc += steps[lv]
+        for lv in range(d, self.levels):
+            chain[lv][2][lv] += 1
+    def remove(self, v):
+        chain, _ = self._chain(v, strict=True)
+        node = chain[0][1][0]
+        if node is self.nil or node[0] != v:
+            raise KeyError(v)
+        for lv in range(len(node[1])):
+            prev = chain[lv]
+            prev[2][lv] += node[2][lv] - 1
+            prev[1][lv] = node[1][lv]
+        for lv in range(len(node[1]), self.levels):
+            chain[lv][2][lv] -= 1
+    def __getitem__(self, i):
+        node, i = self.head, i + 1
+        for lv in reversed(range(self.levels)):
+            while node[1][lv] is not self.nil and node[2][lv] <= i:
+                i -= node[2][lv]; node = node[1][lv]
+        return node[0]
+
+class _SortedList:
+    def __init__(self):
+        self.s = []
+    def insert(self, v):
+        bisect.insort(self.s, v)
+    def remove(self, v):
+        del self.s[bisect.bisect_left(self.s, v)]
+    def __getitem__(self, i):
+        return self.s[i]
+
+class StreamWindow:
+    """값 하나씩 update → quantile(q) 는 rolling(window, min_periods).quantile(q) (linear) 의 마지막 값과 같음 (NaN 제외)"""
+    def __init__(self, window, min_periods=None):
+        self.w = int(window); self.minp = self.w if min_periods is None else int(min_periods)
+        self.raw = deque(); self.nobs = 0
+        self.buf = _SortedList() if self.w <= SORTED_MAX else _Skiplist(self.w)
+    def update(self, v):
+        self.raw.append(v)
+        if v == v: self.buf.insert(v); self.nobs += 1
+        if len(self.raw) > self.w:
+            o = self.raw.popleft()
+            if o == o: self.buf.remove(o); self.nobs -= 1
+    def quantile(self, q):
+        n = self.nobs
+        if n == 0 or n < max(self.minp, 1):
+            return math.nan
+        f = q * (n - 1); i = int(f)
+        lo = self.buf[i]
+        return lo if f == i else lo + (self.buf[i + 1] - lo) * (f - i)
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--n", type=int, default=1_000_000)
+    ap.add_argument("--window", type=int, default=720)
+    ap.add_argument("--min-periods", type=int, default=None, help="default: window//2 (regime.py와 동일)")
+    ap.add_argument("--q", nargs="+", type=float, default=[0.15, 0.35, 0.74, 0.85])
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args()
+    rng = np.random.default_rng(args.seed)
+    x = np.cumsum(rng.normal(size=args.n))
+    x[rng.random(args.n) < 0.001] = np.nan
+    minp = args.window // 2 if args.min_periods is None else args.min_periods
+    t0 = time.perf_counter(); ref = _pandas(x, args.window, args.q, minp); t_pd = time.perf_counter() - t0
+    print(f"[rolling_quantile] pandas x{len(args.q)}: {t_pd:.3f}s")
+    if _sorted_jit is None:
+        print("[rolling_quantile] numba not installed: pandas engine only"); return
+    rolling_quantiles(x[:1000], args.window, args.q, minp)  # JIT warm-up
+    t0 = time.perf_counter(); got = rolling_quantiles(x, args.window, args.q, minp); t_nb = time.perf_counter() - t0
+    err = np.nanmax(np.abs(got - ref)) if np.isfinite(ref).any() else 0.0
+    same_nan = bool((np.isnan(got) == np.isnan(ref)).all())
+    print(f"[rolling_quantile] numba one-pass: {t_nb:.3f}s (x{t_pd / max(t_nb, 1e-9):.1f}), max|diff|={err:.3g}, nan_match={same_nan}")
+    if err > 1e-9 or not same_nan:
+        raise SystemExit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+# ci/run_cache.py
+# 목적: 같은 (오버레이 params + 데이터 파일 + 코드팩) 조합이면 러너를 다시 돌리지 않고 결과 복원
+#  - 키: sha256(params 정규화 JSON | 데이터 파일 지문 | 코드팩/러너 바이트 해시)
+#  - 저장 대상: 러너 원본 산출물 (post_enrich 이전) — enrich/sanity는 복원 후 다시 수행
+#  - 용량 상한(MB)을 넘으면 가장 오래 안 쓴 엔트리부터 삭제 (LRU)
+
+import os, json, glob, hashlib, shutil, tempfile, time
+
+CACHE_ENV = "MR4T_RUN_CACHE"
+LIMIT_ENV = "MR4T_RUN_CACHE_MB"
+OUTPUTS = ["trades.csv", "trades.npz", "summary.json", "preds_test.csv", "preds_test.npz", "gating_debug.json"]
+_STAMP = ".last_used"
+
+def cache_root():
+    return os.environ.get(CACHE_ENV) or os.path.join(os.getcwd(), ".run_cache")
+
+def limit_bytes():
+    return int(float(os.environ.get(LIMIT_ENV, "2048")) * 1024 * 1024)
+
+def file_sha256(path, bufsize=1 << 20):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for b in iter(lambda: f.read(bufsize), b""):
+            h.update(b)
+    return h.hexdigest()
+
+def codepack_files(workspace=".", runner=None):
+    zips = sorted(os.path.join(workspace, fn) for fn in os.listdir(workspace)
+                  if fn.endswith(".zip") and "strategy" in fn.lower())
+    return zips + ([runner] if runner and os.path.isfile(runner) else [])
+
+def run_key(params, data_paths, code_paths):
+    h = hashlib.sha256()
+    h.update(json.dumps(params, sort_keys=True, ensure_ascii=False, default=str).encode("utf-8"))
+    for p in sorted(data_paths):
+        st = os.stat(p)  # 데이터는 크기+mtime 지문 (수 GB 파일 전체 해시는 피함)
+        h.update(f"|data:{os.path.basename(p)}:{st.st_size}:{st.st_mtime_ns}".encode("utf-8"))
+    for p in code_paths:
+        h.update(f"|code:{os.path.basename(p)}:{file_sha256(p)}".encode("utf-8"))
+    return h.hexdigest()[:24]
+
+def _entry(key):
+    return os.path.join(cache_root(), key)
+
+def restore(key, outdir):
+    """캐시 히트면 outdir에 산출물 복사 후 True"""
+    d = _entry(key)
+    if not os.path.isfile(os.path.join(d, "meta.json")):
+        return False
+    os.makedirs(outdir, exist_ok=True)
+    for fn in OUTPUTS:
+        src = os.path.join(d, fn)
+        if os.path.exists(src):
+            shutil.copy2(src, os.path.join(outdir, fn))
+    with open(os.path.join(d, _STAMP), "w") as f: f.write(str(time.time()))
+    print(f"[run_cache] hit {key}")
+    return True
+
+def store(key, outdir, info=None):
+    root = cache_root()
+    d = _entry(key)
+    if os.path.isdir(d):
+        return d
+    os.makedirs(root, exist_ok=True)
+    tmp = tempfile.mkdtemp(prefix=f".{key}.", dir=root)
+    try:
+        saved = []
+        for fn in OUTPUTS:
+            src = os.path.join(outdir, fn)
+            if os.path.exists(src):
+                shutil.copy2(src, os.path.join(tmp, fn)); saved.append(fn)
+        with open(os.path.join(tmp, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump({"key": key, "files": saved, "info": info or {}, "ts": time.time()}, f, ensure_ascii=False, indent=2)
+        with open(os.path.join(tmp, _STAMP), "w") as f: f.write(str(time.time()))
+        try: os.rename(tmp, d)
+        except OSError: shutil.rmtree(tmp, ignore_errors=True)  # 동시에 다른 워커가 저장
+    except Exception:
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+    print(f"[run_cache] stored {key}")
+    evict()
+    return d
+
+def _dir_size(d):
+    return sum(os.path.getsize(p) for p in glob.glob(os.path.join(d, "*")) if os.path.isfile(p))
+
+def evict(max_bytes=None):
+    """용량 상한을 넘으면 .last_used 가 오래된 순으로 삭제"""
+    max_bytes = limit_bytes() if max_bytes is None else max_bytes
+    root = cache_root()
+    if not os.path.isdir(root):
+        return []
+    ents = []
+    for fn in os.listdir(root):
+        d = os.path.join(root, fn)
+        if fn.startswith(".") or not os.path.isdir(d): continue
+        st = os.path.join(d, _STAMP)
+        used = os.path.getmtime(st) if os.path.exists(st) else os.path.getmtime(d)
+        ents.append((used, _dir_size(d), d))
+    total = sum(sz for _, sz, _ in ents)
+    removed = []
+    for used, sz, d in sorted(ents):
+        if total <= max_bytes: break
+        shutil.rmtree(d, ignore_errors=True)
+        total -= sz; removed.append(os.path.basename(d))
+    if removed:
+        print(f"[run_cache] evicted {len(removed)} entries")
+    return removed
@@ -0,0 +1,145 @@
+# ci/runner_session.py
+# 목적: runpy로 러너를 매번 다시 실행하지 않고, 코드팩 모듈 import / numba JIT / 시세 로드를 1회만 수행
+#  - RunnerSession(data_root, csv_glob).run(params_dict, outdir) → summary dict
+#  - params_dict는 wfo_entry.overlay_params / overlay_dotted 가 만드는 그 dict
+#  - --start/--end: 사이드카 인덱스(data_index)로 [start, end) 구간 바이트만 읽음 (전체 파일 파싱 없음)
+#  - --per-symbol: glob 에 걸린 파일 전부를 심볼별로 합쳐(multi_loader) 심볼마다 같은 grid 실행 → out_root/<SYMBOL>/cell_XXX
+#  - --format npz: trades / preds_test 를 NPZ 로 (artifacts, 기본 $MR4T_OUTPUT_FORMAT 또는 csv), --csv-export 면 CSV 도 유지
+#  - CLI는 grid 파일(YAML/JSON)의 셀을 순서대로 같은 세션에서 실행
+# Usage:
+#   python ci/runner_session.py --params conf/params.v2.yml --data-root . \
+#       --csv-glob "**/*ETHUSDT*1min*.csv" --grid grid.yml --out-root out_session
+# grid.yml:
+#   grid:                 # 카테시안 곱
+#     thr: [0.82, 0.83]
+#     exit.tp_atr: [2.0, 2.2]
+#   cells:                # 또는 명시적 목록 (grid와 같이 쓰면 뒤에 이어 붙음)
+#     - {hold: 12, exit.sl_atr: 0.45}
+
+import argparse, os, sys, json, itertools, time, yaml
+import wfo_entry, data_cache
+
+class RunnerSession:
+    """Warm strategy runner: one import of the codepack and one data load, many overlays."""
+
+    def __init__(self, data_root, csv_glob, workspace=".", codepack_dirs=None, feature_cache=False, start=None, end=None,
+                 data=None, fmt=None, csv_export=False):
+        """data: (DataFrame, data_key) 를 주면 CSV 를 읽지 않고 그 프레임을 사용 (multi_loader 심볼별 실행)"""
+        import pandas as pd, artifacts
+        self.fmt, self.csv_export = artifacts.output_format(fmt), artifacts.csv_export(csv_export or None)
+        self.codepack_dirs = (wfo_entry.unzip_codepack_if_any(workspace)
+                              if codepack_dirs is None else list(codepack_dirs))
+        for p in [os.path.abspath(workspace), *self.codepack_dirs]:
+            if p not in sys.path: sys.path.insert(0, p)
+        import strategy.v2.strategy as strategy_mod
+        self._strategy_cls = strategy_mod.StrategyV2
+        if data is not None:
+            self.data_path, (self.df, data_key) = None, data
+        else:
+            paths = data_cache.match_csvs(data_root, csv_glob)
+            if not paths:
+                raise FileNotFoundError(f"[runner_session] No CSV matched: {csv_glob}")
+            self.data_path = paths[0]
+            data_key = data_cache.cache_key(self.data_path) + (f":{start}:{end}" if start or end else "")
+            # 러너와 동일하게 원본 CSV를 그대로 (open_time 원문 포맷 유지) — 세션당 1회
+            if start or end:
+                import data_index
+                self.df = data_index.read_range(self.data_path, start, end).reset_index(drop=True)
+            else:
+                self.df = pd.read_csv(self.data_path)
+        self.n_runs = 0
+        self.features = None
+        if feature_cache:  # 지표 시계열은 (데이터, 지표 파라미터)당 1회 → 이후 셀은 memmap 재사용
+            import feature_cache as _fc
+            self.features = _fc.attach(strategy_mod)
+            self.features.data_key = data_key
+
+    def run(self, params, outdir, enrich=True):
+        params_path = wfo_entry.write_params_file(params, outdir)
+        import artifacts
+        artifacts.clear_tables(outdir)
+        st = self._strategy_cls(params_path=params_path, outdir=outdir)
+        st.run(self.df)
+        self.n_runs += 1
+        artifacts.convert_outdir(outdir, self.fmt, keep_csv=self.csv_export)
+        if enrich:
+            wfo_entry.post_enrich(outdir)
+        with open(os.path.join(outdir, "summary.json"), "r", encoding="utf-8") as f:
+            return json.load(f)
+
+def load_grid(path):
+    with open(path, "r", encoding="utf-8") as f:
+        g = yaml.safe_load(f) or {}
+    cells = []
+    grid = g.get("grid") or {}
+    if grid:
+        keys = list(grid)
+        for vals in itertools.product(*[v if isinstance(v, list) else [v] for v in grid.values()]):
+            cells.append(dict(zip(keys, vals)))
+    cells += [dict(c) for c in (g.get("cells") or [])]
+    return cells
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--params", "--config", dest="params", required=True)
+    ap.add_argument("--data-root", default=".")
+    ap.add_argument("--csv-glob", required=True)
+    ap.add_argument("--grid", required=True, help="YAML/JSON with 'grid' (cartesian) and/or 'cells' (list)")
+    ap.add_argument("--out-root", default="out_session")
+    ap.add_argument("--no-enrich", action="store_true")
+    ap.add_argument("--feature-cache", action="store_true", help="reuse indicator series across cells/runs")
+    ap.add_argument("--start", default=None, help="only bars with open_time >= start (sidecar index seek)")
+    ap.add_argument("--end", default=None, help="only bars with open_time < end")
+    ap.add_argument("--per-symbol", action="store_true", help="merge all matched files per symbol and run the grid for each")
+    ap.add_argument("--format", default=None, choices=["csv", "npz"],
+                    help="trades/preds_test output format (default: $MR4T_OUTPUT_FORMAT or csv)")
+    ap.add_argument("--csv-export", action="store_true", help="with --format npz: also keep the CSV files")
+    args = ap.parse_args()
+
+    base = wfo_entry.load_params(args.params)
+    cells = load_grid(args.grid)
+    if not cells:
+        raise SystemExit("[runner_session] grid has no cells")
+    t0 = time.time()
+    if args.per_symbol:
+        import multi_loader
+        arrays, stats = multi_loader.load(args.data_root, args.csv_glob, args.start, args.end)
+        if not arrays:
+            raise SystemExit(f"[runner_session] No CSV matched (or all pruned): {args.csv_glob}")
+        print(f"[runner_session] symbols: {sorted(arrays)} ({stats['files']} files, {len(stats['pruned'])} pruned)")
+        targets = [(sym, os.path.join(args.out_root, sym),
+                    (multi_loader.frame(arrays[sym]), multi_loader.data_key(stats, sym, args.start, args.end)))
+                   for sym in sorted(arrays)]
+    else:
+        targets = [(None, args.out_root, None)]
+    rows, codepack_dirs = [], None
+    for sym, out_root, data in targets:
+        sess = RunnerSession(args.data_root, args.csv_glob, os.getcwd(), codepack_dirs, feature_cache=args.feature_cache,
+                             start=args.start, end=args.end, data=data, fmt=args.format, csv_export=args.csv_export)
+        codepack_dirs = sess.codepack_dirs
+        print(f"[runner_session] {sym or 'session'} warm-up {time.time()-t0:.2f}s, {len(cells)} cells")
+        for i, ov in enumerate(cells):
+            outdir = os.path.join(out_root, f"cell_{i:03d}")
+            t1 = time.time()
+            rec = {"cell": f"cell_{i:03d}", "overlay": ov, "outdir": outdir}
+            if sym is not None:
+                rec["symbol"] = sym
+            try:
+                rec["summary"] = sess.run(wfo_entry.overlay_dotted(base, ov), outdir, enrich=not args.no_enrich)
+            except Exception as e:
+                rec["error"] = f"{type(e).__name__}: {e}"
+                print(f"[runner_session] {sym or ''} {rec['cell']} failed: {rec['error']}")
+            rec["sec"] = round(time.time() - t1, 3)
+            rows.append(rec)
+        if sess.features is not None:
+            print(f"[runner_session] feature cache: {sess.features.stats()}")
+            sess.features.detach()
+    wfo_entry.ensure_dir(args.out_root)
+    with open(os.path.join(args.out_root, "session_results.json"), "w", encoding="utf-8") as f:
+        json.dump(rows, f, ensure_ascii=False, indent=2, default=str)
+    print(f"[runner_session] {len(rows)} cells in {time.time()-t0:.2f}s -> {args.out_root}/session_results.json")
+    if any("error" in r for r in rows):
+        raise SystemExit(15)
+
+if __name__ == "__main__":
+    main()
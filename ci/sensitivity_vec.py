@@ -1,5 +1,7 @@
 # ci/sensitivity_vec.py
-import argparse, os, sys, runpy, zipfile, json, yaml, shutil
+import argparse, os, sys, runpy, zipfile, json, yaml, traceback
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
 import pandas as pd
 import numpy as np
@@ -20,12 +22,8 @@ def sanitize_glob(g, repo_root):
 def ensure_codepack(codepack_zip, workdir):
     if not codepack_zip or not os.path.exists(codepack_zip):
         return None
-    out = os.path.join(workdir, "_codepack")
-    if os.path.exists(out):
-        shutil.rmtree(out)
-    with zipfile.ZipFile(codepack_zip) as z:
-        z.extractall(out)
-    return out
+    import codepack  # zip 해시별 캐시 — 내용이 같으면 재추출 안 함
+    return codepack.extract(codepack_zip, codepack.cache_root(workdir))
 
 def patch_params(base_params_path, out_path, thr, hold):
     d = yaml.safe_load(open(base_params_path, "r", encoding="utf-8")) or {}
@@ -39,11 +37,12 @@ def patch_params(base_params_path, out_path, thr, hold):
                    sort_keys=False, allow_unicode=True)
 
 def post_enrich(outdir):
-    tp = os.path.join(outdir, "trades.csv")
+    import artifacts
     sp = os.path.join(outdir, "summary.json")
-    if not os.path.exists(tp):
+    fmt = artifacts.table_format(outdir, "trades")
+    if fmt is None:
         return
-    df = pd.read_csv(tp)
+    df = artifacts.read_table(outdir, "trades")
     ev = next((c for c in df.columns if str(c).lower()=="event"), None)
     if ev is not None:
         df = df[df[ev].astype(str).str.upper()=="EXIT"].copy()
@@ -55,7 +54,7 @@ def post_enrich(outdir):
     if pnl is None:
         df["pnl_close_based"] = 0.0
         pnl = "pnl_close_based"
-        df.to_csv(tp, index=False)
+        artifacts.write_table(df, outdir, "trades", fmt=fmt)
     s = pd.to_numeric(df[pnl], errors="coerce").fillna(0.0)
     summ = {}
     if os.path.exists(sp):
@@ -73,6 +72,54 @@ def zip_dir(path, zip_path):
         for p in Path(path).rglob("*"):
             z.write(p, p.relative_to(path))
 
+def run_cell(runner_path, cp_dir, repo_root, params, data_root, csvg, thr, hold, store=None):
+    """One grid cell: patch params -> runner -> post_enrich -> zip.
+    Runs in-process or inside a pool worker; sys.argv/sys.path are restored
+    afterwards and any failure is returned instead of raised."""
+    outdir = f"out_thr{thr}_h{hold}"
+    pfile  = f"conf/params_thr{thr}_h{hold}.yml"
+    rec = {"thr": thr, "hold": hold, "outdir": outdir, "zip": None, "error": None}
+    saved_argv, saved_path = sys.argv[:], sys.path[:]
+    try:
+        patch_params(params, pfile, thr, hold)
+        # PYTHONPATH (repo + codepack)
+        sys.path[:0] = [repo_root]
+        if cp_dir:
+            sys.path[:0] = [cp_dir, os.path.join(cp_dir, "backtest")]
+        sys.argv = [runner_path,
+                    "--data-root", data_root,
+                    "--csv-glob", csvg,
+                    "--params", pfile,
+                    "--outdir", outdir]
+        import artifacts  # 형식은 MR4T_OUTPUT_FORMAT / MR4T_OUTPUT_CSV (--format 이 설정, spawn 워커에 상속)
+        if os.path.isdir(outdir): artifacts.clear_tables(outdir)
+        try:
+            runpy.run_path(runner_path, run_name="__main__")
+        except SystemExit as e:
+            if e.code not in (None, 0):
+                raise RuntimeError(f"runner exited: {e.code}")
+        artifacts.convert_outdir(outdir)
+        post_enrich(outdir)
+        import result_store, data_cache
+        with open(pfile, "r", encoding="utf-8") as f:
+            used = yaml.safe_load(f) or {}
+        data_paths = data_cache.match_csvs(data_root, csvg)
+        ident = result_store.run_identity(used, float(thr), int(hold), None, data_paths)
+        result_store.stamp_manifest(outdir, ident)  # 워크플로의 metrics_enforcer 단계가 같은 run_id 로 기록
+        if store:
+            rec["run_id"] = result_store.record_run(store, outdir, used, float(thr), int(hold), None, "sensitivity_vec",
+                                                    data_paths, run_id=ident["run_id"])
+        zpath = f"sweep_{thr}_{hold}.zip"
+        zip_dir(outdir, zpath)
+        rec["zip"] = zpath
+    except Exception as e:
+        rec["error"] = f"{type(e).__name__}: {e}"
+        rec["traceback"] = traceback.format_exc()
+        print(f"[sweep] cell thr={thr} hold={hold} failed: {rec['error']}")
+    finally:
+        sys.argv, sys.path[:] = saved_argv, saved_path
+    return rec
+
 def main():
     ap = argparse.ArgumentParser()
     ap.add_argument("--params", required=True)
@@ -83,15 +130,27 @@ def main():
     ap.add_argument("--codepack", default="strategy_v2_codepack_v2.1.3.zip")
     ap.add_argument("--runner", default="")
     ap.add_argument("--out-bundle", default="")
+    ap.add_argument("--store", default=None, help="result store SQLite (default: $MR4T_RESULT_STORE; unset = off)")
+    ap.add_argument("--format", default=None, choices=["csv", "npz"],
+                    help="trades/preds_test output format (default: $MR4T_OUTPUT_FORMAT or csv)")
+    ap.add_argument("--csv-export", action="store_true", help="with --format npz: also keep the CSV files")
+    ap.add_argument("--workers", type=int, default=1,
+                    help="grid cells run in parallel (process pool); 1 = sequential")
     args = ap.parse_args()
 
+    import artifacts
+    if args.format:
+        os.environ[artifacts.FORMAT_ENV] = args.format
+    if args.csv_export:
+        os.environ[artifacts.CSV_EXPORT_ENV] = "1"
+
     repo_root = os.getcwd()
     csvg = sanitize_glob(args.csv_glob, repo_root)
 
     # prepare codepack / runner path
     cp_dir = ensure_codepack(args.codepack, repo_root)
-    if args.runner:
-        runner_path = args.runner
+    if args.runner:  # 상대 경로는 코드팩 캐시 기준 먼저 (코드팩은 워크스페이스에 풀리지 않음)
+        runner_path = next((c for c in [os.path.join(cp_dir or ".", args.runner), args.runner] if os.path.exists(c)), args.runner)
     else:
         runner_path = os.path.join(cp_dir or ".", "backtest", "runner.py")
         if not os.path.exists(runner_path):
@@ -99,39 +158,37 @@ def main():
     if not os.path.exists(runner_path):
         raise FileNotFoundError(f"runner not found: {runner_path}")
 
-    # PYTHONPATH (repo + codepack)
-    sys.path[:0] = [repo_root]
-    if cp_dir:
-        sys.path[:0] = [cp_dir, os.path.join(cp_dir, "backtest")]
-
-    out_zips = []
-    for thr in args.thr_list:
-        for hold in args.hold_list:
-            outdir = f"out_thr{thr}_h{hold}"
-            pfile  = f"conf/params_thr{thr}_h{hold}.yml"
-            patch_params(args.params, pfile, thr, hold)
-
-            saved_argv = sys.argv[:]
-            sys.argv = [runner_path,
-                        "--data-root", args.data_root,
-                        "--csv-glob", csvg,
-                        "--params", pfile,
-                        "--outdir", outdir]
-            try:
-                runpy.run_path(runner_path, run_name="__main__")
-            finally:
-                sys.argv = saved_argv
-
-            post_enrich(outdir)
-            zpath = f"sweep_{thr}_{hold}.zip"
-            zip_dir(outdir, zpath)
-            out_zips.append(zpath)
+    cells = [(thr, hold) for thr in args.thr_list for hold in args.hold_list]
+    common = (runner_path, cp_dir, repo_root, args.params, args.data_root, csvg)
+    import result_store
+    store = result_store.store_path(args.store)
+    recs = []
+    if args.workers > 1 and len(cells) > 1:
+        # spawn: 워커마다 깨끗한 인터프리터 (fork된 sys.modules/numba 상태 공유 안 함)
+        ctx = mp.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=min(args.workers, len(cells)), mp_context=ctx) as ex:
+            futs = {ex.submit(run_cell, *common, thr, hold, store): (thr, hold) for thr, hold in cells}
+            for fut in as_completed(futs):
+                thr, hold = futs[fut]
+                try: recs.append(fut.result())
+                except Exception as e:  # worker 프로세스 자체가 죽은 경우
+                    recs.append({"thr": thr, "hold": hold, "zip": None, "error": f"{type(e).__name__}: {e}"})
+        order = {c: i for i, c in enumerate(cells)}
+        recs.sort(key=lambda r: order[(r["thr"], r["hold"])])
+    else:
+        recs = [run_cell(*common, thr, hold, store) for thr, hold in cells]
 
+    out_zips = [r["zip"] for r in recs if r["zip"]]
+    failed = [r for r in recs if r["error"]]
     bundle = args.out_bundle or f"sweep_vec_bundle_{os.environ.get('GITHUB_SHA','local')[:7]}.zip"
     with zipfile.ZipFile(bundle, "w", zipfile.ZIP_DEFLATED) as z:
         for zp in out_zips:
             z.write(zp, os.path.basename(zp))
-    print(f"[bundle] {bundle} ({len(out_zips)} items)")
+        if failed:
+            z.writestr("sweep_errors.json", json.dumps(failed, ensure_ascii=False, indent=2))
+    print(f"[bundle] {bundle} ({len(out_zips)} items, {len(failed)} failed)")
+    if failed:
+        raise SystemExit(15)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,338 @@
+# ci/stream_engine.py
+# 목적: conf/params.v2.yml 로직을 1분봉 하나씩 받아 갱신하는 증분 엔진 (live/paper) + 배치 결과와의 replay parity 검사
+#  - 봉 1개당 상태 갱신: MACD(fast/slow/signal EMA), ATR(true range EMA), Donchian(단조 deque),
+#    orderflow z (number_of_trades, 이동 합 — window 마다 재동기화), 레짐 밴드 (ratio 의 720봉 분위수, rolling_quantile.StreamWindow),
+#    전일 고저(PDH/PDL), pivot 구조 (BOS/RETEST/STOPRUN), gate → cooldown → 청산 상태기계 (state.run_state_engine 과 같은 규칙)
+#  - 이벤트: ENTRY / EXIT (t_idx, open_time, reason, pnl) — 배치 trades.csv 와 같은 규칙
+#    (배치처럼 0번째 봉 진입은 로그에 없음)
+#  - 배치와 다를 수밖에 없는 부분
+#      warm-up : 배치는 Donchian 폭 / 레짐 밴드를 bfill (미래 값) → 처음 donchian_n + regime_pctl_window 봉은 비교에서 제외
+#      pivot   : 배치 swing_points 는 center=True 롤링 → 봉 p 의 pivot 여부를 p+pivot_right 봉까지 보고 결정 (look-ahead)
+#                delay=0 (live)          : 확정된 pivot 만 사용 (p + pivot_right 봉 도착 시) → 결정 지연 없음, 배치와 일부 BOS 다름
+#                delay=pivot_right (검증): 봉 k 의 결정을 k+delay 봉 도착 때 내림 → 배치와 이벤트 동일
+#  - VAH/VAL/POC, 주간 고저는 점수/진입에 쓰이지 않아 계산하지 않음
+# Usage (replay parity: 배치 러너 1회 + 같은 CSV 를 봉 단위로 재생):
+#   python ci/stream_engine.py --params conf/params.v2.yml --data-root . --csv-glob "**/*ETHUSDT*1min*.csv" --out-dir _out_stream
+
+import argparse, os, json, math, time
+from collections import deque
+import numpy as np
+import rolling_quantile
+
+REASONS = {1: "TP", 2: "SL", 4: "TIME"}
+NS_HOUR = 3_600_000_000_000
+NS_DAY = 24 * NS_HOUR
+
+class _Ema:
+    """utils.ema 와 같은 점화식 (첫 값으로 시작, span <= 1 이면 그대로)"""
+    def __init__(self, span):
+        self.alpha = 2.0 / (span + 1.0); self.raw = span <= 1; self.s = None
+    def update(self, v):
+        if self.raw or self.s is None: self.s = v
+        else: self.s = self.alpha * v + (1.0 - self.alpha) * self.s
+        return self.s
+
+class _Extreme:
+    """롤링 max (sign=1) / min (sign=-1) — 단조 deque, 갱신 O(1) amortized"""
+    def __init__(self, window, sign):
+        self.w = window; self.sign = sign; self.q = deque()
+    def update(self, t, v):
+        q = self.q; k = self.sign * v
+        while q and q[-1][1] <= k: q.pop()
+        q.append((t, k))
+        while q[0][0] <= t - self.w: q.popleft()
+        return self.sign * q[0][1]
+
+class _RollingZ:
+    """(x - mean) / std(ddof=0) over window (std 0 → 1), nobs < minp → 0 — 이동 합, window 마다 재계산해 누적 오차 제거"""
+    def __init__(self, window, minp):
+        self.w = window; self.minp = minp; self.buf = deque(); self.s = self.ss = 0.0; self.shift = 0.0; self.since = 0
+    def update(self, v):
+        buf = self.buf
+        buf.append(v)
+        if len(buf) > self.w:
+            o = buf.popleft() - self.shift; self.s -= o; self.ss -= o * o
+        self.since += 1
+        if self.since >= self.w or len(buf) == 1:
+            self.shift = buf[0]; self.since = 0
+            self.s = sum(x - self.shift for x in buf); self.ss = sum((x - self.shift) ** 2 for x in buf)
+        else:
+            d = v - self.shift; self.s += d; self.ss += d * d
+        n = len(buf)
+        if n < self.minp:
+            return 0.0
+        m = self.s / n
+        var = self.ss / n - m * m
+        sd = math.sqrt(var) if var > 1e-24 * (1.0 + (m + self.shift) ** 2) else 0.0
+        return (v - (m + self.shift)) / (sd if sd > 0 else 1.0)
+
+def soft_gate(score, a=1.0, thr=0.0, beta=1.0, of_shift=0.0):
+    z = -(a * (score - thr) + of_shift)
+    p = 1.0 / (1.0 + (math.exp(z) if z < 700 else math.inf))
+    return p ** beta
+
+class StreamEngine:
+    """params dict (params.v2.yml) → update(...) 를 봉마다 호출, 이벤트 목록을 돌려받음"""
+
+    def __init__(self, params, delay=0, trace=False):
+        P = params or {}
+        rg, st, of = P.get("regime", {}), P.get("structure", {}), P.get("orderflow", {})
+        mc = P.get("macd", {"fast": 12, "slow": 26, "signal": 9})
+        self.w = P.get("weights", {})
+        gp = P.get("gate", {})
+        self.gate_tr = gp.get("trend", {"a": 1.3, "thr": 0.1, "beta": 1.2, "of_shift": 0.0})
+        self.gate_rg = gp.get("range", {"a": 1.0, "thr": 0.05, "beta": 1.4, "of_shift": 0.0})
+        ep = P.get("entry", {})
+        self.p_thr_tr = ep.get("p_thr", {}).get("trend", 0.6)
+        self.p_thr_rg = ep.get("p_thr", {}).get("range", 0.55)
+        self.cooldown = int(ep.get("cooldown_bars", 5))
+        ex = P.get("exit", {})
+        self.tp_a, self.sl_a, self.tr_a = ex.get("tp_atr", 0.8), ex.get("sl_atr", 0.5), ex.get("trail_atr", 1.2)
+        self.min_hold, self.max_hold, self.be_a = ex.get("min_hold", 3), ex.get("max_hold", 60), ex.get("be_after_atr", 0.5)
+
+        n_don = int(rg.get("donchian_n", 40)); pctl = int(rg.get("regime_pctl_window", 720))
+        self.lo_p, self.hi_p = float(rg.get("range_lo_pctile", 0.35)), float(rg.get("trend_hi_pctile", 0.65))
+        self.atr = _Ema(int(rg.get("atr_n", 14)))
+        self.don_hi, self.don_lo, self.don_minp = _Extreme(n_don, 1), _Extreme(n_don, -1), n_don // 2
+        self.bands = rolling_quantile.StreamWindow(pctl, pctl // 2)
+        self.ema_f, self.ema_s, self.ema_sig = _Ema(mc.get("fast", 12)), _Ema(mc.get("slow", 26)), _Ema(mc.get("signal", 9))
+        z_n = int(of.get("z_n", 120))
+        self.tz = _RollingZ(z_n, z_n // 2)
+        left, right = int(st.get("pivot_left", 3)), int(st.get("pivot_right", 3))
+        span = left + right + 1
+        self.piv_before, self.piv_after = span // 2, span - 1 - span // 2  # pandas rolling(center=True) 와 같은 정렬
+        self.retest_eps, self.wick_thr = float(st.get("retest_eps", 0.001)), float(st.get("wick_thr", 0.6))
+        self.delay = int(delay)
+        self.warmup = n_don + pctl
+        self.t = -1
+        self.prev_close = None
+        self.day = None; self.day_hi = self.day_lo = math.nan; self.pdh = self.pdl = math.nan
+        self.highs = deque(maxlen=span); self.lows = deque(maxlen=span)
+        self.piv_h = deque(); self.piv_l = deque()
+        self.pending = deque()
+        self.last_entry = -10**9
+        self.in_pos = 0; self.entry_price = 0.0; self.bars_held = 0; self.trail = 0.0
+        self.prev_side = 0
+        self.trace = [] if trace else None
+
+    # ---------------- per bar ----------------
+    def update(self, t_ns, open_, high, low, close, volume, trades, taker_buy):
+        """봉 1개 추가 → 이번에 결정된 봉들의 이벤트 목록"""
+        self.t = t = self.t + 1
+        pc = close if self.prev_close is None else self.prev_close
+        self.prev_close = close
+        a = self.atr.update(max(high - low, abs(high - pc), abs(low - pc)))
+        up, dn = self.don_hi.update(t, high), self.don_lo.update(t, low)
+        width = up - dn if min(t + 1, self.don_hi.w) >= self.don_minp else math.nan
+        ratio = width / max(a, 1e-12)
+        self.bands.update(ratio)
+        lo_b, hi_b = self.bands.quantile(self.lo_p), self.bands.quantile(self.hi_p)
+        state = 1 if ratio > hi_b else (-1 if ratio < lo_b else 0)
+
+        hour = (t_ns // NS_HOUR) % 24
+        sess = 4
+        if 0 <= hour < 8: sess = 0
+        if 7 <= hour < 15: sess = 1
+        if 13 <= hour < 21: sess = 2
+        if (7 <= hour < 15 and 13 <= hour < 21) or 7 <= hour < 8 or 13 <= hour < 15: sess = 3
+
+        day = t_ns // NS_DAY
+        if day != self.day:
+            ok = self.day is not None and day == self.day + 1  # 배치 resample("1D").shift(1): 빈 날 다음은 NaN
+            self.pdh, self.pdl = (self.day_hi, self.day_lo) if ok else (math.nan, math.nan)
+            self.day = day; self.day_hi = high; self.day_lo = low
+        else:
+            self.day_hi = max(self.day_hi, high); self.day_lo = min(self.day_lo, low)
+
+        m = self.ema_f.update(close) - self.ema_s.update(close)
+        hist = m - self.ema_sig.update(m)
+        ofi = 2.0 * (taker_buy / volume if volume != 0.0 else 0.0) - 1.0
+        tz = max(self.tz.update(trades), 0.0)
+        aggbuy = min(max(ofi, 0.0), 1.0) * tz
+        aggsell = min(max(-ofi, 0.0), 1.0) * tz
+
+        rng = max(high - low, 1e-12)
+        upper, lower = (high - max(open_, close)) / rng, (min(open_, close) - low) / rng
+        pdh, pdl, eps = self.pdh, self.pdl, self.retest_eps
+        sr_short = pdh == pdh and abs((high - pdh) / max(pdh, 1e-12)) <= eps and upper >= self.wick_thr and close < pdh
+        sr_long = pdl == pdl and abs((low - pdl) / max(pdl, 1e-12)) <= eps and lower >= self.wick_thr and close > pdl
+
+        self.pending.append((t, t_ns, close, high, low, a, hist, ofi, aggbuy, aggsell,
+                             int(sr_long) - int(sr_short), sess, state))
+        self._confirm_pivots(t, high, low)
+        events = []
+        while self.pending and self.pending[0][0] <= t - self.delay:
+            self._decide(self.pending.popleft(), events)
+        return events
+
+    def flush(self):
+        """남은 (지연 중인) 봉 결정 — 끝의 pivot_right 봉은 배치처럼 pivot 이 될 수 없음"""
+        events = []
+        while self.pending:
+            self._decide(self.pending.popleft(), events)
+        return events
+
+    def _confirm_pivots(self, t, high, low):
+        self.highs.append(high); self.lows.append(low)
+        p = t - self.piv_after
+        if p - self.piv_before < 0:
+            return
+        k = self.piv_before
+        if self.highs[k] == max(self.highs): self.piv_h.append((p, self.highs[k]))
+        if self.lows[k] == min(self.lows): self.piv_l.append((p, self.lows[k]))
+
+    @staticmethod
+    def _last_pivot(piv, k):
+        while len(piv) > 1 and piv[1][0] <= k: piv.popleft()
+        return piv[0][1] if piv and piv[0][0] <= k else math.nan
+
+    def _decide(self, rec, events):
+        k, t_ns, close, high, low, a, hist, ofi, aggbuy, aggsell, stoprun, sess, state = rec
+        w = self.w
+        last_h, last_l = self._last_pivot(self.piv_h, k), self._last_pivot(self.piv_l, k)
+        bos_up, bos_dn = close > last_h, close < last_l
+        re_up = bos_up and abs((close - last_h) / max(last_h, 1e-12)) <= self.retest_eps
+        re_dn = bos_dn and abs((close - last_l) / max(last_l, 1e-12)) <= self.retest_eps
+        bias = 0.05 if sess in (1, 2, 3) else 0.0
+        # entry.combine_edges 와 같은 순서로 누적 (부동소수점 결과 일치)
+        s_tr = 0.0
+        s_tr += w.get("macd", 1.0) * hist
+        s_tr += w.get("aggbuy", 0.5) * aggbuy
+        s_tr -= w.get("aggsell", 0.5) * aggsell
+        s_tr += w.get("bos", 0.4) * (int(bos_up) - int(bos_dn))
+        s_tr += w.get("retest", 0.2) * (int(re_up) - int(re_dn))
+        s_tr += bias
+        s_rg = 0.0
+        s_rg += w.get("stoprun", 0.6) * stoprun
+        s_rg -= w.get("macd_range", 0.2) * (1.0 if hist > 0 else (-1.0 if hist < 0 else 0.0))
+        s_rg += w.get("ofi", 0.3) * ofi
+        s_rg += bias
+        if state == 1: p, thr = soft_gate(s_tr, **self.gate_tr), self.p_thr_tr
+        elif state == -1: p, thr = soft_gate(s_rg, **self.gate_rg), self.p_thr_rg
+        else: p, thr = 0.0, 1.0
+        flag = 0
+        if p >= thr and (self.cooldown <= 0 or k - self.last_entry > self.cooldown):
+            flag = 1; self.last_entry = k
+
+        side, reason, pnl = 0, 0, 0.0
+        if self.in_pos == 0 and flag:
+            self.in_pos = 1; self.entry_price = close; self.bars_held = 0
+            self.trail = close - self.tr_a * a
+            side = 1
+            if k > 0 and self.prev_side == 0:
+                events.append({"t_idx": k, "event": "ENTRY", "open_time": t_ns, "price": close})
+        elif self.in_pos == 1:
+            self.bars_held += 1
+            e = self.entry_price
+            tp = e + self.tp_a * a
+            sl = e - self.sl_a * a
+            if close - e >= self.be_a * a: sl = max(sl, e)
+            self.trail = max(self.trail, high - self.tr_a * a)
+            sl = max(sl, self.trail)
+            px = close
+            if self.bars_held >= self.max_hold: reason = 4
+            elif self.bars_held >= self.min_hold:
+                if low <= sl: reason, px = 2, sl
+                elif high >= tp: reason, px = 1, tp
+            if reason:
+                pnl = (px - e) / max(e, 1e-12)
+                self.in_pos = 0; self.entry_price = 0.0; self.bars_held = 0
+                events.append({"t_idx": k, "event": "EXIT", "open_time": t_ns, "price": px,
+                               "reason": REASONS.get(reason, reason), "pnl": pnl})
+            else:
+                side = 1
+        self.prev_side = side
+        if self.trace is not None:
+            self.trace.append((k, p, flag, side, reason))
+
+# ---------------- replay harness ----------------
+def replay(params, df, delay=0, trace=True):
+    """df (러너 입력과 같은 프레임) 를 봉 단위로 흘려 → (이벤트, trace 배열, 봉당 지연 ns)"""
+    import data_cache
+    ot = data_cache.to_epoch_ns(df["open_time"])
+    cols = [df[c].to_numpy(float) for c in ("open", "high", "low", "close", "volume",
+                                             "number_of_trades", "taker_buy_base_asset_volume")]
+    eng = StreamEngine(params, delay, trace)
+    events, lat = [], np.empty(len(df), dtype=np.int64)
+    pc = time.perf_counter_ns
+    for i, row in enumerate(zip(ot.tolist(), *(c.tolist() for c in cols))):
+        t0 = pc()
+        events += eng.update(*row)
+        lat[i] = pc() - t0
+    events += eng.flush()
+    tr = np.array(eng.trace, dtype=np.float64) if trace else None
+    return events, tr, lat, eng.warmup
+
+def parity(events, tr, batch_trades, preds, warmup, cooldown):
+    """배치 trades/preds 와 비교 — warm-up 이후 두 쪽 모두 flat 이고 최근 entry_flag 가 같은 첫 봉부터"""
+    b_in = preds["in_pos"].to_numpy(int); b_flag = preds["entry_flag"].to_numpy(int)
+    s_in = tr[:, 3].astype(int); s_flag = tr[:, 2].astype(int)
+    n = len(b_in); sync = None
+    span = max(cooldown, 0) + 1
+    for i in range(min(warmup, n), n):
+        if b_in[i - 1] == 0 and s_in[i - 1] == 0 and (b_flag[max(i - span, 0):i] == s_flag[max(i - span, 0):i]).all():
+            sync = i; break
+    rep = {"bars": n, "warmup": warmup, "sync_bar": sync}
+    if sync is None:
+        rep["ok"] = False
+        return rep
+    got = {(e["t_idx"], e["event"]) for e in events if e["t_idx"] >= sync}
+    ref = {(int(t), str(ev)) for t, ev in zip(batch_trades["t_idx"], batch_trades["event"]) if int(t) >= sync}
+    gp = preds["gatep"].to_numpy(float)[sync:]
+    rep.update({
+        "events_batch": len(ref), "events_stream": len(got),
+        "only_batch": sorted(ref - got)[:20], "only_stream": sorted(got - ref)[:20],
+        "n_only_batch": len(ref - got), "n_only_stream": len(got - ref),
+        "entry_flag_mismatch": int((b_flag[sync:] != s_flag[sync:]).sum()),
+        "in_pos_mismatch": int((b_in[sync:] != s_in[sync:]).sum()),
+        "gatep_max_abs_diff": float(np.nanmax(np.abs(gp - tr[sync:, 1]))) if len(gp) else 0.0,
+    })
+    rep["ok"] = rep["n_only_batch"] == 0 and rep["n_only_stream"] == 0
+    return rep
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--params", "--config", dest="params", required=True)
+    ap.add_argument("--data-root", default=".")
+    ap.add_argument("--csv-glob", required=True)
+    ap.add_argument("--out-dir", default="_out_stream")
+    ap.add_argument("--delay", type=int, nargs="*", default=None,
+                    help="decision delays to replay (default: 0 = live and pivot_right = batch parity)")
+    ap.add_argument("--start", default=None); ap.add_argument("--end", default=None)
+    args = ap.parse_args()
+
+    import pandas as pd
+    import wfo_entry, runner_session
+    params = wfo_entry.load_params(args.params)
+    sess = runner_session.RunnerSession(args.data_root, args.csv_glob, os.getcwd(), start=args.start, end=args.end)
+    batch_dir = os.path.join(args.out_dir, "batch")
+    t0 = time.time()
+    sess.run(params, batch_dir, enrich=False)
+    t_batch = time.time() - t0
+    import artifacts
+    trades = artifacts.read_table(batch_dir, "trades")
+    preds = artifacts.read_table(batch_dir, "preds_test", columns=["gatep", "entry_flag", "in_pos"])
+    right = int((params.get("structure") or {}).get("pivot_right", 3))
+    delays = args.delay if args.delay else [0, right]
+    report = {"params": args.params, "bars": len(sess.df), "batch_sec": round(t_batch, 3), "runs": []}
+    strict_ok = True
+    for d in delays:
+        t0 = time.time()
+        events, tr, lat, warmup = replay(params, sess.df, d)
+        rep = {"delay": d, "sec": round(time.time() - t0, 3),
+               "latency_us": {k: round(float(np.percentile(lat, q)) / 1e3, 2) for k, q in (("p50", 50), ("p99", 99), ("max", 100))}}
+        rep.update(parity(events, tr, trades, preds, warmup, int((params.get("entry") or {}).get("cooldown_bars", 5))))
+        pd.DataFrame(events).to_csv(os.path.join(args.out_dir, f"stream_events_delay{d}.csv"), index=False)
+        report["runs"].append(rep)
+        if d >= right and not rep["ok"]:
+            strict_ok = False
+        print(f"[stream_engine] delay={d}: {rep['sec']}s, latency p50={rep['latency_us']['p50']}us p99={rep['latency_us']['p99']}us, "
+              f"sync@{rep['sync_bar']}, only_batch={rep.get('n_only_batch')} only_stream={rep.get('n_only_stream')} "
+              f"gatep_diff={rep.get('gatep_max_abs_diff')}")
+    with open(os.path.join(args.out_dir, "stream_parity.json"), "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2, default=str)
+    if not strict_ok:
+        raise SystemExit(16)
+
+if __name__ == "__main__":
+    main()
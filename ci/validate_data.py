@@ -0,0 +1,155 @@
+# ci/validate_data.py
+# 목적: schema.md 의 Validators 4종을 파일 전체에 대해 chunk 스트리밍으로 검사 (메모리 상한 = chunk 크기)
+#  1. non_decreasing_time : open_time 이 앞선 행들의 최대값보다 작으면 위반
+#  2. finite              : OHLCV(+숫자형 확장 컬럼) NaN/Inf, open_time 파싱 실패
+#  3. hl_bounds           : low <= open,close <= high
+#  4. volume_nonneg       : volume >= 0
+#  - 규칙별 위반 수 + 처음 N개 행 오프셋(0-based 데이터 행) 보고
+#  - --write-cache: 위반 행을 뺀 검증된 columnar 캐시(data_cache 포맷)를 같은 패스에서 기록
+#    → 이후 단계(data_cache.ensure)는 원본 CSV를 다시 파싱하지 않음
+# Usage:
+#   python ci/validate_data.py --data-root . --csv-glob "**/*ETHUSDT*1min*.csv" --out validate_report.json --write-cache
+
+import argparse, os, json
+import numpy as np
+import pandas as pd
+import data_cache
+
+RULES = ["non_decreasing_time", "finite", "hl_bounds", "volume_nonneg"]
+REQUIRED = ["open_time", "open", "high", "low", "close", "volume"]
+NAT = np.iinfo(np.int64).min
+
+class _ColumnWriter:
+    """chunk를 컬럼별 raw 파일에 append → finish()에서 .npy로 변환 (전체를 메모리에 올리지 않음)"""
+    def __init__(self, dst):
+        self.dst, self.fh, self.dtype, self.rows = dst, {}, {}, 0
+
+    def append(self, arrays):
+        for fn, a in arrays.items():
+            if fn not in self.fh:
+                self.fh[fn] = open(os.path.join(self.dst, fn + ".bin"), "wb"); self.dtype[fn] = a.dtype
+            self.fh[fn].write(np.ascontiguousarray(a, dtype=self.dtype[fn]).tobytes())
+        self.rows += len(next(iter(arrays.values()))) if arrays else 0
+
+    def finish(self, step=1 << 20):
+        for fn, f in self.fh.items():
+            f.close()
+            raw = os.path.join(self.dst, fn + ".bin")
+            src = np.memmap(raw, dtype=self.dtype[fn], mode="r", shape=(self.rows,)) if self.rows else np.empty(0, self.dtype[fn])
+            out = np.lib.format.open_memmap(os.path.join(self.dst, fn), mode="w+", dtype=self.dtype[fn], shape=(self.rows,))
+            for i in range(0, self.rows, step):
+                out[i:i+step] = src[i:i+step]
+            out.flush(); del out, src
+            os.remove(raw)
+
+def _note(rep, rule, mask, offset, max_offsets):
+    n = int(mask.sum())
+    if not n: return
+    r = rep[rule]; r["count"] += n
+    if len(r["first_offsets"]) < max_offsets:
+        r["first_offsets"] += (np.flatnonzero(mask)[:max_offsets - len(r["first_offsets"])] + offset).tolist()
+
+def validate(path, chunksize=500_000, max_offsets=10, write_cache=False):
+    rep = {"path": path, "rows": 0, "missing_columns": [], "rules": {r: {"count": 0, "first_offsets": []} for r in RULES}}
+    rules = rep["rules"]
+    state = {"tmax": NAT, "offset": 0, "kept": 0}
+    meta_args = {}
+
+    def _scan(writer):
+        first = True
+        for ch in pd.read_csv(path, chunksize=chunksize):
+            off = state["offset"]; n = len(ch)
+            if first:
+                cols = [str(c) for c in ch.columns]
+                dcol = data_cache.find_col(cols, data_cache.DT_CANDS)
+                rep["missing_columns"] = [c for c in REQUIRED if c not in cols and not (c == "open_time" and dcol)]
+                num_cols, skipped = [], []
+                for c in cols:
+                    if c == dcol: continue
+                    v = pd.to_numeric(ch[c], errors="coerce")
+                    (skipped if v.notna().sum() == 0 and ch[c].notna().sum() > 0 else num_cols).append(c)
+                meta_args.update(cols=cols, dcol=dcol, skipped=skipped, head=ch.head(3),
+                                 files=({"open_time": "open_time.npy"} if dcol else {}) |
+                                       {c: f"col_{cols.index(c)}.npy" for c in num_cols})
+                first = False
+            dcol = meta_args["dcol"]
+            num = {c: pd.to_numeric(ch[c], errors="coerce").to_numpy(np.float64, na_value=np.nan)
+                   for c in meta_args["files"] if c != "open_time"}
+            bad = np.zeros(n, dtype=bool)
+
+            t = data_cache.to_epoch_ns(ch[dcol]) if dcol else np.full(n, NAT)
+            nat = t == NAT
+            if dcol:
+                run_max = np.maximum.accumulate(np.r_[state["tmax"], t])[:-1]  # 이전 행들까지의 최대
+                m1 = ~nat & (t < run_max)
+                _note(rules, "non_decreasing_time", m1, off, max_offsets); bad |= m1
+                state["tmax"] = max(state["tmax"], int(t.max()) if n else NAT)
+
+            m2 = nat.copy() if dcol else np.zeros(n, dtype=bool)
+            for c in ("open", "high", "low", "close", "volume"):
+                if c in num: m2 |= ~np.isfinite(num[c])
+            for c, v in num.items():
+                if c not in ("open", "high", "low", "close", "volume"):
+                    m2 |= np.isinf(v)  # 확장 컬럼은 빈 값(NaN) 허용, Inf만 위반
+            _note(rules, "finite", m2, off, max_offsets); bad |= m2
+
+            if all(c in num for c in ("open", "high", "low", "close")):
+                lo, hi = num["low"], num["high"]
+                with np.errstate(invalid="ignore"):
+                    m3 = ~m2 & ~((lo <= num["open"]) & (lo <= num["close"]) & (num["open"] <= hi) & (num["close"] <= hi))
+                _note(rules, "hl_bounds", m3, off, max_offsets); bad |= m3
+            if "volume" in num:
+                with np.errstate(invalid="ignore"):
+                    m4 = num["volume"] < 0
+                _note(rules, "volume_nonneg", m4, off, max_offsets); bad |= m4
+
+            if writer is not None:
+                keep = ~bad
+                arrs = {"open_time.npy": t[keep]} if dcol else {}
+                arrs.update({meta_args["files"][c]: v[keep] for c, v in num.items()})
+                writer.append(arrs)
+                state["kept"] += int(keep.sum())
+            state["offset"] += n
+        rep["rows"] = state["offset"]
+
+    if not write_cache:
+        _scan(None)
+    else:
+        def _builder(tmp):
+            w = _ColumnWriter(tmp)
+            _scan(w)
+            w.finish()
+            a = meta_args
+            data_cache.write_meta(tmp, path, state["kept"], a["cols"], a["dcol"], a["files"], a["skipped"], a["head"],
+                                  validated={"source_rows": rep["rows"], "dropped": rep["rows"] - state["kept"],
+                                             "violations": {r: rules[r]["count"] for r in RULES}})
+        rep["cache_dir"] = data_cache.publish(path, _builder, replace=True)
+        rep["cache_rows"] = state["kept"]
+    rep["ok"] = not rep["missing_columns"] and all(rules[r]["count"] == 0 for r in RULES)
+    return rep
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--data-root", default=".")
+    ap.add_argument("--csv-glob", required=True)
+    ap.add_argument("--chunksize", type=int, default=500_000)
+    ap.add_argument("--max-offsets", type=int, default=10)
+    ap.add_argument("--write-cache", action="store_true", help="write a validated-clean columnar copy into the data cache")
+    ap.add_argument("--out", default="", help="report JSON path")
+    ap.add_argument("--fail-on-violation", action="store_true")
+    args = ap.parse_args()
+    paths = data_cache.match_csvs(args.data_root, args.csv_glob)
+    if not paths:
+        print("[validate_data] No CSV matched"); raise SystemExit(11)
+    reps = [validate(p, args.chunksize, args.max_offsets, args.write_cache) for p in paths]
+    for r in reps:
+        print(f"[validate_data] {r['path']}: rows={r['rows']} ok={r['ok']} " +
+              " ".join(f"{k}={v['count']}" for k, v in r["rules"].items()))
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(reps, f, ensure_ascii=False, indent=2)
+    if args.fail_on_violation and not all(r["ok"] for r in reps):
+        raise SystemExit(16)
+
+if __name__ == "__main__":
+    main()
@@ -21,25 +21,18 @@ def pick_csvs(data_root, csv_glob):
     return pat, paths
 
 def unzip_codepack_if_any(workspace="."):
-    cands = []
-    for fn in os.listdir(workspace):
-        if fn.endswith(".zip") and "strategy" in fn.lower():
-            cands.append(os.path.join(workspace, fn))
-    for zp in cands:
+    """strategy*.zip → 해시 캐시 디렉터리 (이미 풀려 있으면 재사용). 추출 경로 리스트 반환"""
+    import codepack
+    dirs = []
+    for zp in codepack.find_zips(workspace):
         try:
-            import zipfile
-            with zipfile.ZipFile(zp,'r') as z: z.extractall(workspace)
-            print(f"[wfo_entry] extracted codepack: {os.path.basename(zp)}")
+            dirs.append(codepack.extract(zp, codepack.cache_root(workspace)))
+            print(f"[wfo_entry] codepack ready: {os.path.basename(zp)} -> {dirs[-1]}")
         except Exception as e:
             print(f"[wfo_entry] skip codepack {zp}: {e}")
-    # ensure packages
-    for pkg in ["strategy", os.path.join("strategy","v2"), "backtest"]:
-        p = os.path.join(workspace, pkg)
-        if os.path.isdir(p):
-            ip = os.path.join(p, "__init__.py")
-            if not os.path.exists(ip):
-                try: open(ip, "w", encoding="utf-8").write("# auto-generated\n")
-                except: pass
+    # ensure packages (workspace에 직접 있는 소스 트리)
+    codepack._ensure_packages(workspace)
+    return dirs
 
 def overlay_params(cfg, thr=None, hold=None, filt=None):
     p = dict(cfg) if isinstance(cfg, dict) else {}
@@ -55,6 +48,20 @@ def overlay_params(cfg, thr=None, hold=None, filt=None):
     # filter is meta only for this codebase
     return p
 
+def overlay_dotted(cfg, dotted):
+    """{"thr":.., "hold":.., "exit.tp_atr": 2.0, ...} → 새 params dict (base는 건드리지 않음)"""
+    import copy
+    d = dict(dotted or {})
+    p = overlay_params(copy.deepcopy(cfg), d.pop("thr", None), d.pop("hold", None), d.pop("filter", None))
+    for k, v in d.items():
+        cur = p
+        parts = str(k).split(".")
+        for part in parts[:-1]:
+            if not isinstance(cur.get(part), dict): cur[part] = {}
+            cur = cur[part]
+        cur[parts[-1]] = v
+    return p
+
 def write_params_file(p, outdir):
     ensure_dir(outdir)
     outp = os.path.join(outdir, "params_used.yml")
@@ -62,23 +69,30 @@ def write_params_file(p, outdir):
         yaml.safe_dump(p, f, sort_keys=False, allow_unicode=True)
     return outp
 
-def find_runner_path(workspace="."):
-    pref = ["backtest/runner.py", "run_4u.py", "runner.py", "run.py"]
-    for rel in pref:
-        cand = os.path.join(workspace, rel)
-        if os.path.isfile(cand):
-            return cand
-    for root,dirs,files in os.walk(workspace):
-        for fn in files:
-            if fn.endswith(".py") and fn.lower() in {"runner.py","run_4u.py","run.py"}:
-                return os.path.join(root, fn)
+def find_runner_path(workspace=".", codepack_dirs=(), pref=None):
+    """pref 를 지정하면 (--runner / RUNNER_PATH) 그 경로만: 코드팩 캐시 → 워크스페이스 순으로 찾음"""
+    explicit = pref is not None
+    pref = pref or ["backtest/runner.py", "run_4u.py", "runner.py", "run.py"]
+    roots = list(codepack_dirs) + [workspace]
+    for base in roots:
+        for rel in pref:
+            cand = os.path.join(base, rel)
+            if os.path.isfile(cand):
+                return cand
+    if explicit:
+        raise FileNotFoundError(f"runner script not found: {pref[0]} (searched {roots})")
+    for base in roots:
+        for root,dirs,files in os.walk(base):
+            for fn in files:
+                if fn.endswith(".py") and fn.lower() in {"runner.py","run_4u.py","run.py"}:
+                    return os.path.join(root, fn)
     raise FileNotFoundError("runner script not found after codepack extraction")
 
-def run_script_with_argv(py_path, argv):
+def run_script_with_argv(py_path, argv, extra_paths=()):
     old_argv = list(sys.argv)
     try:
         ws = os.getcwd(); sd = os.path.dirname(py_path)
-        for p in [os.path.join(ws,"src"), os.path.join(ws,"backtest"), ws, sd]:
+        for p in [os.path.join(ws,"src"), os.path.join(ws,"backtest"), ws, *extra_paths, sd]:
             if p and p not in sys.path: sys.path.insert(0, p)
         print("[wfo_entry] sys.path[0:4] =", sys.path[:4])
         sys.argv = argv
@@ -89,14 +103,15 @@ def run_script_with_argv(py_path, argv):
 
 # ---------- diagnostics & enrich ----------
 def diag_probe(data_root, csv_glob, outdir, limit=3):
-    import glob, pandas as pd
+    import data_cache, data_index
     pat = os.path.join(data_root or ".", csv_glob)
-    paths = sorted(glob.glob(pat, recursive=True))
+    paths = data_cache.match_csvs(data_root, csv_glob)
     rep = {"pattern": pat, "n_files": len(paths), "samples": []}
     for p in paths[:limit]:
         try:
-            df = pd.read_csv(p, nrows=5)
-            rep["samples"].append({"path": p, "cols": list(df.columns), "head": df.head(3).to_dict("records")})
+            m = data_index.probe(p)  # 사이드카 인덱스만 읽음 (CSV 전체 파싱 없음)
+            rep["samples"].append({"path": p, "cols": m["columns"], "rows": m["rows"], "head": m["head"],
+                                   "first_open_time": m["first_open_time"], "last_open_time": m["last_open_time"]})
         except Exception as e:
             rep["samples"].append({"path": p, "error": str(e)})
     with open(os.path.join(outdir, "diag_probe.json"), "w", encoding="utf-8") as f:
@@ -112,11 +127,12 @@ def post_enrich(outdir):
     def _read_json(p):
         try: return json.load(open(p,"r",encoding="utf-8"))
         except: return {}
-    def _read_csv(p):
-        try: return pd.read_csv(p)
-        except: 
-            try: return pd.read_csv(p, engine="python", sep=",", on_bad_lines="skip")
-            except: return pd.DataFrame()
+    def _read_table(name):
+        import artifacts  # trades / preds_test: .npz 우선, 없으면 .csv
+        try:
+            df = artifacts.read_table(outdir, name)
+            return pd.DataFrame() if df is None else df
+        except: return pd.DataFrame()
     def _count_exits(df):
         if df is None or df.empty: return 0
         ev = next((c for c in df.columns if str(c).lower()=="event"), None)
@@ -143,11 +159,9 @@ def post_enrich(outdir):
         fp=int(((Yt==0)&(Yp==1)).sum()); fn=int(((Yt==1)&(Yp==0)).sum())
         den=(tp+fp)*(tp+fn)*(tn+fp)*(tn+fn); den=math.sqrt(den) if den else 0
         return float((tp*tn - fp*fn)/den) if den else float('nan')
-    trades_p = os.path.join(outdir,"trades.csv")
-    preds_p  = os.path.join(outdir,"preds_test.csv")
     summ_p   = os.path.join(outdir,"summary.json")
-    trades = _read_csv(trades_p) if os.path.exists(trades_p) else pd.DataFrame()
-    preds  = _read_csv(preds_p) if os.path.exists(preds_p) else pd.DataFrame()
+    trades = _read_table("trades")
+    preds  = _read_table("preds_test")
     summ   = _read_json(summ_p)
     n_exits = summ.get("exits") or _count_exits(trades); summ["exits"] = n_exits
     summ.setdefault("entries", n_exits)
@@ -166,19 +180,19 @@ def post_enrich(outdir):
     print("[post_enrich] exits:", n_exits, "summary keys:", list(summ.keys())[:8])
 
 def post_sanity(outdir):
-    summ_p=os.path.join(outdir,"summary.json"); trades_p=os.path.join(outdir,"trades.csv")
+    import artifacts
+    summ_p=os.path.join(outdir,"summary.json"); trades_p=artifacts.table_path(outdir,"trades")
     summ = {}
     if os.path.exists(summ_p):
         try: summ=json.load(open(summ_p,"r",encoding="utf-8"))
         except: summ={}
     exits = summ.get("exits")
     n_rows = None
-    if os.path.exists(trades_p):
+    if trades_p:
         try:
-            import pandas as pd
-            n_rows = len(pd.read_csv(trades_p))
+            n_rows = len(artifacts.read_path(trades_p))
         except Exception as e:
-            print("[post_sanity] trades.csv read error:", e)
+            print(f"[post_sanity] {os.path.basename(trades_p)} read error:", e)
     rep = {"exits": exits, "trades_rows": n_rows}
     with open(os.path.join(outdir,"post_sanity.json"),"w",encoding="utf-8") as f:
         json.dump(rep, f, ensure_ascii=False, indent=2)
@@ -197,36 +211,90 @@ def main():
     ap.add_argument("--filter", type=str)
     ap.add_argument("--outdir", required=True)
     ap.add_argument("--runner")
+    ap.add_argument("--no-cache", action="store_true", help="always execute the runner (skip run_cache)")
+    ap.add_argument("--profile", action="store_true", help="cProfile the runner -> runner.prof / runner_profile.txt")
+    ap.add_argument("--store", default=None, help="result store SQLite (default: $MR4T_RESULT_STORE; unset = off)")
+    ap.add_argument("--format", default=None, choices=["csv", "npz"],
+                    help="trades/preds_test output format (default: $MR4T_OUTPUT_FORMAT or csv)")
+    ap.add_argument("--csv-export", action="store_true", help="with --format npz: also keep the CSV files")
     args = ap.parse_args()
 
-    unzip_codepack_if_any(os.getcwd())
+    import profiling
+    timer = profiling.StageTimer()
+    try:
+        _run_stages(args, timer)
+    finally:
+        timer.write(args.outdir)  # 실패해도 어디까지 얼마나 걸렸는지 남김
 
-    pat, paths = pick_csvs(args.data_root, args.csv_glob)
+def _run_stages(args, timer):
+    import profiling
+    with timer.stage("unzip"):
+        cp_dirs = unzip_codepack_if_any(os.getcwd())
+
+    with timer.stage("pick_csvs"):
+        pat, paths = pick_csvs(args.data_root, args.csv_glob)
     print(f"[wfo_entry] data pattern: {pat} (matched {len(paths)})")
     # pre-probe
     ensure_dir(args.outdir)
-    diag_probe(args.data_root, args.csv_glob, args.outdir)
+    with timer.stage("diag_probe"):
+        diag_probe(args.data_root, args.csv_glob, args.outdir)
 
-    base_cfg = load_params(args.params)
-    patched = overlay_params(base_cfg, args.thr, args.hold, args.filter)
-    params_path = write_params_file(patched, args.outdir)
+    with timer.stage("overlay_params"):
+        base_cfg = load_params(args.params)
+        patched = overlay_params(base_cfg, args.thr, args.hold, args.filter)
+        params_path = write_params_file(patched, args.outdir)
 
-    runner = args.runner or find_runner_path(os.getcwd())
+    runner = find_runner_path(os.getcwd(), cp_dirs, [args.runner] if args.runner else None)
     argv = [runner, "--data-root", args.data_root, "--csv-glob", args.csv_glob, "--outdir", args.outdir, "--params", params_path]
-    run_script_with_argv(runner, argv)
+    import artifacts
+    artifacts.clear_tables(args.outdir)  # 재사용된 outdir: 이전 실행의 trades / preds_test 가 읽히지 않도록
+    # content-addressed run cache: params + data + codepack 동일하면 러너 생략
+    cache_state, key = "off", None
+    if not args.no_cache:
+        import run_cache
+        with timer.stage("run_cache_lookup"):
+            key = run_cache.run_key(patched, paths, run_cache.codepack_files(os.getcwd(), runner))
+            cache_state = "hit" if run_cache.restore(key, args.outdir) else "miss"
+    if cache_state != "hit":
+        with timer.stage("runner"):
+            if args.profile:
+                with profiling.cprofile_to(args.outdir, "runner"):
+                    run_script_with_argv(runner, argv, cp_dirs)
+            else:
+                run_script_with_argv(runner, argv, cp_dirs)
+        if key:
+            with timer.stage("run_cache_store"):
+                run_cache.store(key, args.outdir, {"thr": args.thr, "hold": args.hold, "csv_glob": args.csv_glob})
+
+    # trades / preds_test 출력 형식 (run_cache 는 러너 원본 그대로 보관)
+    with timer.stage("artifacts"):
+        artifacts.convert_outdir(args.outdir, args.format, keep_csv=args.csv_export or None)
 
     # enrich & sanity
-    post_enrich(args.outdir)
-    post_sanity(args.outdir)
-
-    # manifest
-    with open(os.path.join(args.outdir,"manifest.json"),"w",encoding="utf-8") as f:
-        json.dump({
-            "thr": args.thr, "hold": args.hold, "filter": args.filter,
-            "csv_glob": args.csv_glob, "data_root": args.data_root,
-            "params_file": params_path, "runner": runner,
-            "ts": datetime.datetime.utcnow().isoformat()+"Z"
-        }, f, ensure_ascii=False, indent=2)
+    with timer.stage("post_enrich"):
+        post_enrich(args.outdir)
+    with timer.stage("post_sanity"):
+        post_sanity(args.outdir)
+
+    # manifest (run_id: result_store 기록자들이 같은 outdir 을 같은 run 으로 보도록)
+    import result_store
+    ident = result_store.run_identity(patched, args.thr, args.hold, args.filter, paths)
+    with timer.stage("manifest"):
+        with open(os.path.join(args.outdir,"manifest.json"),"w",encoding="utf-8") as f:
+            json.dump({
+                **ident,
+                "csv_glob": args.csv_glob, "data_root": args.data_root,
+                "params_file": params_path, "runner": runner,
+                "run_cache": {"state": cache_state, "key": key},
+                "timings": timer.report(),
+                "ts": datetime.datetime.utcnow().isoformat()+"Z"
+            }, f, ensure_ascii=False, indent=2)
+
+    store = result_store.store_path(args.store)
+    if store:
+        with timer.stage("result_store"):
+            result_store.record_run(store, args.outdir, patched, args.thr, args.hold, args.filter, "wfo_entry", paths,
+                                    run_id=ident["run_id"])
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,221 @@
+# ci/wfo_splits.py
+# 목적: 데이터 1회 로드로 K-split WFO + 세션(ASIA/EU/US) 분석을 한 번에 (split마다 전체 재실행/재로드 없음)
+#  - 시세는 data_cache memmap → 워커들이 같은 read-only 페이지를 공유, 구간 슬라이스만 DataFrame으로 복사
+#  - 구간 k 실행 범위 = [start_k - warmup, end_k + tail)
+#      warmup = params의 최대 lookback (vahval_window, regime_pctl_window, z_n, ...)
+#      tail   = exit.max_hold + 1 (구간 끝에서 열린 포지션이 닫히도록)
+#    지표는 [start_k, end_k) 안에서 '진입한' 거래만 집계 (pnl_close_based 규칙: (exit_close - entry_close) * side)
+#  - rolling : train = 직전 --train-splits 개 구간 / anchored : train = 처음 ~ 직전 구간 전부
+#    전략에 fit 단계가 없으므로 train 지표는 이미 돌린 구간 결과를 합쳐서 계산 (추가 실행 없음)
+#    → 총 비용 ≈ 전체 백테스트 1회 + K * (warmup + tail) 바
+#  - 구간들은 spawn 프로세스 풀에서 병렬, 실패한 구간은 격리해서 기록 (exit 15)
+#  - --feature-cache: 구간별 지표 시계열을 ci/feature_cache.py 에 저장 → 같은 분할로 exit/entry 만 바꿔 재실행 시 재사용
+# Outputs (--out-root):
+#   seg_XX/            구간별 러너 산출물 (trades.csv, summary.json, preds_test.csv, params_used.yml)
+#   wfo_windows.csv    window, role(train/test), segments, start, end, n_trades, win_rate, cum_pnl, ...
+#   wfo_sessions.csv   위와 같은 키 + session (ASIA/EU/US/OVERLAP/OTHER, 진입 바 기준)
+#   wfo_splits.json    설정, warmup, 구간 경계, 실패 목록
+# Usage:
+#   python ci/wfo_splits.py --params conf/params_champion.yml --data-root . \
+#       --csv-glob "**/*ETHUSDT*1min*.csv" --splits 4 --mode rolling --out-root out_wfo_splits
+
+import argparse, os, sys, json, time, traceback
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+import pandas as pd
+import wfo_entry, data_cache, artifacts
+
+SESSIONS = ["ASIA", "EU", "US", "OVERLAP", "OTHER"]  # regime.session_utc 코드 순서
+WARMUP_KEYS = [("regime", "vahval_window", 720), ("regime", "regime_pctl_window", 720), ("orderflow", "z_n", 120),
+               ("regime", "donchian_n", 40), ("regime", "atr_n", 14)]
+METRIC_COLS = ["n_trades", "win_rate", "cum_pnl", "avg_pnl", "profit_factor", "sharpe", "mdd"]
+
+def warmup_bars(params):
+    """지표 lookback 중 최대값 (+ MACD slow+signal)"""
+    lb = [int((params.get(sec) or {}).get(k, d)) for sec, k, d in WARMUP_KEYS]
+    m = params.get("macd") or {}
+    lb.append(int(m.get("slow", 26)) + int(m.get("signal", 9)))
+    return max(lb)
+
+def segment_bounds(n, splits, warmup):
+    """[warmup, n) 를 splits 개의 연속 구간으로 → [(start, end), ...]"""
+    if n - warmup < splits:
+        raise ValueError(f"[wfo_splits] {n} rows is too short for {splits} splits after {warmup} warmup bars")
+    edges = np.linspace(warmup, n, splits + 1).astype(np.int64)
+    return [(int(a), int(b)) for a, b in zip(edges[:-1], edges[1:])]
+
+def windows(splits, mode="rolling", train_splits=1):
+    """[(window, train_segments, test_segment), ...]"""
+    out = []
+    for k in range(splits):
+        tr = list(range(k)) if mode == "anchored" else list(range(k - train_splits, k))
+        if tr and tr[0] >= 0:
+            out.append((len(out), tr, k))
+    return out
+
+def trade_metrics(pnl):
+    pnl = np.asarray(pnl, dtype=float)
+    n = len(pnl)
+    if n == 0:
+        return {"n_trades": 0, "win_rate": np.nan, "cum_pnl": 0.0, "avg_pnl": np.nan,
+                "profit_factor": np.nan, "sharpe": np.nan, "mdd": 0.0}
+    pos, neg = float(pnl[pnl > 0].sum()), float(pnl[pnl < 0].sum())
+    sd = float(pnl.std())
+    eq = np.cumsum(pnl)
+    return {"n_trades": n, "win_rate": float((pnl > 0).sum()) / n, "cum_pnl": float(eq[-1]),
+            "avg_pnl": float(pnl.mean()), "profit_factor": (pos / abs(neg)) if neg != 0 else np.nan,
+            "sharpe": float(pnl.mean()) / sd if sd > 0 else np.nan,  # 거래 단위 (연율화 없음)
+            "mdd": float((np.maximum.accumulate(np.r_[0.0, eq]) - np.r_[0.0, eq]).max())}
+
+# ---------------- worker ----------------
+_W = {}
+
+def _init_worker(paths, data_path, feature_cache=False):
+    for p in paths:
+        if p not in sys.path: sys.path.insert(0, p)
+    import strategy.v2.strategy as strategy_mod
+    from strategy.v2.regime import session_utc
+    cols = data_cache.load_columns(data_path)  # memmap (read-only, 프로세스 간 페이지 공유)
+    _W.update(strategy=strategy_mod.StrategyV2, session_utc=session_utc, cols=cols,
+              data_key=data_cache.cache_key(data_path), features=None)
+    if feature_cache:
+        import feature_cache as _fc
+        _W["features"] = _fc.attach(strategy_mod)
+
+def _frame(lo, hi):
+    cols = _W["cols"]
+    df = pd.DataFrame({c: np.asarray(a[lo:hi]) for c, a in cols.items() if c != "open_time"})
+    df.insert(0, "open_time", np.asarray(cols["open_time"][lo:hi]).view("datetime64[ns]"))
+    return df
+
+def run_segment(seg, params, lo, start, end, hi, outdir):
+    """구간 1개 실행 → {seg, entry, exit, pnl, session, ...}. 실패는 raise 대신 rec['error']"""
+    rec = {"seg": seg, "start": start, "end": end, "lo": lo, "hi": hi, "outdir": outdir, "error": None}
+    try:
+        t0 = time.time()
+        df = _frame(lo, hi)
+        if _W["features"] is not None:  # 같은 구간 경계면 지표 재사용
+            _W["features"].data_key = f"{_W['data_key']}:{lo}:{hi}"
+        st = _W["strategy"](params_path=wfo_entry.write_params_file(params, outdir), outdir=outdir)
+        artifacts.clear_tables(outdir)
+        st.run(df)
+        artifacts.convert_outdir(outdir)  # MR4T_OUTPUT_FORMAT
+        tr = artifacts.read_table(outdir, "trades", columns=["t_idx", "event"])
+        ev = tr["event"].astype(str).str.upper().to_numpy()
+        ti = tr["t_idx"].to_numpy(np.int64)
+        ent, ext = np.sort(ti[ev == "ENTRY"]), np.sort(ti[ev == "EXIT"])
+        # 러너 로그는 long-only 순차 포지션: 각 ENTRY는 그 뒤 첫 EXIT로 닫힘 (닫히지 않은 마지막 ENTRY는 버림)
+        j = np.searchsorted(ext, ent, side="right")
+        ok = j < len(ext)
+        ent, ext = ent[ok], ext[j[ok]]
+        g_ent = ent + lo
+        keep = (g_ent >= start) & (g_ent < end)
+        ent, ext = ent[keep], ext[keep]
+        close = df["close"].to_numpy(float)
+        hours = pd.DatetimeIndex(df["open_time"].to_numpy()[ent]).hour.to_numpy()
+        rec.update(entry=(ent + lo).tolist(), exit=(ext + lo).tolist(),
+                   pnl=(close[ext] - close[ent]).tolist(),
+                   session=np.asarray(_W["session_utc"](hours)).astype(int).tolist(),
+                   sec=round(time.time() - t0, 3))
+    except Exception as e:
+        rec["error"] = f"{type(e).__name__}: {e}"
+        rec["traceback"] = traceback.format_exc()
+        print(f"[wfo_splits] seg {seg} failed: {rec['error']}")
+    return rec
+
+# ---------------- driver ----------------
+def _rows(window, role, segs, recs):
+    rs = [recs[s] for s in segs]
+    pnl = np.concatenate([np.asarray(r["pnl"], float) for r in rs]) if rs else np.empty(0)
+    ses = np.concatenate([np.asarray(r["session"], int) for r in rs]) if rs else np.empty(0, int)
+    key = {"window": window, "role": role, "segments": "+".join(str(s) for s in segs),
+           "start": rs[0]["start_time"], "end": rs[-1]["end_time"]}
+    wrow = {**key, **trade_metrics(pnl)}
+    srows = [{**key, "session": name, **trade_metrics(pnl[ses == code])} for code, name in enumerate(SESSIONS)]
+    return wrow, srows
+
+def run_splits(params, data_root, csv_glob, out_root, splits=4, mode="rolling", train_splits=1,
+               warmup=None, workers=None, workspace=".", feature_cache=False):
+    paths = data_cache.match_csvs(data_root, csv_glob)
+    if not paths:
+        raise FileNotFoundError(f"[wfo_splits] No CSV matched: {csv_glob}")
+    data_path = paths[0]
+    meta = data_cache.ensure(data_path)
+    n = int(meta["rows"])
+    warm = warmup_bars(params) if warmup is None else int(warmup)
+    tail = int((params.get("exit") or {}).get("max_hold", 60)) + 1
+    bounds = segment_bounds(n, splits, warm)
+    ot = data_cache.load_columns(data_path, ["open_time"])["open_time"]
+    sys_paths = [os.path.abspath(workspace), *wfo_entry.unzip_codepack_if_any(workspace)]
+
+    jobs = [(k, params, s - warm, s, e, min(e + tail, n), os.path.join(out_root, f"seg_{k:02d}"))
+            for k, (s, e) in enumerate(bounds)]
+    workers = min(workers or os.cpu_count() or 1, len(jobs))
+    recs = {}
+    if workers > 1:
+        ctx = mp.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=workers, mp_context=ctx,
+                                 initializer=_init_worker, initargs=(sys_paths, data_path, feature_cache)) as ex:
+            futs = {ex.submit(run_segment, *j): j[0] for j in jobs}
+            for fut in as_completed(futs):
+                k = futs[fut]
+                try: recs[k] = fut.result()
+                except Exception as e:  # worker 프로세스 자체가 죽은 경우
+                    recs[k] = {"seg": k, "error": f"{type(e).__name__}: {e}"}
+    else:
+        _init_worker(sys_paths, data_path, feature_cache)
+        recs = {j[0]: run_segment(*j) for j in jobs}
+    for k, (s, e) in enumerate(bounds):
+        recs[k].update(start_time=str(pd.Timestamp(data_cache.to_datetime_ns(ot[s:s+1])[0])),
+                       end_time=str(pd.Timestamp(data_cache.to_datetime_ns(ot[e-1:e])[0])))
+
+    failed = sorted(k for k, r in recs.items() if r.get("error"))
+    wrows, srows = [], []
+    for w, tr, te in windows(splits, mode, train_splits):
+        if failed and any(s in failed for s in [*tr, te]):
+            continue
+        for role, segs in (("train", tr), ("test", [te])):
+            a, b = _rows(w, role, segs, recs)
+            wrows.append(a); srows += b
+    wfo_entry.ensure_dir(out_root)
+    pd.DataFrame(wrows, columns=["window", "role", "segments", "start", "end", *METRIC_COLS]).to_csv(
+        os.path.join(out_root, "wfo_windows.csv"), index=False)
+    pd.DataFrame(srows, columns=["window", "role", "segments", "start", "end", "session", *METRIC_COLS]).to_csv(
+        os.path.join(out_root, "wfo_sessions.csv"), index=False)
+    info = {"data_path": data_path, "rows": n, "splits": splits, "mode": mode, "train_splits": train_splits,
+            "warmup": warm, "tail": tail, "workers": workers,
+            "segments": [{k: recs[i].get(k) for k in ("seg", "start", "end", "lo", "hi", "start_time", "end_time",
+                                                      "outdir", "sec", "error")} for i in range(len(bounds))],
+            "failed": [{"seg": k, "error": recs[k]["error"], "traceback": recs[k].get("traceback")} for k in failed]}
+    with open(os.path.join(out_root, "wfo_splits.json"), "w", encoding="utf-8") as f:
+        json.dump(info, f, ensure_ascii=False, indent=2)
+    return info
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--params", "--config", dest="params", required=True)
+    ap.add_argument("--data-root", default=".")
+    ap.add_argument("--csv-glob", required=True)
+    ap.add_argument("--splits", type=int, default=4)
+    ap.add_argument("--mode", choices=["rolling", "anchored"], default="rolling")
+    ap.add_argument("--train-splits", type=int, default=1, help="rolling: segments per train window")
+    ap.add_argument("--warmup", type=int, default=None, help="override warmup bars (default: max lookback in params)")
+    ap.add_argument("--thr", type=float, default=None)
+    ap.add_argument("--hold", type=int, default=None)
+    ap.add_argument("--workers", type=int, default=None, help="process pool size (default: min(cpu, splits)); 1 = in-process")
+    ap.add_argument("--feature-cache", action="store_true", help="reuse indicator series across runs (ci/feature_cache.py)")
+    ap.add_argument("--out-root", default="out_wfo_splits")
+    args = ap.parse_args()
+
+    params = wfo_entry.overlay_params(wfo_entry.load_params(args.params), args.thr, args.hold)
+    t0 = time.time()
+    info = run_splits(params, args.data_root, args.csv_glob, args.out_root, args.splits, args.mode,
+                      args.train_splits, args.warmup, args.workers, os.getcwd(), args.feature_cache)
+    print(f"[wfo_splits] {args.splits} segments ({args.mode}, warmup={info['warmup']}) in {time.time()-t0:.2f}s "
+          f"-> {args.out_root}/wfo_windows.csv, wfo_sessions.csv")
+    if info["failed"]:
+        raise SystemExit(15)
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,7 @@
-import argparse, json, os, glob
-import pandas as pd
+import argparse, json, os, glob, sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "ci"))
+import data_index, validate_data
 
 REQUIRED = ["open_time","open","high","low","close","volume"]
 
@@ -33,19 +35,26 @@ def main():
     ap.add_argument("--data-root", required=True)
     ap.add_argument("--csv-glob", default="**/*.csv")
     ap.add_argument("--outdir", required=True)
+    ap.add_argument("--validate", action="store_true", help="run schema.md validators (chunked) and cache the clean copy")
     args = ap.parse_args()
 
     ensure_out(args.outdir)
     csv_path = find_csv(args.data_root, args.csv_glob)
-    df = pd.read_csv(csv_path, nrows=2000)
-    missing = [c for c in REQUIRED if c not in df.columns]
+    vrep = validate_data.validate(csv_path, write_cache=True) if args.validate else None
+    meta = data_index.probe(csv_path)  # columns/rows from the sidecar index, no full parse
+    missing = [c for c in REQUIRED if c not in meta["columns"]]
     report = {
         "csv_path": csv_path,
-        "rows_read": len(df),
+        "rows_read": meta["rows"],
+        "first_open_time": meta["first_open_time"],
+        "last_open_time": meta["last_open_time"],
         "missing": missing,
         "required": REQUIRED
     }
-    if missing:
+    if vrep is not None:
+        report["validators"] = {r: v["count"] for r, v in vrep["rules"].items()}
+        report["first_offsets"] = {r: v["first_offsets"] for r, v in vrep["rules"].items() if v["count"]}
+    if missing or (vrep is not None and not vrep["ok"]):
         report["status"] = "fail"
     else:
         report["status"] = "ok"
@@ -53,6 +62,8 @@ def main():
         json.dump(report, f, indent=2)
     if missing:
         raise SystemExit(f"Missing required columns: {missing}")
+    if report["status"] == "fail":
+        raise SystemExit(f"Validator violations: {report['validators']}")
 
 if __name__ == "__main__":
     main()